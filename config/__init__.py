@@ -13,6 +13,27 @@ from .config import (
     NEO4J_PASSWORD,
     MONGO_URI,
     MONGO_DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    NEO4J_MAX_POOL_SIZE,
+    CONNECTION_HEALTH_CHECK_INTERVAL,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_TTL_SECONDS,
+    ROUTE_CATALOG_TTL_SECONDS,
+    ROUTE_CATALOG_CHECK_INTERVAL,
+    DAILY_TREND_FRESHNESS_DAYS,
+    ROUTE_STREAM_FETCH_SIZE,
+    ROUTE_STREAM_BATCH_SIZE,
+    ROUTE_STREAM_WORKERS,
+    GRAPH_SALES_BATCH_SIZE,
+    MONGO_INDEX_PROFILE,
+    INDEX_BUILD_POLL_INTERVAL,
+    SALES_TIMEZONE,
+    TIMESERIES_GRANULARITY,
+    TIMESERIES_BATCH_SIZE,
+    CHART_MAX_POINTS,
+    SNAPSHOT_DIR,
+    MMAP_INDEX_DIR,
     DEBUG_MODE
 )
 
@@ -27,5 +48,26 @@ __all__ = [
     'NEO4J_PASSWORD',
     'MONGO_URI',
     'MONGO_DB_NAME',
+    'MONGO_MAX_POOL_SIZE',
+    'MONGO_MIN_POOL_SIZE',
+    'NEO4J_MAX_POOL_SIZE',
+    'CONNECTION_HEALTH_CHECK_INTERVAL',
+    'QUERY_CACHE_MAX_ENTRIES',
+    'QUERY_CACHE_TTL_SECONDS',
+    'ROUTE_CATALOG_TTL_SECONDS',
+    'ROUTE_CATALOG_CHECK_INTERVAL',
+    'DAILY_TREND_FRESHNESS_DAYS',
+    'ROUTE_STREAM_FETCH_SIZE',
+    'ROUTE_STREAM_BATCH_SIZE',
+    'ROUTE_STREAM_WORKERS',
+    'GRAPH_SALES_BATCH_SIZE',
+    'MONGO_INDEX_PROFILE',
+    'INDEX_BUILD_POLL_INTERVAL',
+    'SALES_TIMEZONE',
+    'TIMESERIES_GRANULARITY',
+    'TIMESERIES_BATCH_SIZE',
+    'CHART_MAX_POINTS',
+    'SNAPSHOT_DIR',
+    'MMAP_INDEX_DIR',
     'DEBUG_MODE'
 ]
@@ -21,10 +21,55 @@ MONGO_URI = os.getenv(
 )
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ticketing")
 
+# Connection Pool Configuration
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+CONNECTION_HEALTH_CHECK_INTERVAL = float(os.getenv("CONNECTION_HEALTH_CHECK_INTERVAL", "30"))
+
+# Query Result Cache Configuration
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "64"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
+# Route Catalog Configuration
+ROUTE_CATALOG_TTL_SECONDS = float(os.getenv("ROUTE_CATALOG_TTL_SECONDS", "86400"))
+ROUTE_CATALOG_CHECK_INTERVAL = float(os.getenv("ROUTE_CATALOG_CHECK_INTERVAL", "300"))
+
+# Incremental Daily Trend Store Configuration
+DAILY_TREND_FRESHNESS_DAYS = int(os.getenv("DAILY_TREND_FRESHNESS_DAYS", "2"))
+
+# Full-Graph Route Streaming Configuration
+ROUTE_STREAM_FETCH_SIZE = int(os.getenv("ROUTE_STREAM_FETCH_SIZE", "1000"))
+ROUTE_STREAM_BATCH_SIZE = int(os.getenv("ROUTE_STREAM_BATCH_SIZE", "500"))
+ROUTE_STREAM_WORKERS = int(os.getenv("ROUTE_STREAM_WORKERS", "4"))
+
+# Graph Sales Write-Back Configuration
+GRAPH_SALES_BATCH_SIZE = int(os.getenv("GRAPH_SALES_BATCH_SIZE", "1000"))
+
+# MongoDB Index Configuration
+MONGO_INDEX_PROFILE = os.getenv("MONGO_INDEX_PROFILE", "basic")
+INDEX_BUILD_POLL_INTERVAL = float(os.getenv("INDEX_BUILD_POLL_INTERVAL", "2"))
+
+# Period Rollup Configuration
+# Market timezone that hours, days, weeks and months are cut in
+SALES_TIMEZONE = os.getenv("SALES_TIMEZONE", "Asia/Jakarta")
+
+# Time-Series Orders Copy Configuration
+TIMESERIES_GRANULARITY = os.getenv("TIMESERIES_GRANULARITY", "hours")
+TIMESERIES_BATCH_SIZE = int(os.getenv("TIMESERIES_BATCH_SIZE", "10000"))
+
+# Dashboard Rendering Configuration
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1200"))
+
+# Local Columnar Snapshot Configuration
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshot")
+MMAP_INDEX_DIR = os.getenv("MMAP_INDEX_DIR", "data/mmap_index")
+
 # Application Configuration
 APP_TITLE = "Flight Ticket Sales & Performance Analysis Dashboard"
 APP_ICON = "chart_with_upwards_trend"
 PAGE_LAYOUT = "wide"
+DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() in ("1", "true", "yes")
 
 # Default Analysis Period
 DEFAULT_START_DATE = "2023-03-10"
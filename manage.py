@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+"""
+Flight Sales Dashboard Maintenance Commands
+Headless entry point for jobs that should not run inside a Streamlit rerun
+
+Usage:
+    python manage.py build-rollup [--start YYYY-MM-DD --end YYYY-MM-DD]
+    python manage.py build-period-rollups [--start YYYY-MM-DD --end YYYY-MM-DD --timezone TZ]
+    python manage.py bench-route-match --start YYYY-MM-DD --end YYYY-MM-DD
+    python manage.py verify-indexes --start YYYY-MM-DD --end YYYY-MM-DD
+                                    [--source orders|rollup|timeseries]
+    python manage.py build-indexes [--profile basic|covered] [--drop]
+    python manage.py benchmark --start YYYY-MM-DD --end YYYY-MM-DD [--repeats N --warmup N
+                               --strategy NAME ... --output report.json]
+    python manage.py build-timeseries [--start YYYY-MM-DD --end YYYY-MM-DD --batch-size N]
+    python manage.py bench-timeseries --start YYYY-MM-DD --end YYYY-MM-DD [--repeats N
+                                      --output report.json]
+    python manage.py export-snapshot [--start YYYY-MM-DD --end YYYY-MM-DD --path DIR]
+    python manage.py build-mmap-index [--path DIR]
+    python manage.py sync-graph-sales [--start YYYY-MM-DD --end YYYY-MM-DD --batch-size N]
+    python manage.py generate --orders N --start YYYY-MM-DD --end YYYY-MM-DD [--airports N
+                              --routes-per-airport N --workers N --batch-size N --seed N
+                              --timeseries --drop]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, time as dt_time
+
+from src.core.database import init_connections
+from src.core.rollup import refresh_daily_route_rollup
+from src.core.periods import refresh_period_rollups
+from src.core.analytics import fetch_routes, route_pairs_from_frame, OPTIMIZED_ROUTES_QUERY
+from src.core.analytics import SOURCE_ORDERS, SOURCE_ROLLUP, SOURCE_TIMESERIES
+from src.core.profiling import compare_route_match_strategies, verify_index_coverage
+from src.core.benchmark import (
+    STRATEGIES, run_benchmark, write_report, format_report, compare_timeseries_storage
+)
+from src.core.timeseries import refresh_orders_timeseries
+from src.core.datagen import generate_dataset, clear_dataset
+from src.core.database import MONGO_INDEX_PROFILES
+from src.core.index_manager import IndexManager, STATE_FAILED
+from src.core.snapshot import export_orders_snapshot
+from src.core.mmap_index import build_mmap_index
+from src.core.graph_sales import sync_route_sales_to_graph
+from config.config import (
+    SNAPSHOT_DIR, MMAP_INDEX_DIR, GRAPH_SALES_BATCH_SIZE, MONGO_INDEX_PROFILE,
+    INDEX_BUILD_POLL_INTERVAL, TIMESERIES_BATCH_SIZE, SALES_TIMEZONE
+)
+
+
+def _parse_range(args):
+    """Convert --start/--end arguments to the datetimes used by analytics"""
+    if not args.start and not args.end:
+        return None, None
+    if not args.start or not args.end:
+        raise SystemExit("--start and --end must be given together")
+    start_date = datetime.combine(datetime.strptime(args.start, "%Y-%m-%d").date(), dt_time.min)
+    end_date = datetime.combine(datetime.strptime(args.end, "%Y-%m-%d").date(), dt_time.max)
+    return start_date, end_date
+
+
+def _add_range_arguments(parser):
+    parser.add_argument("--start", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="End date (YYYY-MM-DD)")
+
+
+def cmd_build_rollup(args):
+    """Build or refresh the daily_route_sales rollup"""
+    start_date, end_date = _parse_range(args)
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        count = refresh_daily_route_rollup(mongo_db, start_date, end_date)
+        scope = f"{args.start} - {args.end}" if start_date else "all days"
+        print(f"daily_route_sales refreshed ({scope}): {count:,} documents")
+    finally:
+        driver.close()
+        mongo_client.close()
+    return 0
+
+
+def cmd_build_period_rollups(args):
+    """Build or refresh the hourly, daily, weekly and monthly sales_by_period levels"""
+    start_date, end_date = _parse_range(args)
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        counts = refresh_period_rollups(mongo_db, start_date, end_date, args.timezone)
+        scope = f"{args.start} - {args.end}" if start_date else "all periods"
+        print(f"sales_by_period refreshed ({scope}, {args.timezone}): " +
+              ", ".join(f"{count:,} {level}s" for level, count in counts.items()))
+    finally:
+        driver.close()
+        mongo_client.close()
+    return 0
+
+
+def cmd_bench_route_match(args):
+    """Compare documents scanned by the cross-product and exact-pair route filters"""
+    start_date, end_date = _parse_range(args)
+    if start_date is None:
+        raise SystemExit("bench-route-match requires --start and --end")
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        df_routes, _ = fetch_routes(driver, OPTIMIZED_ROUTES_QUERY)
+        report = compare_route_match_strategies(
+            mongo_db["orders"], route_pairs_from_frame(df_routes), start_date, end_date
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"{'strategy':<15}{'routes':>8}{'groups':>8}{'keys examined':>16}"
+          f"{'docs examined':>16}{'time (s)':>10}  indexes")
+    for row in report:
+        print(f"{row['strategy']:<15}{row['routes_requested']:>8}{row['route_groups']:>8}"
+              f"{row['keys_examined']:>16,}{row['docs_examined']:>16,}{row['query_time']:>10.4f}"
+              f"  {', '.join(row['indexes_used']) or '-'}")
+    return 0
+
+
+def cmd_verify_indexes(args):
+    """Explain every analytics pipeline and report whether it runs index-only"""
+    start_date, end_date = _parse_range(args)
+    if start_date is None:
+        raise SystemExit("verify-indexes requires --start and --end")
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        df_routes, _ = fetch_routes(driver, OPTIMIZED_ROUTES_QUERY)
+        report = verify_index_coverage(
+            mongo_db["orders"], start_date, end_date, route_pairs_from_frame(df_routes),
+            args.source
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"{'pipeline':<28}{'covered':>9}{'keys examined':>16}{'docs examined':>16}  plan")
+    for name, row in report.items():
+        if "error" in row:
+            print(f"{name:<28}{'error':>9}  {row['error']}")
+            continue
+        print(f"{name:<28}{'yes' if row['covered'] else 'NO':>9}{row['keys_examined']:>16,}"
+              f"{row['docs_examined']:>16,}  {row['winning_plan'] or '-'}")
+    return 0 if all(row["covered"] for row in report.values()) else 1
+
+
+def cmd_build_indexes(args):
+    """Reconcile the indexes with a profile, printing per-index progress"""
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    manager = IndexManager()
+    try:
+        manager.start(mongo_db, driver, args.profile, drop_all=args.drop)
+        reported = {}
+        while True:
+            busy = manager.busy
+            manager.poll(mongo_db)
+            for task in manager.status():
+                line = f"{task['engine']:<8}{task['collection'] or '-':<20}{task['name']:<30}" \
+                       f"{task['action']:<9}{task['state']}"
+                if task['progress'] is not None and task['state'] != "done":
+                    line += f" {task['progress']:.0f}%"
+                if task['error']:
+                    line += f": {task['error']}"
+                if reported.get(task['name']) != line:
+                    reported[task['name']] = line
+                    print(line)
+            if not busy:
+                break
+            time.sleep(INDEX_BUILD_POLL_INTERVAL)
+    finally:
+        driver.close()
+        mongo_client.close()
+    return 1 if any(task['state'] == STATE_FAILED for task in manager.status()) else 0
+
+
+def cmd_benchmark(args):
+    """Time the analytics scenarios repeatedly and write a JSON report"""
+    start_date, end_date = _parse_range(args)
+    if start_date is None:
+        raise SystemExit("benchmark requires --start and --end")
+    if args.repeats < 1:
+        raise SystemExit("--repeats must be at least 1")
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        report = run_benchmark(
+            mongo_db, driver, start_date, end_date,
+            strategies=args.strategy, repeats=args.repeats, warmup=args.warmup
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    write_report(report, args.output)
+    print(format_report(report))
+    print(f"\nReport written to {args.output}")
+    return 0
+
+
+def cmd_build_timeseries(args):
+    """Build or refresh the orders_ts time-series copy of orders"""
+    start_date, end_date = _parse_range(args)
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        start_time = time.time()
+        count = refresh_orders_timeseries(mongo_db, start_date, end_date, args.batch_size)
+    finally:
+        driver.close()
+        mongo_client.close()
+    print(f"Time-series copy refreshed: {count:,} measurements in {time.time() - start_time:.1f}s")
+    return 0
+
+
+def cmd_bench_timeseries(args):
+    """Compare storage and pipeline latency of orders and orders_ts"""
+    start_date, end_date = _parse_range(args)
+    if start_date is None:
+        raise SystemExit("bench-timeseries requires --start and --end")
+    if args.repeats < 1:
+        raise SystemExit("--repeats must be at least 1")
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        df_routes, _ = fetch_routes(driver, OPTIMIZED_ROUTES_QUERY)
+        report = compare_timeseries_storage(
+            mongo_db, start_date, end_date, route_pairs_from_frame(df_routes), args.repeats
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"{'collection':<12}{'documents':>12}{'data (MB)':>12}{'storage (MB)':>14}"
+          f"{'indexes (MB)':>14}")
+    for source, storage in report["storage"].items():
+        print(f"{source:<12}{storage['documents']:>12,}{storage['size_bytes'] / 2**20:>12.1f}"
+              f"{storage['storage_bytes'] / 2**20:>14.1f}{storage['index_bytes'] / 2**20:>14.1f}")
+    print(f"\n{'pipeline':<28}{'orders (s)':>12}{'timeseries (s)':>16}{'speedup':>10}")
+    for name, row in report["queries"].items():
+        print(f"{name:<28}{row[SOURCE_ORDERS]['median']:>12.4f}"
+              f"{row[SOURCE_TIMESERIES]['median']:>16.4f}{row['speedup']['speedup']:>9.2f}x")
+    write_report(report, args.output)
+    print(f"\nReport written to {args.output}")
+    return 0
+
+
+def cmd_export_snapshot(args):
+    """Export orders to the local columnar snapshot"""
+    start_date, end_date = _parse_range(args)
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        metadata = export_orders_snapshot(mongo_db["orders"], args.path, start_date, end_date)
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"Snapshot written to {args.path}: {metadata['rows']:,} orders "
+          f"({metadata['first_depart_date']} - {metadata['last_depart_date']})")
+    return 0
+
+
+def cmd_build_mmap_index(args):
+    """Build the memory-mapped order arrays"""
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        metadata = build_mmap_index(mongo_db["orders"], args.path)
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"Memory-mapped index written to {args.path}: {metadata['rows']:,} orders, "
+          f"{len(metadata['routes']):,} routes ({metadata['first_day']} - {metadata['last_day']})")
+    return 0
+
+
+def cmd_sync_graph_sales(args):
+    """Write monthly route sales onto the CONNECTED_TO relationships"""
+    start_date, end_date = _parse_range(args)
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        stats = sync_route_sales_to_graph(
+            mongo_db, driver, start_date, end_date, batch_size=args.batch_size
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    months = stats["months"]
+    scope = f"{months[0]} - {months[-1]}" if months else "no orders"
+    print(f"Graph sales synced ({scope}): {stats['rows']:,} route-months, "
+          f"{stats['updated']:,} relationships updated in {stats['batches']:,} batches, "
+          f"{stats['unmatched']:,} route-months without a CONNECTED_TO edge")
+    return 0
+
+
+def cmd_generate(args):
+    """Generate a synthetic orders / flight_prices / airport graph dataset"""
+    start_date, end_date = _parse_range(args)
+    if start_date is None:
+        raise SystemExit("generate requires --start and --end")
+    driver, mongo_client, mongo_db = init_connections()
+    if mongo_client is None:
+        return 1
+    try:
+        if args.drop:
+            clear_dataset(mongo_db, driver)
+        summary = generate_dataset(
+            mongo_db, driver, args.orders, start_date, end_date,
+            airports=args.airports,
+            routes_per_airport=args.routes_per_airport,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            seed=args.seed,
+            with_flight_prices=not args.no_flight_prices,
+            with_timeseries=args.timeseries
+        )
+    finally:
+        driver.close()
+        mongo_client.close()
+    
+    print(f"Graph: {summary['airports']:,} airports, {summary['routes']:,} routes "
+          f"in {summary['graph_time']:.1f}s")
+    print(f"Orders: {summary['orders']:,} in {summary['orders_time']:.1f}s "
+          f"({summary['orders'] / max(summary['orders_time'], 1e-9):,.0f} docs/s)")
+    if 'flight_prices' in summary:
+        print(f"Flight prices: {summary['flight_prices']:,} in {summary['flight_prices_time']:.1f}s")
+    return 0
+
+
+def build_parser():
+    """Build the argument parser with one sub-command per job"""
+    parser = argparse.ArgumentParser(description="Flight Sales Dashboard maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    rollup_parser = subparsers.add_parser(
+        "build-rollup", help="Build or refresh the daily_route_sales rollup collection"
+    )
+    _add_range_arguments(rollup_parser)
+    rollup_parser.set_defaults(func=cmd_build_rollup)
+    
+    period_parser = subparsers.add_parser(
+        "build-period-rollups",
+        help="Build or refresh the hourly, daily, weekly and monthly sales_by_period levels"
+    )
+    _add_range_arguments(period_parser)
+    period_parser.add_argument("--timezone", default=SALES_TIMEZONE,
+                               help=f"Timezone the periods are cut in (default: {SALES_TIMEZONE})")
+    period_parser.set_defaults(func=cmd_build_period_rollups)
+    
+    route_match_parser = subparsers.add_parser(
+        "bench-route-match",
+        help="Compare scanned documents of the cross-product and exact-pair route filters"
+    )
+    _add_range_arguments(route_match_parser)
+    route_match_parser.set_defaults(func=cmd_bench_route_match)
+    
+    verify_parser = subparsers.add_parser(
+        "verify-indexes",
+        help="Explain the analytics pipelines and report whether each is index-only"
+    )
+    _add_range_arguments(verify_parser)
+    verify_parser.add_argument("--source",
+                               choices=[SOURCE_ORDERS, SOURCE_ROLLUP, SOURCE_TIMESERIES],
+                               default=SOURCE_ORDERS,
+                               help="Collection the pipelines run against (default: orders)")
+    verify_parser.set_defaults(func=cmd_verify_indexes)
+    
+    indexes_parser = subparsers.add_parser(
+        "build-indexes", help="Create or drop the managed indexes, reporting build progress"
+    )
+    indexes_parser.add_argument("--profile", choices=sorted(MONGO_INDEX_PROFILES),
+                                default=MONGO_INDEX_PROFILE,
+                                help=f"MongoDB index profile (default: {MONGO_INDEX_PROFILE})")
+    indexes_parser.add_argument("--drop", action="store_true",
+                                help="Drop every managed index instead")
+    indexes_parser.set_defaults(func=cmd_build_indexes)
+    
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Time the analytics scenarios and write a JSON report"
+    )
+    _add_range_arguments(benchmark_parser)
+    benchmark_parser.add_argument("--repeats", type=int, default=10,
+                                  help="Measured runs per strategy (default: 10)")
+    benchmark_parser.add_argument("--warmup", type=int, default=2,
+                                  help="Discarded warm-up runs per strategy (default: 2)")
+    benchmark_parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES),
+                                  help="Strategy to run, repeatable (default: all)")
+    benchmark_parser.add_argument("--output", default="benchmark_report.json",
+                                  help="JSON report path (default: benchmark_report.json)")
+    benchmark_parser.set_defaults(func=cmd_benchmark)
+    
+    timeseries_parser = subparsers.add_parser(
+        "build-timeseries", help="Build or refresh the orders_ts time-series copy of orders"
+    )
+    _add_range_arguments(timeseries_parser)
+    timeseries_parser.add_argument(
+        "--batch-size", type=int, default=TIMESERIES_BATCH_SIZE,
+        help=f"Measurements per insert_many call (default: {TIMESERIES_BATCH_SIZE})"
+    )
+    timeseries_parser.set_defaults(func=cmd_build_timeseries)
+    
+    bench_timeseries_parser = subparsers.add_parser(
+        "bench-timeseries",
+        help="Compare storage size and pipeline latency of orders and its time-series copy"
+    )
+    _add_range_arguments(bench_timeseries_parser)
+    bench_timeseries_parser.add_argument("--repeats", type=int, default=5,
+                                         help="Measured runs per pipeline (default: 5)")
+    bench_timeseries_parser.add_argument("--output", default="timeseries_report.json",
+                                         help="JSON report path (default: timeseries_report.json)")
+    bench_timeseries_parser.set_defaults(func=cmd_bench_timeseries)
+    
+    snapshot_parser = subparsers.add_parser(
+        "export-snapshot", help="Export orders to the local Parquet snapshot"
+    )
+    _add_range_arguments(snapshot_parser)
+    snapshot_parser.add_argument("--path", default=SNAPSHOT_DIR,
+                                 help=f"Snapshot directory (default: {SNAPSHOT_DIR})")
+    snapshot_parser.set_defaults(func=cmd_export_snapshot)
+    
+    mmap_parser = subparsers.add_parser(
+        "build-mmap-index", help="Build the memory-mapped order arrays"
+    )
+    mmap_parser.add_argument("--path", default=MMAP_INDEX_DIR,
+                             help=f"Index directory (default: {MMAP_INDEX_DIR})")
+    mmap_parser.set_defaults(func=cmd_build_mmap_index)
+    
+    graph_sales_parser = subparsers.add_parser(
+        "sync-graph-sales", help="Write monthly route sales onto CONNECTED_TO relationships"
+    )
+    _add_range_arguments(graph_sales_parser)
+    graph_sales_parser.add_argument(
+        "--batch-size", type=int, default=GRAPH_SALES_BATCH_SIZE,
+        help=f"Route-months per UNWIND write (default: {GRAPH_SALES_BATCH_SIZE})"
+    )
+    graph_sales_parser.set_defaults(func=cmd_sync_graph_sales)
+    
+    generate_parser = subparsers.add_parser(
+        "generate", help="Generate a synthetic dataset at configurable scale"
+    )
+    _add_range_arguments(generate_parser)
+    generate_parser.add_argument("--orders", type=int, required=True, help="Number of orders")
+    generate_parser.add_argument("--airports", type=int, default=40,
+                                 help="Number of Airport nodes (default: 40)")
+    generate_parser.add_argument("--routes-per-airport", type=int, default=6,
+                                 help="Outgoing routes chosen per airport (default: 6)")
+    generate_parser.add_argument("--batch-size", type=int, default=10000,
+                                 help="Documents per bulk insert (default: 10000)")
+    generate_parser.add_argument("--workers", type=int, default=4,
+                                 help="Parallel writer processes (default: 4)")
+    generate_parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    generate_parser.add_argument("--no-flight-prices", action="store_true",
+                                 help="Skip the flight_prices collection")
+    generate_parser.add_argument("--timeseries", action="store_true",
+                                 help="Also write the orders_ts time-series copy")
+    generate_parser.add_argument("--drop", action="store_true",
+                                 help="Delete existing orders, flight_prices and airports first")
+    generate_parser.set_defaults(func=cmd_generate)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,42 @@
 """
 Core module containing database operations and analytics functions
+The database drivers are imported from src.core.database directly; the
+analytics and rollup exports are imported on first access, so importing a
+light submodule such as src.core.tracing does not load pymongo, neo4j or
+pandas
 """
 
-from .database import (
-    init_connections,
-    create_mongodb_indexes,
-    drop_mongodb_indexes,
-    create_neo4j_indexes,
-    drop_neo4j_indexes
-)
+import importlib
+
+from .cache import QueryCache, query_cache
+from .route_catalog import RouteCatalog, route_catalog
+
+# Export -> submodule, imported by __getattr__ on first access
+_LAZY_EXPORTS = {
+    'run_scenario_without_optimization': '.analytics',
+    'run_scenario_with_optimization': '.analytics',
+    'generate_insights': '.analytics',
+    'run_cached': '.analytics',
+    'refresh_daily_route_rollup': '.rollup'
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
 
-from .analytics import (
-    run_scenario_without_optimization,
-    run_scenario_with_optimization,
-    generate_insights
-)
 
 __all__ = [
-    'init_connections',
-    'create_mongodb_indexes',
-    'drop_mongodb_indexes',
-    'create_neo4j_indexes',
-    'drop_neo4j_indexes',
     'run_scenario_without_optimization',
     'run_scenario_with_optimization',
-    'generate_insights'
+    'generate_insights',
+    'run_cached',
+    'refresh_daily_route_rollup',
+    'QueryCache',
+    'query_cache',
+    'RouteCatalog',
+    'route_catalog'
 ]
@@ -3,24 +3,152 @@ Analytics module
 Handles data analysis queries and business insights generation
 """
 
-import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 import pandas as pd
 import streamlit as st
 
+from config.config import (
+    ROUTE_STREAM_FETCH_SIZE, ROUTE_STREAM_BATCH_SIZE, ROUTE_STREAM_WORKERS, SALES_TIMEZONE
+)
+from .cache import query_cache
+from .loader import load_frame, load_stats
+from .tracing import span, traced, current_span, submit_in_context
+from .graph_sales import GRAPH_REVENUE_QUERY, graph_revenue_parameters
+from .insight_stats import InsightAccumulator, summarize_results
+from .rollup import (
+    ROLLUP_COLLECTION,
+    day_bounds,
+    rollup_total_pipeline,
+    rollup_daily_pipeline,
+    rollup_route_batch_pipeline
+)
+from .timeseries import TIMESERIES_COLLECTION, timeseries_field
+from .periods import (
+    PERIOD_ROLLUP_COLLECTION,
+    GRANULARITY_DAY,
+    build_period_pipeline,
+    period_rollup_pipeline
+)
+
+# Data sources the analytics pipelines can be answered from
+SOURCE_ORDERS = "orders"
+SOURCE_ROLLUP = "rollup"
+SOURCE_SNAPSHOT = "snapshot"
+SOURCE_MMAP = "mmap"
+SOURCE_TIMESERIES = "timeseries"
+
+# Sources answered by a MongoDB collection or in-process instead
+MONGO_SOURCES = (SOURCE_ORDERS, SOURCE_ROLLUP, SOURCE_TIMESERIES)
+LOCAL_SOURCES = (SOURCE_SNAPSHOT, SOURCE_MMAP)
+
+# How the optimized scenario picks the routes it reports
+ROUTE_RANKING_DISTANCE = "distance"
+ROUTE_RANKING_SALES = "sales"
+ROUTE_RANKING_ALL = "all"
+ROUTE_RANKING_GRAPH = "graph"
+TOP_ROUTES_LIMIT = 50
+
+# Result columns of the analytics queries: output column -> document field
+DAILY_COLUMNS = {"date": "_id", "daily_sales": "daily_sales", "daily_orders": "daily_orders"}
+PERIOD_COLUMNS = {"period": "_id", "sales": "sales", "orders": "orders"}
+ROUTE_COLUMNS = {
+    "origin": "origin",
+    "destination": "destination",
+    "distance_km": "distance_km",
+    "flight_time_hr": "flight_time_hr"
+}
+GRAPH_REVENUE_COLUMNS = {
+    **ROUTE_COLUMNS,
+    "total_sales": "total_sales",
+    "total_orders": "total_orders"
+}
+ROUTE_SALES_COLUMNS = {
+    "origin": "_id.origin",
+    "destination": "_id.destination",
+    "total_sales": "total_sales",
+    "total_orders": "total_orders"
+}
+
+# Strategies for restricting the batch route query to the requested routes
+ROUTE_MATCH_PAIRS = "pairs"
+ROUTE_MATCH_CROSS_PRODUCT = "cross_product"
+
+
+def _source_collection(orders_collection, source):
+    """Return the collection that serves the given data source"""
+    if source == SOURCE_ROLLUP:
+        return orders_collection.database[ROLLUP_COLLECTION]
+    if source == SOURCE_TIMESERIES:
+        return orders_collection.database[TIMESERIES_COLLECTION]
+    if source != SOURCE_ORDERS and source not in LOCAL_SOURCES:
+        raise ValueError(f"Unknown analytics source: {source}")
+    return orders_collection
+
+
+def _local_engine(source):
+    """Return the local engine serving the given source, or None for MongoDB sources"""
+    if source == SOURCE_SNAPSHOT:
+        from .snapshot import get_snapshot_engine
+        return get_snapshot_engine()
+    if source == SOURCE_MMAP:
+        from .mmap_index import get_mmap_index
+        return get_mmap_index()
+    return None
+
 
-def get_sales_by_date(orders_collection, start_date, end_date):
+def _route_fields(source):
+    """Document paths of origin and destination in the collection serving a source"""
+    if source == SOURCE_TIMESERIES:
+        return timeseries_field("origin"), timeseries_field("destination")
+    return "origin", "destination"
+
+
+def build_total_pipeline(start_date, end_date, source=SOURCE_ORDERS):
     """
-    Calculate daily sales aggregates within a specified date range
+    Build the total sales aggregation pipeline
     
     Args:
-        orders_collection: MongoDB orders collection
         start_date: Start date (datetime object)
         end_date: End date (datetime object)
-        
+        source: "orders", "rollup" or "timeseries"
+    
     Returns:
-        tuple: (DataFrame with daily sales, query execution time in seconds)
+        list: Aggregation pipeline producing total_sales and total_orders
+    """
+    if source == SOURCE_ROLLUP:
+        return rollup_total_pipeline(start_date, end_date)
+    
+    return [
+        {"$match": {"depart_date": {"$gte": start_date, "$lte": end_date}}},
+        {
+            "$group": {
+                "_id": None,
+                "total_sales": {"$sum": "$total_price"},
+                "total_orders": {"$sum": 1}
+            }
+        }
+    ]
+
+
+def build_daily_pipeline(start_date, end_date, source=SOURCE_ORDERS):
     """
-    pipeline_daily = [
+    Build the daily sales trend aggregation pipeline
+    
+    Args:
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: "orders", "rollup" or "timeseries"
+    
+    Returns:
+        list: Aggregation pipeline producing one document per day
+    """
+    if source == SOURCE_ROLLUP:
+        return rollup_daily_pipeline(start_date, end_date)
+    
+    return [
         {
             "$match": {
                 "depart_date": {
@@ -45,24 +173,352 @@ def get_sales_by_date(orders_collection, start_date, end_date):
             "$sort": {"_id": 1}
         }
     ]
+
+
+def build_single_route_pipeline(origin, destination, start_date, end_date):
+    """
+    Build the per-route sales pipeline of the unoptimized scenario
+    
+    Returns:
+        list: Aggregation pipeline producing total_sales and total_orders
+    """
+    return [
+        {
+            "$match": {
+                "origin": origin,
+                "destination": destination,
+                "depart_date": {"$gte": start_date, "$lte": end_date}
+            }
+        },
+        {
+            "$group": {
+                "_id": None,
+                "total_sales": {"$sum": "$total_price"},
+                "total_orders": {"$sum": 1}
+            }
+        }
+    ]
+
+
+def build_route_match(route_pairs, start_date, end_date, source=SOURCE_ORDERS,
+                      route_match=ROUTE_MATCH_PAIRS):
+    """
+    Build the $match filter selecting sales of the requested routes
+    
+    "pairs" matches each (origin, destination) pair exactly with one $or
+    branch per route, so every branch is an equality-plus-range scan on
+    idx_origin_dest_date. "cross_product" matches origin $in and
+    destination $in, which also selects every unrequested combination of
+    those airports. On the time-series source the route lives in the
+    metaField, so the filter is on meta.origin and meta.destination.
+    
+    Args:
+        route_pairs: List of (origin, destination) tuples
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: "orders", "rollup" or "timeseries"
+        route_match: "pairs" or "cross_product"
     
-    start_time = time.time()
-    res_daily = list(orders_collection.aggregate(pipeline_daily))
-    execution_time = time.time() - start_time
+    Returns:
+        dict: $match filter
+    """
+    if source == SOURCE_ROLLUP:
+        date_field = "day"
+        date_range = dict(zip(("$gte", "$lte"), day_bounds(start_date, end_date)))
+    else:
+        date_field = "depart_date"
+        date_range = {"$gte": start_date, "$lte": end_date}
+    origin_field, destination_field = _route_fields(source)
     
-    df_daily = pd.DataFrame([{
-        "date": doc["_id"],
-        "daily_sales": doc["daily_sales"],
-        "daily_orders": doc["daily_orders"]
-    } for doc in res_daily])
+    if route_match == ROUTE_MATCH_CROSS_PRODUCT:
+        return {
+            date_field: date_range,
+            origin_field: {"$in": sorted({origin for origin, _ in route_pairs})},
+            destination_field: {"$in": sorted({destination for _, destination in route_pairs})}
+        }
+    if route_match != ROUTE_MATCH_PAIRS:
+        raise ValueError(f"Unknown route match strategy: {route_match}")
+    
+    return {
+        "$or": [
+            {origin_field: origin, destination_field: destination, date_field: date_range}
+            for origin, destination in route_pairs
+        ]
+    }
+
+
+def build_route_batch_pipeline(start_date, end_date, route_pairs, source=SOURCE_ORDERS,
+                               route_match=ROUTE_MATCH_PAIRS):
+    """
+    Build the batch route sales aggregation pipeline
+    
+    Args:
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        route_pairs: List of (origin, destination) tuples to include
+        source: "orders", "rollup" or "timeseries"
+        route_match: "pairs" or "cross_product", see build_route_match()
+    
+    Returns:
+        list: Aggregation pipeline grouped by origin and destination
+    """
+    route_filter = build_route_match(route_pairs, start_date, end_date, source, route_match)
+    if source == SOURCE_ROLLUP:
+        return rollup_route_batch_pipeline(route_filter)
+    
+    origin_field, destination_field = _route_fields(source)
+    return [
+        {"$match": route_filter},
+        {
+            "$group": {
+                "_id": {"origin": f"${origin_field}", "destination": f"${destination_field}"},
+                "total_sales": {"$sum": "$total_price"},
+                "total_orders": {"$sum": 1}
+            }
+        }
+    ]
+
+
+def build_top_routes_pipeline(start_date, end_date, limit=TOP_ROUTES_LIMIT, source=SOURCE_ORDERS):
+    """
+    Build the pipeline ranking all routes by revenue within a date range
+    
+    Only the date range is matched, so the scan can use the depart_date
+    index (or the rollup's day index), and $sort + $limit keep just the
+    top routes in memory while grouping.
+    
+    Args:
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        limit: Number of routes to return
+        source: "orders", "rollup" or "timeseries"
+    
+    Returns:
+        list: Aggregation pipeline producing the top routes by total_sales
+    """
+    if source == SOURCE_ROLLUP:
+        day_start, day_end = day_bounds(start_date, end_date)
+        pipeline = rollup_route_batch_pipeline({"day": {"$gte": day_start, "$lte": day_end}})
+    else:
+        origin_field, destination_field = _route_fields(source)
+        pipeline = [
+            {"$match": {"depart_date": {"$gte": start_date, "$lte": end_date}}},
+            {
+                "$group": {
+                    "_id": {"origin": f"${origin_field}", "destination": f"${destination_field}"},
+                    "total_sales": {"$sum": "$total_price"},
+                    "total_orders": {"$sum": 1}
+                }
+            }
+        ]
+    return pipeline + [
+        {"$sort": {"total_sales": -1, "_id.origin": 1, "_id.destination": 1}},
+        {"$limit": limit}
+    ]
+
+
+def get_sales_by_date(orders_collection, start_date, end_date, source=SOURCE_ORDERS):
+    """
+    Calculate daily sales aggregates within a specified date range
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: "orders" to scan raw orders, "rollup" to read daily_route_sales,
+            "timeseries" to scan the orders_ts time-series copy, "snapshot"
+            to scan the local columnar snapshot, "mmap" to reduce the
+            memory-mapped order arrays
+    
+    Returns:
+        tuple: (DataFrame with daily sales, query execution time in seconds)
+    """
+    engine = _local_engine(source)
+    if engine is not None:
+        with span("local.daily_trend", source=source) as stage:
+            df_daily = engine.sales_by_date(start_date, end_date)
+        return df_daily, stage.duration
+    
+    collection = _source_collection(orders_collection, source)
+    pipeline_daily = build_daily_pipeline(start_date, end_date, source)
+    
+    with span("mongo.daily_trend", source=source) as stage:
+        df_daily = load_frame(collection.aggregate(pipeline_daily), DAILY_COLUMNS)
     
     if not df_daily.empty:
-        df_daily['date'] = pd.to_datetime(df_daily['date'])
+        with span("pandas.to_datetime"):
+            df_daily['date'] = pd.to_datetime(df_daily['date'])
+    
+    return df_daily, stage.duration
+
+
+def get_sales_by_period(orders_collection, start_date, end_date, granularity=GRANULARITY_DAY,
+                        timezone=SALES_TIMEZONE, source=SOURCE_ORDERS):
+    """
+    Calculate sales per hour, day, week or month in a market timezone
+    
+    The range is read as wall-clock time in the timezone and widened to
+    whole periods. Periods are cut by $dateTrunc, so no date strings are
+    formatted on the server or parsed here.
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        granularity: "hour", "day", "week" (ISO, from Monday) or "month"
+        timezone: IANA timezone name, e.g. "Asia/Jakarta"
+        source: "orders" or "timeseries" to scan orders, "rollup" to read
+            the granularity's level of the sales_by_period pyramid
+    
+    Returns:
+        tuple: (DataFrame with period start in timezone, sales and orders,
+            query execution time in seconds)
+    """
+    if source in LOCAL_SOURCES:
+        raise ValueError(f"Sales by period needs a MongoDB source, not: {source}")
+    if source == SOURCE_ROLLUP:
+        collection = orders_collection.database[PERIOD_ROLLUP_COLLECTION]
+        pipeline = period_rollup_pipeline(start_date, end_date, granularity, timezone)
+    else:
+        collection = _source_collection(orders_collection, source)
+        pipeline = build_period_pipeline(start_date, end_date, granularity, timezone)
+    
+    with span("mongo.sales_by_period", source=source, granularity=granularity) as stage:
+        df_period = load_frame(collection.aggregate(pipeline), PERIOD_COLUMNS)
+    
+    if not df_period.empty:
+        # Bucket starts come back as naive UTC datetimes
+        df_period['period'] = pd.to_datetime(df_period['period'], utc=True).dt.tz_convert(timezone)
+    
+    return df_period, stage.duration
+
+
+# Baseline route query: the longest routes
+BASELINE_ROUTES_QUERY = """
+    MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
+    RETURN a.airport_code AS origin, b.airport_code AS destination, 
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
+    ORDER BY r.distance_km DESC LIMIT 50
+"""
+
+# Optimized route query: long routes with a known flight time
+OPTIMIZED_ROUTES_QUERY = """
+    MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
+    WHERE r.distance_km > 1000 AND r.flight_time_hr IS NOT NULL
+    RETURN a.airport_code AS origin, b.airport_code AS destination, 
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
+    ORDER BY r.distance_km DESC LIMIT 50
+"""
+
+# Every route, streamed without a LIMIT or ORDER BY so rows arrive as they match
+ALL_ROUTES_QUERY = """
+    MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
+    RETURN a.airport_code AS origin, b.airport_code AS destination,
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
+"""
+
+# Route attributes for a given list of routes, e.g. the top sellers
+ROUTES_BY_PAIRS_QUERY = """
+    UNWIND $pairs AS pair
+    MATCH (a:Airport {airport_code: pair.origin})-[r:CONNECTED_TO]->
+          (b:Airport {airport_code: pair.destination})
+    RETURN a.airport_code AS origin, b.airport_code AS destination,
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
+"""
+
+# Route catalog arguments equivalent to each route query
+CATALOG_ROUTE_FILTERS = {
+    BASELINE_ROUTES_QUERY: {"limit": 50},
+    OPTIMIZED_ROUTES_QUERY: {"limit": 50, "min_distance": 1000, "require_flight_time": True}
+}
+
+
+def fetch_routes(driver, query, parameters=None, columns=ROUTE_COLUMNS,
+                 span_name="neo4j.routes"):
+    """
+    Read routes from Neo4j in a read transaction
+    
+    Args:
+        driver: Neo4j driver instance
+        query: Cypher query returning origin, destination, distance_km
+            and flight_time_hr
+        parameters: Optional query parameters
+        columns: Output column -> record key mapping
+        span_name: Name of the span timing the read
+    
+    Returns:
+        tuple: (DataFrame of routes, query execution time in seconds)
+    """
+    def get_routes(tx):
+        # Records are consumed inside the transaction as they stream in
+        return load_frame(tx.run(query, parameters or {}), columns)
+    
+    with span(span_name) as stage:
+        with driver.session() as session:
+            df_routes = session.execute_read(get_routes)
+    return df_routes, stage.duration
+
+
+def _select_routes(driver, query, route_catalog=None):
+    """
+    Get the scenario routes from the route catalog if given, else from Neo4j
+    
+    Returns:
+        tuple: (DataFrame of routes, lookup time in seconds)
+    """
+    if route_catalog is None:
+        return fetch_routes(driver, query)
+    
+    with span("catalog.routes") as stage:
+        df_routes = route_catalog.top_by_distance(driver, **CATALOG_ROUTE_FILTERS[query])
+    return df_routes, stage.duration
+
+
+def _lookup_routes(driver, route_pairs, route_catalog=None):
+    """
+    Get distance and flight time for the given routes in one lookup
+    
+    Returns:
+        tuple: (DataFrame of routes, lookup time in seconds)
+    """
+    if route_catalog is not None:
+        with span("catalog.route_lookup", routes=len(route_pairs)) as stage:
+            df_routes = route_catalog.lookup(driver, route_pairs)
+        return df_routes, stage.duration
     
-    return df_daily, execution_time
+    if not route_pairs:
+        return pd.DataFrame(columns=list(ROUTE_COLUMNS)), 0.0
+    parameters = {"pairs": _pair_parameters(route_pairs)}
+    df_routes, execution_time = fetch_routes(driver, ROUTES_BY_PAIRS_QUERY, parameters)
+    # Parallel CONNECTED_TO edges would repeat a route
+    return df_routes.drop_duplicates(["origin", "destination"]), execution_time
 
 
-def run_scenario_without_optimization(orders_collection, driver, start_date, end_date):
+def fetch_graph_route_revenue(driver, start_date, end_date, limit=TOP_ROUTES_LIMIT):
+    """
+    Rank long routes by the monthly sales synced onto CONNECTED_TO
+    
+    Requires sync_route_sales_to_graph() to have covered the period; the
+    period is widened to whole months.
+    
+    Returns:
+        tuple: (DataFrame of routes with total_sales and total_orders,
+            query execution time in seconds)
+    """
+    parameters = graph_revenue_parameters(start_date, end_date, limit=limit)
+    return fetch_routes(
+        driver, GRAPH_REVENUE_QUERY, parameters, GRAPH_REVENUE_COLUMNS, "neo4j.graph_revenue"
+    )
+
+
+def _pair_parameters(route_pairs):
+    """Cypher parameter list for UNWIND over (origin, destination) pairs"""
+    return [{"origin": origin, "destination": destination} for origin, destination in route_pairs]
+
+
+@traced("scenario.without_optimization")
+def run_scenario_without_optimization(orders_collection, driver, start_date, end_date,
+                                      route_catalog=None, instrument=False):
     """
     Execute analysis queries without database indexing and optimization
     Uses individual queries for each route instead of batch processing
@@ -72,27 +528,21 @@ def run_scenario_without_optimization(orders_collection, driver, start_date, end
         driver: Neo4j driver instance
         start_date: Start date (datetime object)
         end_date: End date (datetime object)
-        
+        route_catalog: Optional RouteCatalog answering the route query locally
+        instrument: Also capture MongoDB explain and Neo4j PROFILE output for
+            each query into 'query_plans' (run after the timed stages)
+    
     Returns:
         dict: Results including metrics, dataframes, and query execution times
     """
     results = {}
     
     # 1. Calculate Total Sales
-    pipeline_total = [
-        {"$match": {"depart_date": {"$gte": start_date, "$lte": end_date}}},
-        {
-            "$group": {
-                "_id": None,
-                "total_sales": {"$sum": "$total_price"},
-                "total_orders": {"$sum": 1}
-            }
-        }
-    ]
+    pipeline_total = build_total_pipeline(start_date, end_date)
     
-    start_time = time.time()
-    res_total = list(orders_collection.aggregate(pipeline_total))
-    results['mongo_total_time'] = time.time() - start_time
+    with span("mongo.total_sales", source=SOURCE_ORDERS) as stage:
+        res_total = list(orders_collection.aggregate(pipeline_total))
+    results['mongo_total_time'] = stage.duration
     
     results['total_sales'] = res_total[0]["total_sales"] if res_total else 0
     results['total_orders'] = res_total[0]["total_orders"] if res_total else 0
@@ -103,77 +553,290 @@ def run_scenario_without_optimization(orders_collection, driver, start_date, end
     results['df_daily'] = df_daily
     
     # 3. Fetch Routes from Neo4j
-    def get_routes(tx):
-        return list(tx.run("""
-            MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
-            RETURN a.airport_code AS origin, b.airport_code AS destination, 
-                   r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
-            ORDER BY r.distance_km DESC LIMIT 50
-        """))
-    
-    start_time = time.time()
-    with driver.session() as session:
-        route_records = session.execute_read(get_routes)
-    results['neo4j_time'] = time.time() - start_time
-    
-    df_routes = pd.DataFrame([{
-        "origin": rec["origin"],
-        "destination": rec["destination"],
-        "distance_km": rec["distance_km"],
-        "flight_time_hr": rec["flight_time_hr"]
-    } for rec in route_records])
+    df_routes, results['neo4j_time'] = _select_routes(
+        driver, BASELINE_ROUTES_QUERY, route_catalog
+    )
     
     # 4. Calculate Route Sales (Individual Queries - INEFFICIENT)
-    start_time = time.time()
     route_sales = []
     
-    for _, row in df_routes.iterrows():
-        pipeline_route = [
-            {
-                "$match": {
+    with span("mongo.route_sales_individual", routes=len(df_routes)) as stage:
+        for _, row in df_routes.iterrows():
+            pipeline_route = build_single_route_pipeline(
+                row["origin"], row["destination"], start_date, end_date
+            )
+            
+            res_route = list(orders_collection.aggregate(pipeline_route))
+            if res_route:
+                route_sales.append({
                     "origin": row["origin"],
                     "destination": row["destination"],
-                    "depart_date": {"$gte": start_date, "$lte": end_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "total_sales": {"$sum": "$total_price"},
-                    "total_orders": {"$sum": 1}
-                }
-            }
-        ]
-        
-        res_route = list(orders_collection.aggregate(pipeline_route))
-        if res_route:
-            route_sales.append({
-                "origin": row["origin"],
-                "destination": row["destination"],
-                "total_sales": res_route[0]["total_sales"],
-                "total_orders": res_route[0]["total_orders"]
-            })
-        else:
-            route_sales.append({
-                "origin": row["origin"],
-                "destination": row["destination"],
-                "total_sales": 0,
-                "total_orders": 0
-            })
+                    "total_sales": res_route[0]["total_sales"],
+                    "total_orders": res_route[0]["total_orders"]
+                })
+            else:
+                route_sales.append({
+                    "origin": row["origin"],
+                    "destination": row["destination"],
+                    "total_sales": 0,
+                    "total_orders": 0
+                })
+    
+    results['mongo_routes_time'] = stage.duration
+    
+    # Stages run one after another, so the critical path is their sum
+    results['summed_stage_time'] = (
+        results['mongo_total_time'] + results['daily_trend_time'] +
+        results['neo4j_time'] + results['mongo_routes_time']
+    )
+    results['critical_path_time'] = results['summed_stage_time']
+    results['load_stats'] = _collect_load_stats(daily=df_daily, routes=df_routes)
     
-    results['mongo_routes_time'] = time.time() - start_time
+    if instrument:
+        pipelines = {
+            "mongo_total": pipeline_total,
+            "daily_trend": build_daily_pipeline(start_date, end_date)
+        }
+        # The individual route queries share one plan shape; explain the first
+        if not df_routes.empty:
+            first = df_routes.iloc[0]
+            pipelines["mongo_routes"] = build_single_route_pipeline(
+                first["origin"], first["destination"], start_date, end_date
+            )
+        results['query_plans'] = _capture_query_plans(
+            orders_collection, pipelines, driver, BASELINE_ROUTES_QUERY, route_catalog
+        )
     
     # 5. Merge data
-    df_sales = pd.DataFrame(route_sales)
-    df_combined = pd.merge(df_routes, df_sales, on=["origin", "destination"], how="left")
-    df_combined[["total_sales", "total_orders"]] = \
-        df_combined[["total_sales", "total_orders"]].fillna(0)
-    results['df_sorted'] = df_combined.sort_values(by="total_sales", ascending=False)
+    with span("pandas.merge_sort"):
+        df_sales = pd.DataFrame(route_sales)
+        df_combined = pd.merge(df_routes, df_sales, on=["origin", "destination"], how="left")
+        df_combined[["total_sales", "total_orders"]] = \
+            df_combined[["total_sales", "total_orders"]].fillna(0)
+        results['df_sorted'] = df_combined.sort_values(by="total_sales", ascending=False)
     
+    results['trace'] = current_span()
     return results
 
 
-def run_scenario_with_optimization(orders_collection, driver, start_date, end_date):
+def _fetch_total_sales(collection, start_date, end_date, source=SOURCE_ORDERS):
+    """
+    Run the total sales aggregation
+    
+    Returns:
+        tuple: (total_sales, total_orders, query execution time in seconds)
+    """
+    engine = _local_engine(source)
+    if engine is not None:
+        with span("local.total_sales", source=source) as stage:
+            total_sales, total_orders = engine.total_sales(start_date, end_date)
+        return total_sales, total_orders, stage.duration
+    
+    pipeline_total = build_total_pipeline(start_date, end_date, source)
+    
+    with span("mongo.total_sales", source=source) as stage:
+        res_total = list(collection.aggregate(pipeline_total))
+    
+    total_sales = res_total[0]["total_sales"] if res_total else 0
+    total_orders = res_total[0]["total_orders"] if res_total else 0
+    return total_sales, total_orders, stage.duration
+
+
+def _fetch_daily_trend(orders_collection, start_date, end_date, source=SOURCE_ORDERS,
+                       daily_store=None):
+    """
+    Get the daily trend, through the incremental daily store if given
+    
+    Returns:
+        tuple: (DataFrame with daily sales, execution time in seconds)
+    """
+    if daily_store is None:
+        return get_sales_by_date(orders_collection, start_date, end_date, source)
+    
+    with span("daily_store.daily_trend", source=source) as stage:
+        df_daily = daily_store.get_sales_by_date(
+            get_sales_by_date, orders_collection, start_date, end_date, source
+        )
+    return df_daily, stage.duration
+
+
+def _capture_query_plans(collection, pipelines, driver, route_query, route_catalog=None):
+    """
+    Explain the scenario pipelines and profile the route query unless it is served locally
+    
+    route_query is a Cypher string or a (query, parameters) tuple.
+    """
+    from .profiling import capture_query_plans
+    cypher_queries = {} if route_catalog is not None else {"neo4j_routes": route_query}
+    return capture_query_plans(collection, pipelines, driver, cypher_queries)
+
+
+def _collect_load_stats(**frames):
+    """Gather the DataFrame build statistics of the frames loaded from the databases"""
+    return {name: load_stats(df) for name, df in frames.items() if load_stats(df)}
+
+
+def route_pairs_from_frame(df_routes):
+    """Return the distinct (origin, destination) pairs of a routes DataFrame"""
+    if df_routes.empty:
+        return []
+    return list(dict.fromkeys(zip(df_routes["origin"], df_routes["destination"])))
+
+
+def _fetch_route_sales_batch(collection, df_routes, start_date, end_date, source=SOURCE_ORDERS,
+                             route_match=ROUTE_MATCH_PAIRS):
+    """
+    Aggregate sales for a set of routes in a single batch query
+    
+    Returns:
+        tuple: (DataFrame of route sales, query execution time in seconds)
+    """
+    engine = _local_engine(source)
+    component = "local" if engine is not None else "mongo"
+    with span(f"{component}.route_sales_batch", source=source, routes=len(df_routes)) as stage:
+        route_pairs = route_pairs_from_frame(df_routes)
+        
+        if engine is not None:
+            df_batch = engine.route_sales(route_pairs, start_date, end_date)
+        else:
+            # Single batch query instead of N individual queries
+            pipeline_batch = build_route_batch_pipeline(
+                start_date, end_date, route_pairs, source, route_match
+            )
+            df_batch = load_frame(collection.aggregate(pipeline_batch), ROUTE_SALES_COLUMNS)
+    return df_batch, stage.duration
+
+
+def stream_route_sales(collection, driver, start_date, end_date, source=SOURCE_ORDERS,
+                       route_match=ROUTE_MATCH_PAIRS, route_catalog=None,
+                       fetch_size=ROUTE_STREAM_FETCH_SIZE, batch_size=ROUTE_STREAM_BATCH_SIZE,
+                       max_workers=ROUTE_STREAM_WORKERS):
+    """
+    Aggregate sales for every route in the graph, one bounded chunk at a time
+    
+    Routes are paged from Neo4j fetch_size records per round trip (or sliced
+    from the route catalog) and cut into chunks of batch_size routes. Each
+    chunk's route sales batch runs on a thread pool while the next chunk is
+    read, with at most 2 * max_workers chunks in flight, and finished
+    chunks are merged into the route table as they complete. Each worker
+    also summarizes its chunk into an InsightAccumulator, and the partial
+    accumulators are merged as chunks are collected.
+    
+    Args:
+        collection: Collection serving the source
+        driver: Neo4j driver instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: Data source of the route sales batches
+        route_match: "pairs" or "cross_product", see build_route_match()
+        route_catalog: Optional RouteCatalog to read the routes from
+        fetch_size: Neo4j records fetched per round trip
+        batch_size: Routes per route sales batch
+        max_workers: Concurrent route sales batches
+    
+    Returns:
+        tuple: (DataFrame of routes with total_sales and total_orders,
+            dict of stream statistics: routes, chunks, max_in_flight,
+            neo4j_time, mongo_time and insight_stats)
+    """
+    def merged_chunk(df_chunk):
+        df_batch, batch_time = _fetch_route_sales_batch(
+            collection, df_chunk, start_date, end_date, source, route_match
+        )
+        df_chunk = pd.merge(df_chunk, df_batch, on=["origin", "destination"], how="left")
+        df_chunk[["total_sales", "total_orders"]] = \
+            df_chunk[["total_sales", "total_orders"]].fillna(0)
+        return df_chunk, batch_time, InsightAccumulator().add_routes(df_chunk)
+    
+    def merge_chunks(chunks):
+        stats = {"routes": 0, "chunks": 0, "max_in_flight": 0, "mongo_time": 0.0,
+                 "insight_stats": InsightAccumulator()}
+        merged, pending = [], deque()
+        
+        def collect():
+            df_chunk, batch_time, chunk_stats = pending.popleft().result()
+            merged.append(df_chunk)
+            stats["mongo_time"] += batch_time
+            stats["insight_stats"].merge(chunk_stats)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for df_chunk in chunks:
+                stats["routes"] += len(df_chunk)
+                stats["chunks"] += 1
+                pending.append(submit_in_context(executor, merged_chunk, df_chunk))
+                stats["max_in_flight"] = max(stats["max_in_flight"], len(pending))
+                # Bound the chunks held in memory while Neo4j keeps streaming
+                if len(pending) >= 2 * max_workers:
+                    collect()
+            while pending:
+                collect()
+        return merged, stats
+    
+    with span("routes.stream", source=source, batch_size=batch_size) as stream:
+        if route_catalog is not None:
+            with span("catalog.routes") as lookup:
+                table = route_catalog.snapshot(driver)
+            
+            def catalog_chunks():
+                for offset in range(0, len(table), batch_size):
+                    df_chunk = table.iloc[offset:offset + batch_size][list(ROUTE_COLUMNS)]
+                    yield df_chunk.astype({"origin": str, "destination": str})
+            
+            merged, stats = merge_chunks(catalog_chunks())
+            stats["neo4j_time"] = lookup.duration
+        else:
+            def read_routes(tx):
+                # A retried transaction starts over with fresh chunks
+                read_time = [0.0]
+                result = tx.run(ALL_ROUTES_QUERY)
+                
+                def graph_chunks():
+                    while True:
+                        df_chunk = load_frame(islice(result, batch_size), ROUTE_COLUMNS)
+                        read_time[0] += load_stats(df_chunk)["build_time"]
+                        if df_chunk.empty:
+                            return
+                        yield df_chunk
+                
+                merged, stats = merge_chunks(graph_chunks())
+                stats["neo4j_time"] = read_time[0]
+                return merged, stats
+            
+            with driver.session(fetch_size=fetch_size) as session:
+                merged, stats = session.execute_read(read_routes)
+        
+        columns = list(ROUTE_COLUMNS) + ["total_sales", "total_orders"]
+        df_combined = (pd.concat(merged, ignore_index=True) if merged
+                       else pd.DataFrame(columns=columns))
+        stream.set(routes=stats["routes"], chunks=stats["chunks"])
+    return df_combined, stats
+
+
+def _fetch_top_routes(collection, start_date, end_date, source=SOURCE_ORDERS,
+                      limit=TOP_ROUTES_LIMIT):
+    """
+    Rank routes by revenue within the range
+    
+    Returns:
+        tuple: (DataFrame of the top routes' sales, query execution time in seconds)
+    """
+    engine = _local_engine(source)
+    component = "local" if engine is not None else "mongo"
+    with span(f"{component}.top_routes", source=source, limit=limit) as stage:
+        if engine is not None:
+            df_top = engine.top_routes(start_date, end_date, limit)
+        else:
+            pipeline_top = build_top_routes_pipeline(start_date, end_date, limit, source)
+            df_top = load_frame(collection.aggregate(pipeline_top), ROUTE_SALES_COLUMNS)
+    return df_top, stage.duration
+
+
+@traced("scenario.with_optimization")
+def run_scenario_with_optimization(orders_collection, driver, start_date, end_date,
+                                   source=SOURCE_ORDERS, concurrent=False,
+                                   route_match=ROUTE_MATCH_PAIRS, route_catalog=None,
+                                   instrument=False, daily_store=None,
+                                   route_ranking=ROUTE_RANKING_DISTANCE):
     """
     Execute analysis queries with database indexing and optimization
     Uses batch processing instead of individual queries
@@ -183,109 +846,213 @@ def run_scenario_with_optimization(orders_collection, driver, start_date, end_da
         driver: Neo4j driver instance
         start_date: Start date (datetime object)
         end_date: End date (datetime object)
-        
+        source: "orders" to scan raw orders, "rollup" to answer total, daily
+            trend and route sales from the daily_route_sales rollup,
+            "timeseries" to answer them from the orders_ts time-series copy,
+            "snapshot" to answer them from the local columnar snapshot,
+            "mmap" to answer them from the memory-mapped order arrays
+        concurrent: Run total sales, daily trend and the Neo4j route read
+            (followed by its route sales batch) on a thread pool
+        route_match: "pairs" to match the returned routes exactly,
+            "cross_product" for the original origin/destination $in filter
+        route_catalog: Optional RouteCatalog answering the route query locally
+        instrument: Also capture MongoDB explain and Neo4j PROFILE output for
+            each query into 'query_plans' (run after the timed stages)
+        daily_store: Optional DailyTrendStore serving already fetched days
+        route_ranking: "distance" to report sales of the longest routes,
+            "sales" to rank all routes by revenue in MongoDB and then look
+            up the attributes of the top routes in Neo4j, "all" to report
+            every route in the graph via stream_route_sales(), "graph" to
+            rank long routes by the monthly sales synced onto CONNECTED_TO
+            in a single Cypher query (whole months, as of the last sync)
+    
     Returns:
-        dict: Results including metrics, dataframes, and query execution times
+        dict: Results including metrics, dataframes, and query execution times.
+            'critical_path_time' is the wall-clock time of all stages and
+            'summed_stage_time' the sum of the individual stage times.
+            With route_ranking="all", 'route_stream' holds the stream statistics
+            and 'insight_stats' the route statistics gathered while streaming.
     """
     results = {}
+    collection = _source_collection(orders_collection, source)
     
-    # 1. Calculate Total Sales
-    pipeline_total = [
-        {"$match": {"depart_date": {"$gte": start_date, "$lte": end_date}}},
-        {
-            "$group": {
-                "_id": None,
-                "total_sales": {"$sum": "$total_price"},
-                "total_orders": {"$sum": 1}
-            }
-        }
-    ]
-    
-    start_time = time.time()
-    res_total = list(orders_collection.aggregate(pipeline_total))
-    results['mongo_total_time'] = time.time() - start_time
+    def route_stages():
+        if route_ranking == ROUTE_RANKING_ALL:
+            # Chunks are merged as they stream, so the routes arrive with their sales
+            df_combined, stream_stats = stream_route_sales(
+                collection, driver, start_date, end_date, source, route_match, route_catalog
+            )
+            results['insight_stats'] = stream_stats.pop("insight_stats")
+            results['route_stream'] = stream_stats
+            return df_combined, stream_stats["neo4j_time"], None, stream_stats["mongo_time"]
+        
+        if route_ranking == ROUTE_RANKING_GRAPH:
+            # Sales already live on the edges, so there is nothing to merge
+            df_routes, neo4j_time = fetch_graph_route_revenue(driver, start_date, end_date)
+            return df_routes, neo4j_time, None, 0.0
+        
+        if route_ranking == ROUTE_RANKING_SALES:
+            # The graph lookup depends on the top routes returned by MongoDB
+            df_batch, routes_time = _fetch_top_routes(collection, start_date, end_date, source)
+            df_routes, neo4j_time = _lookup_routes(
+                driver, route_pairs_from_frame(df_batch), route_catalog
+            )
+            return df_routes, neo4j_time, df_batch, routes_time
+        
+        # Route sales depend on the routes returned by Neo4j
+        df_routes, neo4j_time = _select_routes(driver, OPTIMIZED_ROUTES_QUERY, route_catalog)
+        df_batch, routes_time = _fetch_route_sales_batch(
+            collection, df_routes, start_date, end_date, source, route_match
+        )
+        return df_routes, neo4j_time, df_batch, routes_time
     
-    results['total_sales'] = res_total[0]["total_sales"] if res_total else 0
-    results['total_orders'] = res_total[0]["total_orders"] if res_total else 0
+    with span("stages", concurrent=concurrent) as stages:
+        if concurrent:
+            # Worker threads inherit the current span so their stages nest under it
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                total_future = submit_in_context(
+                    executor, _fetch_total_sales, collection, start_date, end_date, source
+                )
+                daily_future = submit_in_context(
+                    executor, _fetch_daily_trend, orders_collection, start_date, end_date,
+                    source, daily_store
+                )
+                routes_future = submit_in_context(executor, route_stages)
+                
+                total_sales, total_orders, total_time = total_future.result()
+                df_daily, daily_time = daily_future.result()
+                df_routes, neo4j_time, df_batch, routes_time = routes_future.result()
+        else:
+            # 1. Calculate Total Sales
+            total_sales, total_orders, total_time = _fetch_total_sales(
+                collection, start_date, end_date, source
+            )
+            # 2. Fetch Daily Trend
+            df_daily, daily_time = _fetch_daily_trend(
+                orders_collection, start_date, end_date, source, daily_store
+            )
+            # 3-4. Fetch Routes from Neo4j, then Route Sales (Batch Query - OPTIMIZED)
+            df_routes, neo4j_time, df_batch, routes_time = route_stages()
     
-    # 2. Fetch Daily Trend
-    df_daily, daily_time = get_sales_by_date(orders_collection, start_date, end_date)
-    results['daily_trend_time'] = daily_time
+    results['critical_path_time'] = stages.duration
+    results['total_sales'] = total_sales
+    results['total_orders'] = total_orders
+    results['mongo_total_time'] = total_time
     results['df_daily'] = df_daily
+    results['daily_trend_time'] = daily_time
+    results['neo4j_time'] = neo4j_time
+    results['mongo_routes_time'] = routes_time
+    results['summed_stage_time'] = total_time + daily_time + neo4j_time + routes_time
+    results['concurrent'] = concurrent
+    results['route_ranking'] = route_ranking
+    if route_ranking == ROUTE_RANKING_ALL:
+        results['load_stats'] = _collect_load_stats(daily=df_daily)
+    elif df_batch is None:
+        results['load_stats'] = _collect_load_stats(daily=df_daily, routes=df_routes)
+    else:
+        results['load_stats'] = _collect_load_stats(
+            daily=df_daily, routes=df_routes, route_sales=df_batch
+        )
     
-    # 3. Fetch Routes from Neo4j (with optimized query)
-    def get_routes(tx):
-        return list(tx.run("""
-            MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
-            WHERE r.distance_km > 1000 AND r.flight_time_hr IS NOT NULL
-            RETURN a.airport_code AS origin, b.airport_code AS destination, 
-                   r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr
-            ORDER BY r.distance_km DESC LIMIT 50
-        """))
-    
-    start_time = time.time()
-    with driver.session() as session:
-        route_records = session.execute_read(get_routes)
-    results['neo4j_time'] = time.time() - start_time
-    
-    df_routes = pd.DataFrame([{
-        "origin": rec["origin"],
-        "destination": rec["destination"],
-        "distance_km": rec["distance_km"],
-        "flight_time_hr": rec["flight_time_hr"]
-    } for rec in route_records])
-    
-    # 4. Calculate Route Sales (Batch Query - OPTIMIZED)
-    start_time = time.time()
-    origin_list = df_routes["origin"].unique().tolist()
-    destination_list = df_routes["destination"].unique().tolist()
-    
-    # Single batch query instead of N individual queries
-    pipeline_batch = [
-        {
-            "$match": {
-                "depart_date": {"$gte": start_date, "$lte": end_date},
-                "origin": {"$in": origin_list},
-                "destination": {"$in": destination_list}
-            }
-        },
-        {
-            "$group": {
-                "_id": {"origin": "$origin", "destination": "$destination"},
-                "total_sales": {"$sum": "$total_price"},
-                "total_orders": {"$sum": 1}
-            }
+    if instrument:
+        if route_ranking == ROUTE_RANKING_ALL:
+            # Every chunk runs the same pipeline shape; explain the first one
+            routes_pipeline = build_route_batch_pipeline(
+                start_date, end_date,
+                route_pairs_from_frame(df_routes.head(ROUTE_STREAM_BATCH_SIZE)),
+                source, route_match
+            )
+            route_query = ALL_ROUTES_QUERY
+        elif route_ranking == ROUTE_RANKING_GRAPH:
+            routes_pipeline = None
+            route_query = (GRAPH_REVENUE_QUERY, graph_revenue_parameters(start_date, end_date))
+        elif route_ranking == ROUTE_RANKING_SALES:
+            routes_pipeline = build_top_routes_pipeline(
+                start_date, end_date, TOP_ROUTES_LIMIT, source
+            )
+            route_query = (ROUTES_BY_PAIRS_QUERY,
+                           {"pairs": _pair_parameters(route_pairs_from_frame(df_batch))})
+        else:
+            routes_pipeline = build_route_batch_pipeline(
+                start_date, end_date, route_pairs_from_frame(df_routes), source, route_match
+            )
+            route_query = OPTIMIZED_ROUTES_QUERY
+        # Local sources have no server-side plans to explain
+        pipelines = {} if source in LOCAL_SOURCES else {
+            "mongo_total": build_total_pipeline(start_date, end_date, source),
+            "daily_trend": build_daily_pipeline(start_date, end_date, source),
+            "mongo_routes": routes_pipeline
         }
-    ]
-    
-    res_batch = list(orders_collection.aggregate(pipeline_batch))
-    results['mongo_routes_time'] = time.time() - start_time
-    
-    df_batch = pd.DataFrame([{
-        "origin": doc["_id"]["origin"],
-        "destination": doc["_id"]["destination"],
-        "total_sales": doc["total_sales"],
-        "total_orders": doc["total_orders"]
-    } for doc in res_batch])
+        if routes_pipeline is None:
+            pipelines.pop("mongo_routes", None)
+        # The graph revenue query always runs on Neo4j, even with a route catalog
+        results['query_plans'] = _capture_query_plans(
+            collection, pipelines, driver, route_query,
+            None if route_ranking == ROUTE_RANKING_GRAPH else route_catalog
+        )
     
     # 5. Merge data
-    df_combined = pd.merge(df_routes, df_batch, on=["origin", "destination"], how="left")
-    df_combined[["total_sales", "total_orders"]] = \
-        df_combined[["total_sales", "total_orders"]].fillna(0)
-    results['df_sorted'] = df_combined.sort_values(by="total_sales", ascending=False)
+    with span("pandas.merge_sort"):
+        if df_batch is None:
+            # Streamed and graph-ranked routes already carry their sales
+            df_combined = df_routes
+        elif route_ranking == ROUTE_RANKING_SALES:
+            # Keep every top seller, even if the graph has no edge for it
+            df_combined = pd.merge(
+                df_batch, df_routes, on=["origin", "destination"], how="left"
+            )[list(ROUTE_COLUMNS) + ["total_sales", "total_orders"]]
+        else:
+            df_combined = pd.merge(
+                df_routes, df_batch, on=["origin", "destination"], how="left"
+            )
+        df_combined[["total_sales", "total_orders"]] = \
+            df_combined[["total_sales", "total_orders"]].fillna(0)
+        results['df_sorted'] = df_combined.sort_values(by="total_sales", ascending=False)
     
+    results['trace'] = current_span()
     return results
 
 
-def generate_insights(results1, results2, period_days):
+def run_cached(func, db_args, start_date, end_date, cache=None, **filters):
+    """
+    Run an analytics entry point through the shared query cache
+    
+    Results are keyed by (function, start, end, filters), so identical
+    requests from any session share one database call.
+    
+    Args:
+        func: Analytics function taking (*db_args, start_date, end_date, **filters)
+        db_args: Tuple of database handles, e.g. (orders_collection, driver)
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        cache: QueryCache to use, defaults to the process-wide cache
+        **filters: Additional keyword options passed to func
+    
+    Returns:
+        tuple: (result, True if the result came from the cache)
+    """
+    cache = cache or query_cache
+    key = cache.make_key(func.__name__, start_date, end_date, filters)
+    return cache.get_or_compute(
+        key, lambda: func(*db_args, start_date, end_date, **filters)
+    )
+
+
+@traced("insights.generate")
+def generate_insights(results1, results2, period_days, stats=None):
     """
     Generate business insights from analysis results
     
+    Statistics come from a single pass over the results (see
+    insight_stats.summarize_results()), so no filtered copy of the route
+    table is materialized.
+    
     Args:
         results1: Results from scenario without optimization
         results2: Results from scenario with optimization
         period_days: Number of days in analysis period
-        
+        stats: Optional InsightAccumulator of results2, built when omitted
+    
     Returns:
         list: List of insight dictionaries with type, title, and content
     """
@@ -294,8 +1061,9 @@ def generate_insights(results1, results2, period_days):
     # Data from optimized results
     total_sales = results2['total_sales']
     total_orders = results2['total_orders']
-    df_daily = results2['df_daily']
-    df_sorted = results2['df_sorted']
+    if stats is None:
+        stats = summarize_results(results2)
+    daily = stats.daily_sales
     
     # 1. Performance Impact Insight
     if 'total_time1' in st.session_state and 'total_time2' in st.session_state:
@@ -321,61 +1089,57 @@ def generate_insights(results1, results2, period_days):
     })
     
     # 3. Daily Trend Insight
-    if not df_daily.empty:
-        max_day = df_daily.loc[df_daily['daily_sales'].idxmax()]
-        min_day = df_daily.loc[df_daily['daily_sales'].idxmin()]
+    if daily.count:
+        max_day = pd.Timestamp(daily.max_label)
+        min_day = pd.Timestamp(daily.min_label)
         
         insights.append({
             "type": "trend",
             "title": "Daily Sales Trend Analysis",
-            "content": f"Highest sales on {max_day['date'].strftime('%d %B %Y')}: Rp {max_day['daily_sales']:,.0f}. "
-                      f"Lowest sales on {min_day['date'].strftime('%d %B %Y')}: Rp {min_day['daily_sales']:,.0f}."
+            "content": f"Highest sales on {max_day.strftime('%d %B %Y')}: Rp {daily.max:,.0f}. "
+                      f"Lowest sales on {min_day.strftime('%d %B %Y')}: Rp {daily.min:,.0f}."
         })
     
     # 4. Route Performance Insight
-    if not df_sorted.empty:
-        top_routes = df_sorted[df_sorted['total_sales'] > 0].head(5)
-        if not top_routes.empty:
-            top_route = top_routes.iloc[0]
-            total_route_sales = top_routes['total_sales'].sum()
-            route_contribution = (total_route_sales / total_sales) * 100
-            
-            insights.append({
-                "type": "route",
-                "title": "Route Performance Analysis",
-                "content": f"Best-selling route: {top_route['origin']} to {top_route['destination']} "
-                          f"with sales of Rp {top_route['total_sales']:,.0f} ({int(top_route['total_orders'])} orders). "
-                          f"Top 5 routes contribute {route_contribution:.1f}% of total sales."
-            })
+    top_routes = stats.top_routes.rows()
+    if top_routes:
+        top_route = top_routes[0]
+        total_route_sales = sum(route['total_sales'] for route in top_routes)
+        route_contribution = (total_route_sales / total_sales) * 100
         
-        # Distance vs Sales Analysis
-        routes_with_sales = df_sorted[df_sorted['total_sales'] > 0]
-        if len(routes_with_sales) > 10:
-            correlation = routes_with_sales['distance_km'].corr(routes_with_sales['total_sales'])
-            correlation_strength = "weak" if abs(correlation) < 0.3 else "moderate" if abs(correlation) < 0.7 else "strong"
-            correlation_direction = "positive" if correlation > 0 else "negative"
-            
-            insights.append({
-                "type": "correlation",
-                "title": "Distance vs Sales Correlation",
-                "content": f"Distance-sales correlation: {correlation:.3f} ({correlation_strength} {correlation_direction}). "
-                          f"Route distance {'has' if abs(correlation) > 0.3 else 'does not have'} significant impact on sales volume."
-            })
+        insights.append({
+            "type": "route",
+            "title": "Route Performance Analysis",
+            "content": f"Best-selling route: {top_route['origin']} to {top_route['destination']} "
+                      f"with sales of Rp {top_route['total_sales']:,.0f} ({int(top_route['total_orders'])} orders). "
+                      f"Top 5 routes contribute {route_contribution:.1f}% of total sales."
+        })
+    
+    # Distance vs Sales Analysis
+    if stats.route_sales.count > 10:
+        correlation = stats.distance_sales.correlation()
+        correlation_strength = "weak" if abs(correlation) < 0.3 else "moderate" if abs(correlation) < 0.7 else "strong"
+        correlation_direction = "positive" if correlation > 0 else "negative"
+        
+        insights.append({
+            "type": "correlation",
+            "title": "Distance vs Sales Correlation",
+            "content": f"Distance-sales correlation: {correlation:.3f} ({correlation_strength} {correlation_direction}). "
+                      f"Route distance {'has' if abs(correlation) > 0.3 else 'does not have'} significant impact on sales volume."
+        })
     
     # 5. Business Recommendations
     recommendations = []
     
-    if not df_daily.empty:
-        low_sales_threshold = df_daily['daily_sales'].quantile(0.25)
-        low_sales_days = len(df_daily[df_daily['daily_sales'] <= low_sales_threshold])
+    if daily.count:
+        low_sales_threshold = stats.daily_quantiles.quantile(0.25)
+        low_sales_days = stats.daily_quantiles.rank(low_sales_threshold)
         
         if low_sales_days > 0:
             recommendations.append(f"Focus marketing strategies on {low_sales_days} low-sales days")
     
-    if not df_sorted.empty:
-        zero_sales_routes = len(df_sorted[df_sorted['total_sales'] == 0])
-        if zero_sales_routes > 0:
-            recommendations.append(f"Evaluate and optimize {zero_sales_routes} routes with zero sales")
+    if stats.zero_sales_routes > 0:
+        recommendations.append(f"Evaluate and optimize {stats.zero_sales_routes} routes with zero sales")
     
     if recommendations:
         insights.append({
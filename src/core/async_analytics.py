@@ -0,0 +1,316 @@
+"""
+Async analytics module
+Runs the optimized scenario's queries on the async MongoDB and Neo4j
+drivers, with a sync bridge that drives them from one background event loop
+"""
+
+import asyncio
+import atexit
+import threading
+
+import pandas as pd
+from neo4j import AsyncGraphDatabase
+from pymongo import AsyncMongoClient
+
+from config.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, MONGO_URI, MONGO_DB_NAME,
+    MONGO_MAX_POOL_SIZE, NEO4J_MAX_POOL_SIZE
+)
+from .analytics import (
+    SOURCE_ORDERS,
+    MONGO_SOURCES,
+    DAILY_COLUMNS,
+    ROUTE_COLUMNS,
+    ROUTE_SALES_COLUMNS,
+    ROUTE_MATCH_PAIRS,
+    OPTIMIZED_ROUTES_QUERY,
+    build_total_pipeline,
+    build_daily_pipeline,
+    build_route_batch_pipeline,
+    route_pairs_from_frame,
+    _source_collection as _sync_source_collection
+)
+from .loader import aload_frame
+from .tracing import span, current_span
+
+
+def _source_collection(orders_collection, source):
+    """Return the async collection that serves a MongoDB source"""
+    if source not in MONGO_SOURCES:
+        raise ValueError(f"Async analytics supports the MongoDB sources, not: {source}")
+    return _sync_source_collection(orders_collection, source)
+
+
+async def get_total_sales(orders_collection, start_date, end_date, source=SOURCE_ORDERS):
+    """
+    Run the total sales aggregation
+    
+    Returns:
+        tuple: (total_sales, total_orders, query execution time in seconds)
+    """
+    collection = _source_collection(orders_collection, source)
+    pipeline_total = build_total_pipeline(start_date, end_date, source)
+    
+    with span("mongo.total_sales", source=source) as stage:
+        cursor = await collection.aggregate(pipeline_total)
+        res_total = await cursor.to_list()
+    
+    total_sales = res_total[0]["total_sales"] if res_total else 0
+    total_orders = res_total[0]["total_orders"] if res_total else 0
+    return total_sales, total_orders, stage.duration
+
+
+async def get_sales_by_date(orders_collection, start_date, end_date, source=SOURCE_ORDERS):
+    """
+    Calculate daily sales aggregates within a date range
+    
+    Returns:
+        tuple: (DataFrame with daily sales, query execution time in seconds)
+    """
+    collection = _source_collection(orders_collection, source)
+    pipeline_daily = build_daily_pipeline(start_date, end_date, source)
+    
+    with span("mongo.daily_trend", source=source) as stage:
+        df_daily = await aload_frame(await collection.aggregate(pipeline_daily), DAILY_COLUMNS)
+    
+    if not df_daily.empty:
+        df_daily['date'] = pd.to_datetime(df_daily['date'])
+    return df_daily, stage.duration
+
+
+async def fetch_routes(driver, query, parameters=None):
+    """
+    Read routes from Neo4j in a read transaction
+    
+    Args:
+        driver: Neo4j AsyncDriver instance
+        query: Cypher query returning origin, destination, distance_km
+            and flight_time_hr
+        parameters: Optional query parameters
+    
+    Returns:
+        tuple: (DataFrame of routes, query execution time in seconds)
+    """
+    async def get_routes(tx):
+        result = await tx.run(query, parameters or {})
+        return await aload_frame(result, ROUTE_COLUMNS)
+    
+    with span("neo4j.routes") as stage:
+        async with driver.session() as session:
+            df_routes = await session.execute_read(get_routes)
+    return df_routes, stage.duration
+
+
+async def get_route_sales_batch(orders_collection, df_routes, start_date, end_date,
+                                source=SOURCE_ORDERS, route_match=ROUTE_MATCH_PAIRS):
+    """
+    Aggregate sales for a set of routes in a single batch query
+    
+    Returns:
+        tuple: (DataFrame of route sales, query execution time in seconds)
+    """
+    collection = _source_collection(orders_collection, source)
+    with span("mongo.route_sales_batch", source=source, routes=len(df_routes)) as stage:
+        pipeline_batch = build_route_batch_pipeline(
+            start_date, end_date, route_pairs_from_frame(df_routes), source, route_match
+        )
+        df_batch = await aload_frame(
+            await collection.aggregate(pipeline_batch), ROUTE_SALES_COLUMNS
+        )
+    return df_batch, stage.duration
+
+
+async def run_scenario_with_optimization(orders_collection, driver, start_date, end_date,
+                                         source=SOURCE_ORDERS, route_match=ROUTE_MATCH_PAIRS):
+    """
+    Async variant of analytics.run_scenario_with_optimization()
+    
+    Total sales, the daily trend and the Neo4j route read (followed by its
+    route sales batch) are issued together on the event loop, so one
+    scenario holds no thread while its queries are in flight.
+    
+    Args:
+        orders_collection: Async MongoDB orders collection
+        driver: Neo4j AsyncDriver instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: "orders", "rollup" or "timeseries"
+        route_match: "pairs" or "cross_product"
+    
+    Returns:
+        dict: Same keys as the synchronous optimized scenario
+    """
+    results = {}
+    
+    async def route_stages():
+        df_routes, neo4j_time = await fetch_routes(driver, OPTIMIZED_ROUTES_QUERY)
+        df_batch, routes_time = await get_route_sales_batch(
+            orders_collection, df_routes, start_date, end_date, source, route_match
+        )
+        return df_routes, neo4j_time, df_batch, routes_time
+    
+    with span("scenario.with_optimization_async"):
+        with span("stages", concurrent=True) as stages:
+            (total_sales, total_orders, total_time), (df_daily, daily_time), \
+                (df_routes, neo4j_time, df_batch, routes_time) = await asyncio.gather(
+                    get_total_sales(orders_collection, start_date, end_date, source),
+                    get_sales_by_date(orders_collection, start_date, end_date, source),
+                    route_stages()
+                )
+        
+        results['critical_path_time'] = stages.duration
+        results['total_sales'] = total_sales
+        results['total_orders'] = total_orders
+        results['mongo_total_time'] = total_time
+        results['df_daily'] = df_daily
+        results['daily_trend_time'] = daily_time
+        results['neo4j_time'] = neo4j_time
+        results['mongo_routes_time'] = routes_time
+        results['summed_stage_time'] = total_time + daily_time + neo4j_time + routes_time
+        results['concurrent'] = True
+        
+        with span("pandas.merge_sort"):
+            df_combined = pd.merge(df_routes, df_batch, on=["origin", "destination"], how="left")
+            df_combined[["total_sales", "total_orders"]] = \
+                df_combined[["total_sales", "total_orders"]].fillna(0)
+            results['df_sorted'] = df_combined.sort_values(by="total_sales", ascending=False)
+        
+        results['trace'] = current_span()
+    return results
+
+
+class AsyncBridge:
+    """
+    Sync entry point to the async analytics layer
+    
+    Owns one event loop on a daemon thread plus the async clients bound to
+    it. Callers on any thread submit coroutines with run(); all of them
+    share the loop, so concurrent requests cost no thread each.
+    """
+    
+    def __init__(self, mongo_max_pool_size=MONGO_MAX_POOL_SIZE,
+                 neo4j_max_pool_size=NEO4J_MAX_POOL_SIZE):
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.neo4j_max_pool_size = neo4j_max_pool_size
+        
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._clients = None
+        self._clients_lock = None
+    
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._clients_lock = asyncio.Lock()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="async-analytics", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+    
+    async def get_clients(self):
+        """
+        Return the async clients, connecting on first use (runs on the bridge loop)
+        
+        Returns:
+            tuple: (neo4j AsyncDriver, AsyncMongoClient, async database)
+        """
+        async with self._clients_lock:
+            if self._clients is None:
+                driver = AsyncGraphDatabase.driver(
+                    NEO4J_URI,
+                    auth=(NEO4J_USER, NEO4J_PASSWORD),
+                    max_connection_pool_size=self.neo4j_max_pool_size
+                )
+                mongo_client = AsyncMongoClient(
+                    MONGO_URI,
+                    serverSelectionTimeoutMS=5000,
+                    maxPoolSize=self.mongo_max_pool_size
+                )
+                try:
+                    await driver.verify_connectivity()
+                    await mongo_client.admin.command("ping")
+                except Exception:
+                    await driver.close()
+                    await mongo_client.close()
+                    raise
+                self._clients = (driver, mongo_client, mongo_client[MONGO_DB_NAME])
+            return self._clients
+    
+    def run(self, coroutine, timeout=None):
+        """
+        Run a coroutine on the bridge loop and wait for its result
+        
+        Args:
+            coroutine: Coroutine to run
+            timeout: Optional seconds to wait before raising TimeoutError
+        
+        Returns:
+            The coroutine's result
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+    
+    def run_scenario(self, start_date, end_date, timeout=None, **options):
+        """
+        Run the async optimized scenario with the bridge's clients
+        
+        Returns:
+            dict: Scenario results
+        """
+        async def scenario():
+            driver, _, mongo_db = await self.get_clients()
+            return await run_scenario_with_optimization(
+                mongo_db["orders"], driver, start_date, end_date, **options
+            )
+        return self.run(scenario(), timeout)
+    
+    def close(self):
+        """Close the async clients and stop the loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        
+        async def close_clients():
+            if self._clients is not None:
+                driver, mongo_client, _ = self._clients
+                self._clients = None
+                await driver.close()
+                await mongo_client.close()
+        
+        try:
+            asyncio.run_coroutine_threadsafe(close_clients(), loop).result(10)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(10)
+            loop.close()
+
+
+_async_bridge = None
+_async_bridge_lock = threading.Lock()
+
+
+def get_async_bridge():
+    """Return the process-wide async bridge, shared by all sessions"""
+    global _async_bridge
+    with _async_bridge_lock:
+        if _async_bridge is None:
+            _async_bridge = AsyncBridge()
+            atexit.register(_async_bridge.close)
+        return _async_bridge
+
+
+def run_scenario_async(start_date, end_date, **options):
+    """
+    Run the async optimized scenario from synchronous code
+    
+    Uses the process-wide bridge, so it can be passed to run_cached() with
+    no database handles.
+    
+    Returns:
+        dict: Scenario results
+    """
+    return get_async_bridge().run_scenario(start_date, end_date, **options)
@@ -0,0 +1,499 @@
+"""
+Benchmark module
+Headless, repeatable timing of the analytics scenarios with per-stage
+percentiles, bootstrap confidence intervals and a machine-readable JSON report
+"""
+
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import neo4j
+import numpy as np
+import pymongo
+
+from config.config import MONGO_INDEX_PROFILE
+from .cache import query_cache
+from .database import managed_mongo_indexes
+from .index_manager import IndexManager, STATE_FAILED
+from .rollup import ROLLUP_COLLECTION
+from .timeseries import TIMESERIES_COLLECTION, collection_storage
+from .profiling import analytics_pipelines
+from .analytics import (
+    run_scenario_without_optimization,
+    run_scenario_with_optimization,
+    SOURCE_ORDERS,
+    SOURCE_ROLLUP,
+    SOURCE_TIMESERIES,
+    SOURCE_SNAPSHOT,
+    SOURCE_MMAP,
+    ROUTE_RANKING_SALES,
+    ROUTE_RANKING_ALL,
+    ROUTE_RANKING_GRAPH
+)
+
+# Timing keys every scenario runner reports
+STAGE_KEYS = [
+    "mongo_total_time",
+    "daily_trend_time",
+    "neo4j_time",
+    "mongo_routes_time"
+]
+
+# Strategy name -> (scenario function, keyword options)
+STRATEGIES = {
+    "without_optimization": (run_scenario_without_optimization, {}),
+    "with_optimization": (run_scenario_with_optimization, {}),
+    "with_optimization_concurrent": (run_scenario_with_optimization, {"concurrent": True}),
+    "with_optimization_rollup": (run_scenario_with_optimization, {"source": SOURCE_ROLLUP}),
+    "with_optimization_timeseries": (
+        run_scenario_with_optimization, {"source": SOURCE_TIMESERIES}
+    ),
+    "with_optimization_snapshot": (run_scenario_with_optimization, {"source": SOURCE_SNAPSHOT}),
+    "with_optimization_mmap": (run_scenario_with_optimization, {"source": SOURCE_MMAP}),
+    "with_optimization_sales_ranking": (
+        run_scenario_with_optimization, {"route_ranking": ROUTE_RANKING_SALES}
+    ),
+    "with_optimization_all_routes": (
+        run_scenario_with_optimization, {"route_ranking": ROUTE_RANKING_ALL}
+    ),
+    "with_optimization_graph_sales": (
+        run_scenario_with_optimization, {"route_ranking": ROUTE_RANKING_GRAPH}
+    )
+}
+
+
+# Benchmark phases: cold clears server and result caches before every run,
+# warm measures after discarded warm-up runs
+PHASE_COLD = "cold"
+PHASE_WARM = "warm"
+
+# Index states a comparison can be pinned to before it starts
+INDEX_STATE_AS_IS = "as_is"
+INDEX_STATE_CREATED = "created"
+INDEX_STATE_DROPPED = "dropped"
+
+
+def register_strategy(name, scenario_func, **options):
+    """
+    Make a scenario variant available to the benchmark
+    
+    Args:
+        name: Strategy name used on the command line and in reports
+        scenario_func: Function with the scenario runner signature
+        **options: Keyword options passed to scenario_func
+    """
+    STRATEGIES[name] = (scenario_func, options)
+
+
+def summarize_timings(samples):
+    """
+    Summarize timing samples in seconds
+    
+    Args:
+        samples: List of durations in seconds
+    
+    Returns:
+        dict: runs, mean, min, median, p95, p99, max and the bootstrap
+            95% confidence interval of the median
+    """
+    values = np.asarray(samples, dtype=float)
+    if values.size == 0:
+        return {"runs": 0}
+    ci_low, ci_high = bootstrap_ci(values)
+    return {
+        "runs": int(values.size),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "median": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+        "median_ci_low": ci_low,
+        "median_ci_high": ci_high
+    }
+
+
+def bootstrap_ci(samples, confidence=0.95, resamples=2000, seed=0):
+    """
+    Percentile bootstrap confidence interval of the median
+    
+    Args:
+        samples: Timing samples
+        confidence: Confidence level
+        resamples: Number of bootstrap resamples
+        seed: Random seed, fixed so reports are reproducible
+    
+    Returns:
+        tuple: (low, high)
+    """
+    values = np.asarray(samples, dtype=float)
+    if values.size < 2:
+        value = float(values[0]) if values.size else float("nan")
+        return value, value
+    rng = np.random.default_rng(seed)
+    medians = np.median(values[rng.integers(0, values.size, (resamples, values.size))], axis=1)
+    alpha = (1 - confidence) / 2
+    return float(np.quantile(medians, alpha)), float(np.quantile(medians, 1 - alpha))
+
+
+def speedup_ci(baseline_samples, candidate_samples, confidence=0.95, resamples=2000, seed=0):
+    """
+    Median speedup of a candidate over a baseline with a bootstrap interval
+    
+    Returns:
+        dict: speedup (ratio of medians), ci_low and ci_high
+    """
+    baseline = np.asarray(baseline_samples, dtype=float)
+    candidate = np.asarray(candidate_samples, dtype=float)
+    rng = np.random.default_rng(seed)
+    ratios = (
+        np.median(baseline[rng.integers(0, baseline.size, (resamples, baseline.size))], axis=1) /
+        np.median(candidate[rng.integers(0, candidate.size, (resamples, candidate.size))], axis=1)
+    )
+    alpha = (1 - confidence) / 2
+    return {
+        "speedup": float(np.median(baseline) / np.median(candidate)),
+        "ci_low": float(np.quantile(ratios, alpha)),
+        "ci_high": float(np.quantile(ratios, 1 - alpha))
+    }
+
+
+def _timed_run(name, orders_collection, driver, start_date, end_date):
+    """Run a strategy once and return its stage times plus wall_time"""
+    scenario_func, options = STRATEGIES[name]
+    start_time = time.perf_counter()
+    results = scenario_func(orders_collection, driver, start_date, end_date, **options)
+    timings = {key: results[key] for key in STAGE_KEYS}
+    timings["wall_time"] = time.perf_counter() - start_time
+    return timings
+
+
+def run_strategy(name, orders_collection, driver, start_date, end_date, repeats=5, warmup=1):
+    """
+    Time one strategy repeatedly after discarded warm-up runs
+    
+    Args:
+        name: Registered strategy name
+        orders_collection: MongoDB orders collection
+        driver: Neo4j driver instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        repeats: Number of measured runs
+        warmup: Number of unmeasured runs before measuring
+    
+    Returns:
+        dict: Raw samples and summary per stage, plus end-to-end wall_time
+    """
+    _, options = STRATEGIES[name]
+    
+    for _ in range(warmup):
+        _timed_run(name, orders_collection, driver, start_date, end_date)
+    
+    samples = {key: [] for key in STAGE_KEYS + ["wall_time"]}
+    for _ in range(repeats):
+        timings = _timed_run(name, orders_collection, driver, start_date, end_date)
+        for key, value in timings.items():
+            samples[key].append(value)
+    
+    return {
+        "options": {key: str(value) for key, value in options.items()},
+        "samples": samples,
+        "summary": {key: summarize_timings(values) for key, values in samples.items()}
+    }
+
+
+def collect_environment(mongo_db, driver):
+    """
+    Record the dataset size and index state a benchmark ran against
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+    
+    Returns:
+        dict: Collection sizes, index names and client versions
+    """
+    environment = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "pymongo": pymongo.version,
+        "neo4j_driver": neo4j.__version__,
+        "orders_count": mongo_db["orders"].estimated_document_count(),
+        "mongo_indexes": sorted(mongo_db["orders"].index_information().keys())
+    }
+    try:
+        with driver.session() as session:
+            environment["neo4j_indexes"] = sorted(
+                record["name"] for record in session.run("SHOW INDEXES YIELD name")
+            )
+            environment["route_count"] = session.run(
+                "MATCH ()-[r:CONNECTED_TO]->() RETURN count(r) AS route_count"
+            ).single()["route_count"]
+    except Exception as e:
+        environment["neo4j_error"] = str(e)
+    return environment
+
+
+def run_benchmark(mongo_db, driver, start_date, end_date, strategies=None, repeats=5, warmup=1):
+    """
+    Benchmark several strategies against the same database state
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        strategies: Strategy names, defaults to all registered strategies
+        repeats: Number of measured runs per strategy
+        warmup: Number of unmeasured runs per strategy
+    
+    Returns:
+        dict: Report with parameters, environment and per-strategy results
+    """
+    strategies = strategies or list(STRATEGIES)
+    orders_collection = mongo_db["orders"]
+    return {
+        "parameters": {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "repeats": repeats,
+            "warmup": warmup
+        },
+        "environment": collect_environment(mongo_db, driver),
+        "strategies": {
+            name: run_strategy(name, orders_collection, driver, start_date, end_date,
+                               repeats, warmup)
+            for name in strategies
+        }
+    }
+
+
+def clear_caches(mongo_db, driver):
+    """
+    Clear the result cache and the server-side plan caches before a cold run
+    
+    Plan cache clears are best effort: they need privileges that a
+    read-only benchmark user may not have.
+    """
+    query_cache.invalidate()
+    for name in ("orders", ROLLUP_COLLECTION, TIMESERIES_COLLECTION):
+        try:
+            mongo_db.command("planCacheClear", name)
+        except Exception:
+            pass
+    try:
+        with driver.session() as session:
+            session.run("CALL db.clearQueryCaches()").consume()
+    except Exception:
+        pass
+
+
+def present_mongo_indexes(mongo_db):
+    """Return collection -> names of the managed MongoDB indexes that exist"""
+    present = {}
+    for collection, names in managed_mongo_indexes().items():
+        existing = set(mongo_db[collection].index_information())
+        present[collection] = [name for name in names if name in existing]
+    return present
+
+
+def apply_index_state(mongo_db, driver, index_state, profile=MONGO_INDEX_PROFILE):
+    """
+    Create or drop the scenario indexes so a comparison does not depend on
+    whatever state the database was left in
+    
+    The state covers every managed index of every profile: "created"
+    builds the profile's indexes and drops the other profile's, "dropped"
+    drops them all. The index manager's plan runs to completion first.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        index_state: "as_is", "created" or "dropped"
+        profile: Index profile pinned by "created", see MONGO_INDEX_PROFILES
+    
+    Returns:
+        dict: Collection -> managed MongoDB indexes present afterwards
+    """
+    if index_state in (INDEX_STATE_CREATED, INDEX_STATE_DROPPED):
+        manager = IndexManager()
+        manager.start(mongo_db, driver, profile, drop_all=index_state == INDEX_STATE_DROPPED)
+        manager.wait()
+        failures = [f"{task['name']}: {task['error']}" for task in manager.status()
+                    if task['state'] == STATE_FAILED]
+        if failures:
+            raise RuntimeError("Could not apply the index state: " + "; ".join(failures))
+    elif index_state != INDEX_STATE_AS_IS:
+        raise ValueError(f"Unknown index state: {index_state}")
+    query_cache.invalidate()
+    return present_mongo_indexes(mongo_db)
+
+
+def run_comparison(mongo_db, driver, start_date, end_date, strategies, repeats=10, warmup=1,
+                   phases=(PHASE_COLD, PHASE_WARM), index_state=INDEX_STATE_AS_IS,
+                   index_profile=MONGO_INDEX_PROFILE, progress=None):
+    """
+    Compare strategies with interleaved runs in cold and warm phases
+    
+    Runs alternate the strategy order on every iteration (A B, B A, ...), so
+    drift in server load or caching affects all strategies alike.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        strategies: Strategy names; the first one is the speedup baseline
+        repeats: Measured runs per strategy and phase
+        warmup: Discarded runs per strategy before the warm phase
+        phases: Phases to run, "cold" and/or "warm"
+        index_state: "as_is", "created" or "dropped", applied before running
+        index_profile: Index profile pinned by index_state "created"
+        progress: Optional callable(done, total) called after each run
+    
+    Returns:
+        dict: Report with parameters, environment and, per phase and
+            strategy, raw samples, per-stage summaries and the speedup
+            over the baseline strategy; the parameters record the index
+            profile and the managed indexes present during the runs
+    """
+    indexes = apply_index_state(mongo_db, driver, index_state, index_profile)
+    orders_collection = mongo_db["orders"]
+    total_runs = len(phases) * repeats * len(strategies)
+    done = 0
+    
+    report_phases = {}
+    for phase in phases:
+        if phase == PHASE_WARM:
+            for name in strategies:
+                for _ in range(warmup):
+                    _timed_run(name, orders_collection, driver, start_date, end_date)
+        
+        samples = {name: {key: [] for key in STAGE_KEYS + ["wall_time"]} for name in strategies}
+        for iteration in range(repeats):
+            order = strategies if iteration % 2 == 0 else list(reversed(strategies))
+            for name in order:
+                if phase == PHASE_COLD:
+                    clear_caches(mongo_db, driver)
+                timings = _timed_run(name, orders_collection, driver, start_date, end_date)
+                for key, value in timings.items():
+                    samples[name][key].append(value)
+                done += 1
+                if progress:
+                    progress(done, total_runs)
+        
+        baseline = strategies[0]
+        report_phases[phase] = {
+            name: {
+                "samples": samples[name],
+                "summary": {key: summarize_timings(values)
+                            for key, values in samples[name].items()},
+                "speedup": speedup_ci(samples[baseline]["wall_time"],
+                                      samples[name]["wall_time"])
+            }
+            for name in strategies
+        }
+    
+    return {
+        "parameters": {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "repeats": repeats,
+            "warmup": warmup,
+            "phases": list(phases),
+            "index_state": index_state,
+            "index_profile": index_profile if index_state == INDEX_STATE_CREATED else None,
+            "indexes": indexes,
+            "baseline": strategies[0]
+        },
+        "environment": collect_environment(mongo_db, driver),
+        "phases": report_phases
+    }
+
+
+def compare_timeseries_storage(mongo_db, start_date, end_date, route_pairs, repeats=5):
+    """
+    Compare orders with its time-series copy on storage and query latency
+    
+    Both collections answer the same analytics pipelines with whatever
+    indexes currently exist. Each pipeline runs once per collection
+    unmeasured, then alternately on both so drift affects them alike.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        route_pairs: List of (origin, destination) tuples for the route queries
+        repeats: Measured runs per pipeline and collection
+    
+    Returns:
+        dict: Report with parameters, storage per collection and, per
+            pipeline, the latency summaries of both collections and the
+            median speedup of the time-series copy over orders
+    """
+    collections = {
+        SOURCE_ORDERS: mongo_db["orders"],
+        SOURCE_TIMESERIES: mongo_db[TIMESERIES_COLLECTION]
+    }
+    pipelines = {
+        source: analytics_pipelines(start_date, end_date, route_pairs, source)
+        for source in collections
+    }
+    names = [name for name in pipelines[SOURCE_ORDERS] if name in pipelines[SOURCE_TIMESERIES]]
+    
+    queries = {}
+    for name in names:
+        for source, collection in collections.items():
+            list(collection.aggregate(pipelines[source][name]))
+        
+        samples = {source: [] for source in collections}
+        for iteration in range(repeats):
+            order = list(collections) if iteration % 2 == 0 else list(reversed(collections))
+            for source in order:
+                start_time = time.perf_counter()
+                list(collections[source].aggregate(pipelines[source][name]))
+                samples[source].append(time.perf_counter() - start_time)
+        
+        queries[name] = {
+            **{source: summarize_timings(values) for source, values in samples.items()},
+            "speedup": speedup_ci(samples[SOURCE_ORDERS], samples[SOURCE_TIMESERIES])
+        }
+    
+    return {
+        "parameters": {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "repeats": repeats,
+            "routes": len(route_pairs)
+        },
+        "storage": {
+            SOURCE_ORDERS: collection_storage(mongo_db, "orders"),
+            SOURCE_TIMESERIES: collection_storage(mongo_db, TIMESERIES_COLLECTION)
+        },
+        "queries": queries
+    }
+
+
+def write_report(report, path):
+    """Write a benchmark report as indented JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def format_report(report):
+    """
+    Render the per-stage medians and tail latencies as a text table
+    
+    Returns:
+        str: Table with one row per strategy and stage
+    """
+    lines = [f"{'strategy':<30}{'stage':<20}{'median':>10}{'p95':>10}{'p99':>10}"]
+    for name, result in report["strategies"].items():
+        for key in STAGE_KEYS + ["wall_time"]:
+            stats = result["summary"][key]
+            lines.append(f"{name:<30}{key:<20}{stats['median']:>10.4f}"
+                         f"{stats['p95']:>10.4f}{stats['p99']:>10.4f}")
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+"""
+Query cache module
+Process-wide LRU cache with TTL for analytics results, shared by all
+Streamlit sessions, with coalescing of identical in-flight requests
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from config.config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECONDS
+
+
+class _InFlightCall:
+    """A computation other callers with the same key can wait on"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    """
+    Bounded LRU cache with per-entry TTL and request coalescing
+    
+    Concurrent requests for a key that is not cached yet wait for the first
+    caller's computation instead of hitting the databases themselves.
+    invalidate() drops every entry and prevents computations that started
+    before it from being stored afterwards.
+    """
+    
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(function_name, start_date, end_date, filters=None):
+        """
+        Build a cache key from the query identity
+        
+        Args:
+            function_name: Name of the analytics entry point
+            start_date: Start date (datetime object)
+            end_date: End date (datetime object)
+            filters: Optional dict of additional query options
+        
+        Returns:
+            tuple: Hashable cache key
+        """
+        return (function_name, start_date, end_date, tuple(sorted((filters or {}).items())))
+    
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing it at most once
+        
+        Args:
+            key: Cache key from make_key()
+            compute: Zero-argument callable producing the value
+        
+        Returns:
+            tuple: (value, True if served from cache or a coalesced call)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, True
+                del self._entries[key]
+            
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+                self.misses += 1
+                generation = self._generation
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        
+        try:
+            call.value = compute()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if call.error is None and generation == self._generation:
+                    self._store(key, call.value)
+            call.event.set()
+        
+        return call.value, False
+    
+    def _store(self, key, value):
+        """Insert a value and evict least recently used entries (caller holds the lock)"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self):
+        """Drop all cached results, e.g. after index or rollup changes"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+    
+    def get_stats(self):
+        """
+        Return cache counters
+        
+        Returns:
+            dict: hits, misses, coalesced, evictions, invalidations, size and hit_ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
+
+
+# Shared by every session served by this process
+query_cache = QueryCache()
@@ -0,0 +1,164 @@
+"""
+Daily trend store module
+Keeps per-day sales results and fetches only the days a requested range
+does not cover yet, so extending a range costs time for the new days only
+"""
+
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+
+import pandas as pd
+
+from config.config import DAILY_TREND_FRESHNESS_DAYS
+
+DAILY_COLUMNS = ["date", "daily_sales", "daily_orders"]
+
+
+def missing_intervals(days, known):
+    """
+    Group the days that are not known into contiguous intervals
+    
+    Args:
+        days: Sorted list of dates
+        known: Set of dates already stored
+    
+    Returns:
+        list: (first_day, last_day) tuples
+    """
+    intervals = []
+    for day in days:
+        if day in known:
+            continue
+        if intervals and intervals[-1][1] == day - timedelta(days=1):
+            intervals[-1] = (intervals[-1][0], day)
+        else:
+            intervals.append((day, day))
+    return intervals
+
+
+def orders_fingerprint(orders_collection):
+    """
+    Cheap generation marker of the orders collection
+    
+    Regenerating or clearing the dataset (manage.py generate --drop or
+    clear_dataset(), possibly from another process) changes the document
+    count or the newest _id. Both come from collection metadata and the
+    _id index.
+    
+    Args:
+        orders_collection: MongoDB orders collection
+    
+    Returns:
+        tuple: (estimated document count, newest _id or None)
+    """
+    newest = orders_collection.find_one({}, projection={"_id": 1}, sort=[("_id", -1)])
+    return orders_collection.estimated_document_count(), newest["_id"] if newest else None
+
+
+class DailyTrendStore:
+    """
+    Per-day daily trend results keyed by data source
+    
+    Ranges are resolved to whole days, like the rollup. Days that departed
+    more than freshness_days ago are treated as immutable and never fetched
+    again; more recent days are re-fetched on every request. A source's
+    days are all dropped when the orders fingerprint changes, since then
+    the historical days were rewritten as well.
+    """
+    
+    def __init__(self, freshness_days=DAILY_TREND_FRESHNESS_DAYS, today=date.today):
+        self.freshness_days = freshness_days
+        self._today = today
+        
+        self._lock = threading.Lock()
+        self._days = {}
+        self._fingerprints = {}
+        self.days_fetched = 0
+        self.days_served = 0
+        self.intervals_fetched = 0
+    
+    def get_sales_by_date(self, fetch, orders_collection, start_date, end_date, source):
+        """
+        Return the daily trend for a range, fetching only unknown or recent days
+        
+        Args:
+            fetch: Function with the get_sales_by_date signature, used for
+                each missing interval
+            orders_collection: MongoDB orders collection
+            start_date: Start date (datetime object)
+            end_date: End date (datetime object)
+            source: Data source the days are fetched from
+        
+        Returns:
+            DataFrame: date, daily_sales, daily_orders sorted by date, with
+                only the days that have orders
+        """
+        first_day, last_day = start_date.date(), end_date.date()
+        days = [first_day + timedelta(days=offset)
+                for offset in range((last_day - first_day).days + 1)]
+        fresh_from = self._today() - timedelta(days=self.freshness_days)
+        fingerprint = orders_fingerprint(orders_collection)
+        
+        with self._lock:
+            if self._fingerprints.get(source) != fingerprint:
+                self._days.pop(source, None)
+                self._fingerprints[source] = fingerprint
+            stored = self._days.setdefault(source, {})
+            known = {day for day in days if day in stored and day < fresh_from}
+        
+        for interval_start, interval_end in missing_intervals(days, known):
+            df_interval, _ = fetch(
+                orders_collection,
+                datetime.combine(interval_start, dt_time.min),
+                datetime.combine(interval_end, dt_time.max),
+                source
+            )
+            fetched = {} if df_interval.empty else {
+                row.date.date(): (row.daily_sales, row.daily_orders)
+                for row in df_interval.itertuples(index=False)
+            }
+            interval_days = (interval_end - interval_start).days + 1
+            with self._lock:
+                # Days without orders are stored too, so they are not fetched again
+                for offset in range(interval_days):
+                    day = interval_start + timedelta(days=offset)
+                    stored[day] = fetched.get(day, (0, 0))
+                self.days_fetched += interval_days
+                self.intervals_fetched += 1
+        
+        with self._lock:
+            rows = [(day, *stored[day]) for day in days if stored[day][1] > 0]
+            self.days_served += len(days)
+        
+        if not rows:
+            return pd.DataFrame()
+        df_daily = pd.DataFrame(rows, columns=DAILY_COLUMNS)
+        df_daily['date'] = pd.to_datetime(df_daily['date'])
+        return df_daily
+    
+    def invalidate(self, source=None):
+        """Forget stored days, for one source or all of them"""
+        with self._lock:
+            if source is None:
+                self._days.clear()
+            else:
+                self._days.pop(source, None)
+    
+    def get_stats(self):
+        """
+        Return store counters
+        
+        Returns:
+            dict: days_stored, days_fetched, days_served and intervals_fetched
+        """
+        with self._lock:
+            return {
+                "days_stored": sum(len(days) for days in self._days.values()),
+                "days_fetched": self.days_fetched,
+                "days_served": self.days_served,
+                "intervals_fetched": self.intervals_fetched
+            }
+
+
+# Shared by every session served by this process
+daily_trend_store = DailyTrendStore()
@@ -3,12 +3,100 @@ Database utilities module
 Handles database connections and operations for MongoDB and Neo4j
 """
 
+import atexit
+import threading
+import time
+
 import streamlit as st
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import OperationFailure
 from neo4j import GraphDatabase
-from config.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, MONGO_URI, MONGO_DB_NAME
+from config.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, MONGO_URI, MONGO_DB_NAME,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, NEO4J_MAX_POOL_SIZE,
+    CONNECTION_HEALTH_CHECK_INTERVAL, MONGO_INDEX_PROFILE
+)
+
+from .tracing import traced
+
+INDEX_PROFILE_BASIC = "basic"
+INDEX_PROFILE_COVERED = "covered"
+
+# Index profile -> collection -> [(index name, keys)]
+# The covered profile's compound indexes end in every field the analytics
+# pipelines read, so $match + $group run as IXSCAN + PROJECTION_COVERED
+# without fetching documents. They replace idx_depart_date and
+# idx_origin_dest_date, which are prefixes of them.
+MONGO_INDEX_PROFILES = {
+    INDEX_PROFILE_BASIC: {
+        "orders": [
+            ("idx_depart_date", [("depart_date", 1)]),
+            ("idx_flight_id", [("flight_id", 1)]),
+            ("idx_origin_dest_date", [("origin", 1), ("destination", 1), ("depart_date", 1)])
+        ],
+        "flight_prices": [
+            ("idx_fp_id", [("id", 1)])
+        ]
+    },
+    INDEX_PROFILE_COVERED: {
+        "orders": [
+            # Total sales, daily trend, top routes and the monthly graph sales sync
+            ("idx_date_route_price",
+             [("depart_date", 1), ("origin", 1), ("destination", 1), ("total_price", 1)]),
+            # Route sales batches (pairs and cross product) and single-route queries
+            ("idx_route_date_price",
+             [("origin", 1), ("destination", 1), ("depart_date", 1), ("total_price", 1)]),
+            ("idx_flight_id", [("flight_id", 1)])
+        ],
+        "flight_prices": [
+            ("idx_fp_id", [("id", 1)])
+        ],
+        "daily_route_sales": [
+            ("idx_rollup_day_route_totals",
+             [("day", 1), ("origin", 1), ("destination", 1),
+              ("total_sales", 1), ("order_count", 1)])
+        ]
+    }
+}
+
+
+
+def managed_mongo_indexes():
+    """
+    Return collection -> index names created by any profile
+    
+    Dropping or replacing indexes works on this union, so switching
+    profiles never leaves the other profile's indexes behind.
+    """
+    managed = {}
+    for profile in MONGO_INDEX_PROFILES.values():
+        for collection, indexes in profile.items():
+            names = managed.setdefault(collection, [])
+            names.extend(name for name, _ in indexes if name not in names)
+    return managed
+
 
+# Error code of dropping an index that does not exist
+MONGO_INDEX_NOT_FOUND = 27
 
+# Neo4j index name -> creation statement
+NEO4J_INDEXES = {
+    # Index on airport codes for faster lookups
+    "idx_airport_code": """
+        CREATE INDEX idx_airport_code IF NOT EXISTS
+        FOR (a:Airport)
+        ON (a.airport_code)
+    """,
+    # Index on route distance and flight time
+    "idx_ct_distance_time": """
+        CREATE INDEX idx_ct_distance_time IF NOT EXISTS
+        FOR ()-[r:CONNECTED_TO]-()
+        ON (r.distance_km, r.flight_time_hr)
+    """
+}
+
+
+@traced("connections.init")
 def init_connections():
     """
     Initialize connections to MongoDB and Neo4j databases
@@ -32,61 +120,271 @@ def init_connections():
         return None, None, None
 
 
-def create_mongodb_indexes(mongo_db):
+class _PoolWaitListener(monitoring.ConnectionPoolListener):
+    """Records how long MongoDB operations wait to check out a pooled connection"""
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+    
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        wait = time.perf_counter() - started
+        self._local.started = None
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+    
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+    
+    # Remaining pool events are not needed for wait-time metrics
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        pass
+    
+    def connection_checked_in(self, event):
+        pass
+
+
+class ConnectionManager:
+    """
+    Process-wide owner of the Neo4j driver and MongoClient
+    
+    Both clients are created on first use and shared by every Streamlit
+    session. Connectivity is re-verified at most once per health check
+    interval instead of on every interaction, and a failed check rebuilds
+    the clients once before giving up.
+    """
+    
+    def __init__(self, mongo_max_pool_size=MONGO_MAX_POOL_SIZE,
+                 mongo_min_pool_size=MONGO_MIN_POOL_SIZE,
+                 neo4j_max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 health_check_interval=CONNECTION_HEALTH_CHECK_INTERVAL):
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.mongo_min_pool_size = mongo_min_pool_size
+        self.neo4j_max_pool_size = neo4j_max_pool_size
+        self.health_check_interval = health_check_interval
+        
+        self._lock = threading.Lock()
+        self._driver = None
+        self._mongo_client = None
+        self._last_health_check = 0.0
+        self._pool_listener = _PoolWaitListener()
+        
+        self._acquisitions = 0
+        self._creations = 0
+        self._health_checks = 0
+        self._acquire_time = 0.0
+    
+    def _connect(self):
+        """Create both clients and verify them (caller holds the lock)"""
+        self._driver = GraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=self.neo4j_max_pool_size
+        )
+        self._mongo_client = MongoClient(
+            MONGO_URI,
+            serverSelectionTimeoutMS=5000,
+            maxPoolSize=self.mongo_max_pool_size,
+            minPoolSize=self.mongo_min_pool_size,
+            event_listeners=[self._pool_listener]
+        )
+        self._creations += 1
+        self._check_health()
+    
+    def _check_health(self):
+        """Verify both clients and remember when (caller holds the lock)"""
+        self._driver.verify_connectivity()
+        self._mongo_client.admin.command('ping')
+        self._health_checks += 1
+        self._last_health_check = time.monotonic()
+    
+    def _close_clients(self):
+        """Close both clients if open (caller holds the lock)"""
+        if self._driver is not None:
+            self._driver.close()
+        if self._mongo_client is not None:
+            self._mongo_client.close()
+        self._driver = None
+        self._mongo_client = None
+    
+    def get_connections(self):
+        """
+        Return the shared connections, creating or re-verifying them if needed
+        
+        Returns:
+            tuple: (neo4j_driver, mongo_client, mongo_db)
+        """
+        start_time = time.perf_counter()
+        with self._lock:
+            self._acquisitions += 1
+            try:
+                if self._driver is None or self._mongo_client is None:
+                    self._connect()
+                elif time.monotonic() - self._last_health_check >= self.health_check_interval:
+                    try:
+                        self._check_health()
+                    except Exception:
+                        self._close_clients()
+                        self._connect()
+            except Exception:
+                self._close_clients()
+                raise
+            finally:
+                self._acquire_time += time.perf_counter() - start_time
+            
+            return self._driver, self._mongo_client, self._mongo_client[MONGO_DB_NAME]
+    
+    def close(self):
+        """Close the shared clients; the next request reconnects"""
+        with self._lock:
+            self._close_clients()
+    
+    def get_metrics(self):
+        """
+        Return reuse and pool wait statistics
+        
+        Returns:
+            dict: Acquisition counts, reuse ratio and wait times in seconds
+        """
+        with self._lock:
+            acquisitions = self._acquisitions
+            reuses = acquisitions - self._creations
+            listener = self._pool_listener
+            return {
+                "acquisitions": acquisitions,
+                "connections_created": self._creations,
+                "reuses": reuses,
+                "reuse_ratio": reuses / acquisitions if acquisitions else 0.0,
+                "health_checks": self._health_checks,
+                "avg_acquire_time": self._acquire_time / acquisitions if acquisitions else 0.0,
+                "mongo_checkouts": listener.checkouts,
+                "mongo_avg_pool_wait": (listener.total_wait / listener.checkouts
+                                        if listener.checkouts else 0.0),
+                "mongo_max_pool_wait": listener.max_wait
+            }
+
+
+_connection_manager = None
+_connection_manager_lock = threading.Lock()
+
+
+def get_connection_manager():
+    """
+    Return the process-wide connection manager
+    
+    The manager lives at module level, so it survives Streamlit reruns and
+    is shared by all sessions served by the same process.
+    """
+    global _connection_manager
+    with _connection_manager_lock:
+        if _connection_manager is None:
+            _connection_manager = ConnectionManager()
+            atexit.register(_connection_manager.close)
+        return _connection_manager
+
+
+@traced("connections.acquire")
+def get_shared_connections():
+    """
+    Get the shared database connections for the current interaction
+    
+    Unlike init_connections(), the returned clients must not be closed by
+    the caller.
+    
+    Returns:
+        tuple: (neo4j_driver, mongo_client, mongo_db) or (None, None, None) if connection fails
+    """
+    try:
+        return get_connection_manager().get_connections()
+    except Exception as e:
+        st.error(f"Error connecting to databases: {e}")
+        return None, None, None
+
+
+@traced("mongo.create_indexes")
+def create_mongodb_indexes(mongo_db, profile=MONGO_INDEX_PROFILE):
     """
     Create indexes on MongoDB collections for improved query performance
     
     Args:
         mongo_db: MongoDB database instance
+        profile: Index profile name, see MONGO_INDEX_PROFILES
         
     Returns:
         bool: True if indexes created successfully, False otherwise
     """
-    orders = mongo_db["orders"]
-    flight_prices = mongo_db["flight_prices"]
-
     try:
-        # Create single field indexes
-        orders.create_index([("depart_date", 1)], name="idx_depart_date")
-        orders.create_index([("flight_id", 1)], name="idx_flight_id")
-        
-        # Create compound index for route-date queries
-        orders.create_index(
-            [("origin", 1), ("destination", 1), ("depart_date", 1)],
-            name="idx_origin_dest_date"
-        )
-        
-        flight_prices.create_index([("id", 1)], name="idx_fp_id")
+        for collection, indexes in MONGO_INDEX_PROFILES[profile].items():
+            for name, keys in indexes:
+                mongo_db[collection].create_index(keys, name=name)
         return True
     except Exception as e:
         st.error(f"Error creating MongoDB indexes: {e}")
         return False
 
 
+@traced("mongo.drop_indexes")
 def drop_mongodb_indexes(mongo_db):
     """
     Drop existing MongoDB indexes (for testing/cleanup)
     
+    Every index of every profile is dropped, so no profile's indexes are
+    left behind. Each index is dropped on its own, so one failure does not
+    keep the others in place; indexes that do not exist are skipped.
+    
     Args:
         mongo_db: MongoDB database instance
         
     Returns:
-        bool: True if indexes dropped successfully, False otherwise
+        bool: True if every index is gone, False otherwise
     """
-    orders = mongo_db["orders"]
-    flight_prices = mongo_db["flight_prices"]
-
-    try:
-        orders.drop_index("idx_depart_date")
-        orders.drop_index("idx_flight_id")
-        orders.drop_index("idx_origin_dest_date")
-        flight_prices.drop_index("idx_fp_id")
-        return True
-    except Exception as e:
-        st.error(f"Error dropping MongoDB indexes: {e}")
+    failures = []
+    for collection, names in managed_mongo_indexes().items():
+        for name in names:
+            try:
+                mongo_db[collection].drop_index(name)
+            except OperationFailure as e:
+                if e.code != MONGO_INDEX_NOT_FOUND:
+                    failures.append(f"{collection}.{name}: {e}")
+            except Exception as e:
+                failures.append(f"{collection}.{name}: {e}")
+    
+    if failures:
+        st.error("Error dropping MongoDB indexes: " + "; ".join(failures))
         return False
+    return True
 
 
+@traced("neo4j.create_indexes")
 def create_neo4j_indexes(tx):
     """
     Create indexes on Neo4j database for improved query performance
@@ -94,21 +392,11 @@ def create_neo4j_indexes(tx):
     Args:
         tx: Neo4j transaction object
     """
-    # Create index on airport codes for faster lookups
-    tx.run("""
-        CREATE INDEX idx_airport_code IF NOT EXISTS
-        FOR (a:Airport)
-        ON (a.airport_code);
-    """)
-    
-    # Create index on route distance and flight time
-    tx.run("""
-        CREATE INDEX idx_ct_distance_time IF NOT EXISTS
-        FOR ()-[r:CONNECTED_TO]-()
-        ON (r.distance_km, r.flight_time_hr);
-    """)
+    for statement in NEO4J_INDEXES.values():
+        tx.run(statement)
 
 
+@traced("neo4j.drop_indexes")
 def drop_neo4j_indexes(tx):
     """
     Drop existing Neo4j indexes (for testing/cleanup)
@@ -116,5 +404,5 @@ def drop_neo4j_indexes(tx):
     Args:
         tx: Neo4j transaction object
     """
-    tx.run("DROP INDEX idx_airport_code IF EXISTS")
-    tx.run("DROP INDEX idx_ct_distance_time IF EXISTS")
+    for name in NEO4J_INDEXES:
+        tx.run(f"DROP INDEX {name} IF EXISTS")
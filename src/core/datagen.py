@@ -0,0 +1,489 @@
+"""
+Synthetic data module
+Generates orders, flight_prices and the Airport/CONNECTED_TO graph at
+configurable scale for performance testing
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import MongoClient
+
+from config.config import MONGO_URI
+from .timeseries import TIMESERIES_COLLECTION, ensure_timeseries_collection, to_timeseries_documents
+
+# Hubs with real coordinates; further airports are synthetic
+HUB_AIRPORTS = [
+    ("CGK", "Soekarno-Hatta", "Jakarta", "Indonesia", -6.1256, 106.6559),
+    ("DPS", "I Gusti Ngurah Rai", "Denpasar", "Indonesia", -8.7482, 115.1672),
+    ("SUB", "Juanda", "Surabaya", "Indonesia", -7.3798, 112.7868),
+    ("KNO", "Kualanamu", "Medan", "Indonesia", 3.6422, 98.8853),
+    ("UPG", "Sultan Hasanuddin", "Makassar", "Indonesia", -5.0617, 119.5540),
+    ("BPN", "Sultan Aji Muhammad Sulaiman", "Balikpapan", "Indonesia", -1.2683, 116.8945),
+    ("YIA", "Yogyakarta International", "Yogyakarta", "Indonesia", -7.9007, 110.0573),
+    ("PLM", "Sultan Mahmud Badaruddin II", "Palembang", "Indonesia", -2.8983, 104.6999),
+    ("PDG", "Minangkabau", "Padang", "Indonesia", -0.7869, 100.2809),
+    ("BTH", "Hang Nadim", "Batam", "Indonesia", 1.1210, 104.1190),
+    ("PKU", "Sultan Syarif Kasim II", "Pekanbaru", "Indonesia", 0.4608, 101.4445),
+    ("BDJ", "Syamsudin Noor", "Banjarmasin", "Indonesia", -3.4424, 114.7625),
+    ("MDC", "Sam Ratulangi", "Manado", "Indonesia", 1.5493, 124.9260),
+    ("LOP", "Lombok International", "Praya", "Indonesia", -8.7573, 116.2767),
+    ("SRG", "Ahmad Yani", "Semarang", "Indonesia", -6.9727, 110.3750),
+    ("PNK", "Supadio", "Pontianak", "Indonesia", -0.1507, 109.4039),
+    ("DJJ", "Sentani", "Jayapura", "Indonesia", -2.5769, 140.5164),
+    ("AMQ", "Pattimura", "Ambon", "Indonesia", -3.7103, 128.0891),
+    ("KOE", "El Tari", "Kupang", "Indonesia", -10.1716, 123.6711),
+    ("TKG", "Radin Inten II", "Bandar Lampung", "Indonesia", -5.2406, 105.1789),
+    ("SIN", "Changi", "Singapore", "Singapore", 1.3644, 103.9915),
+    ("KUL", "Kuala Lumpur International", "Kuala Lumpur", "Malaysia", 2.7456, 101.7099),
+    ("BKK", "Suvarnabhumi", "Bangkok", "Thailand", 13.6900, 100.7501),
+    ("HKG", "Hong Kong International", "Hong Kong", "China", 22.3080, 113.9185),
+    ("NRT", "Narita", "Tokyo", "Japan", 35.7720, 140.3929),
+    ("ICN", "Incheon", "Seoul", "South Korea", 37.4602, 126.4407),
+    ("JED", "King Abdulaziz", "Jeddah", "Saudi Arabia", 21.6796, 39.1565),
+    ("MED", "Prince Mohammad bin Abdulaziz", "Medina", "Saudi Arabia", 24.5534, 39.7051),
+    ("SYD", "Kingsford Smith", "Sydney", "Australia", -33.9399, 151.1753),
+    ("DXB", "Dubai International", "Dubai", "United Arab Emirates", 25.2532, 55.3657)
+]
+
+AIRLINES = ["GA", "JT", "QG", "ID", "IW", "QZ", "SJ", "IU"]
+
+# Categorical mixes: (values, probabilities)
+CLASS_MIX = (["Economy", "Premium Economy", "Business", "First"], [0.80, 0.08, 0.10, 0.02])
+CLASS_FARE_MULTIPLIER = np.array([1.0, 1.6, 3.2, 5.5])
+STATUS_MIX = (["Confirmed", "Cancelled", "Pending", "Refunded"], [0.85, 0.08, 0.04, 0.03])
+PASSENGER_MIX = ([1, 2, 3, 4, 5, 6], [0.55, 0.25, 0.10, 0.06, 0.03, 0.01])
+
+# Seasonal peaks: (start month, start day, end month, end day, demand boost)
+SEASONAL_PEAKS = [
+    (3, 20, 4, 25, 1.2),    # Ramadhan and Eid homecoming (mudik)
+    (6, 20, 7, 15, 0.6),    # School holidays
+    (12, 15, 12, 31, 0.8),  # Year-end holidays
+    (1, 1, 1, 5, 0.5)       # New Year
+]
+WEEKDAY_FACTOR = np.array([0.95, 0.85, 0.85, 0.95, 1.2, 1.05, 1.15])
+
+FLIGHTS_PER_ROUTE = 3
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def generate_airports(count, rng):
+    """
+    Generate Airport node properties, real hubs first
+    
+    Args:
+        count: Number of airports
+        rng: numpy Generator
+    
+    Returns:
+        list: Dicts with airport_code, airport_name, city, country, latitude, longitude
+    """
+    airports = [
+        dict(zip(("airport_code", "airport_name", "city", "country", "latitude", "longitude"), hub))
+        for hub in HUB_AIRPORTS[:count]
+    ]
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    used = {airport["airport_code"] for airport in airports}
+    index = 0
+    while len(airports) < count:
+        code = "X" + letters[(index // 26) % 26] + letters[index % 26]
+        index += 1
+        if code in used:
+            continue
+        used.add(code)
+        airports.append({
+            "airport_code": code,
+            "airport_name": f"Regional Airport {code}",
+            "city": f"City {code}",
+            "country": "Indonesia",
+            "latitude": round(float(rng.uniform(-11.0, 6.0)), 4),
+            "longitude": round(float(rng.uniform(95.0, 141.0)), 4)
+        })
+    return airports
+
+
+def generate_routes(airports, routes_per_airport, rng):
+    """
+    Generate CONNECTED_TO relationships in both directions, favoring hubs
+    
+    Args:
+        airports: Output of generate_airports()
+        routes_per_airport: Outgoing routes chosen per airport
+        rng: numpy Generator
+    
+    Returns:
+        list: Dicts with origin, destination, distance_km, flight_time_hr,
+            frequency_per_week and airlines
+    """
+    count = len(airports)
+    hub_weight = 1.0 / np.arange(1, count + 1) ** 0.8
+    pairs = set()
+    for i in range(count):
+        weights = hub_weight.copy()
+        weights[i] = 0.0
+        k = min(routes_per_airport, count - 1)
+        for j in rng.choice(count, size=k, replace=False, p=weights / weights.sum()):
+            pairs.add((i, int(j)))
+            pairs.add((int(j), i))
+    
+    routes = []
+    for i, j in sorted(pairs):
+        a, b = airports[i], airports[j]
+        distance = _haversine_km(a["latitude"], a["longitude"], b["latitude"], b["longitude"])
+        carriers = rng.choice(AIRLINES, size=int(rng.integers(1, 4)), replace=False)
+        routes.append({
+            "origin": a["airport_code"],
+            "destination": b["airport_code"],
+            "distance_km": round(distance, 1),
+            "flight_time_hr": round(distance / 750.0 + 0.5, 2),
+            "frequency_per_week": int(7 * FLIGHTS_PER_ROUTE * hub_weight[min(i, j)] ** 0.5) + 1,
+            "airlines": sorted(carriers.tolist())
+        })
+    return routes
+
+
+def _day_weights(days):
+    """Relative booking demand per departure day (seasonal peaks and weekdays)"""
+    weights = np.empty(len(days))
+    for index, day in enumerate(days):
+        weight = WEEKDAY_FACTOR[day.weekday()]
+        for start_month, start_day, end_month, end_day, boost in SEASONAL_PEAKS:
+            if (start_month, start_day) <= (day.month, day.day) <= (end_month, end_day):
+                weight *= 1.0 + boost
+        weights[index] = weight
+    return weights / weights.sum()
+
+
+def build_order_spec(routes, start_date, end_date, total_orders, rng, popularity_skew=1.1):
+    """
+    Precompute the sampling tables shared by all order writers
+    
+    Route popularity follows a Zipf-like distribution over a random route
+    ranking, so a few routes carry most of the traffic.
+    
+    Args:
+        routes: Output of generate_routes()
+        start_date: First departure day (datetime object)
+        end_date: Last departure day (datetime object)
+        total_orders: Total number of orders to generate
+        rng: numpy Generator
+        popularity_skew: Zipf exponent of route popularity
+    
+    Returns:
+        dict: Picklable sampling tables
+    """
+    num_days = (end_date.date() - start_date.date()).days + 1
+    days = [start_date.date() + timedelta(days=offset) for offset in range(num_days)]
+    
+    ranks = rng.permutation(len(routes)) + 1
+    route_p = 1.0 / ranks ** popularity_skew
+    
+    # Fixed daily departure times and flight numbers per route
+    flight_hours = rng.integers(5, 22, size=(len(routes), FLIGHTS_PER_ROUTE))
+    flight_minutes = rng.integers(0, 12, size=(len(routes), FLIGHTS_PER_ROUTE)) * 5
+    flight_ids = [
+        [f"{AIRLINES[(r + slot) % len(AIRLINES)]}{100 + (r * FLIGHTS_PER_ROUTE + slot) % 9900}"
+         for slot in range(FLIGHTS_PER_ROUTE)]
+        for r in range(len(routes))
+    ]
+    
+    day_p = _day_weights(days)
+    return {
+        "origins": [route["origin"] for route in routes],
+        "destinations": [route["destination"] for route in routes],
+        "distance_km": np.array([route["distance_km"] for route in routes]),
+        "flight_time_hr": np.array([route["flight_time_hr"] for route in routes]),
+        "route_p": route_p / route_p.sum(),
+        "start_day": datetime.combine(start_date.date(), datetime.min.time()),
+        "day_p": day_p,
+        "season_factor": day_p * num_days,
+        "flight_hours": flight_hours,
+        "flight_minutes": flight_minutes,
+        "flight_ids": flight_ids,
+        "customers": max(1000, total_orders // 4)
+    }
+
+
+def _base_fare(distance_km):
+    """Economy fare per person in rupiah for a distance"""
+    return 350_000 + distance_km * 900
+
+
+def generate_orders(spec, first_index, count, rng):
+    """
+    Generate a batch of order documents matching the orders schema
+    
+    Args:
+        spec: Output of build_order_spec()
+        first_index: Sequence number of the first order (for order_id)
+        count: Number of orders
+        rng: numpy Generator
+    
+    Returns:
+        list: Order documents
+    """
+    route = rng.choice(len(spec["route_p"]), size=count, p=spec["route_p"])
+    day = rng.choice(len(spec["day_p"]), size=count, p=spec["day_p"])
+    slot = rng.integers(0, FLIGHTS_PER_ROUTE, size=count)
+    travel_class = rng.choice(len(CLASS_MIX[0]), size=count, p=CLASS_MIX[1])
+    status = rng.choice(len(STATUS_MIX[0]), size=count, p=STATUS_MIX[1])
+    passengers = rng.choice(PASSENGER_MIX[0], size=count, p=PASSENGER_MIX[1])
+    lead_days = rng.exponential(21.0, size=count).astype(np.int64) + 1
+    customer = rng.integers(1, spec["customers"] + 1, size=count)
+    
+    hours = spec["flight_hours"][route, slot]
+    minutes = spec["flight_minutes"][route, slot]
+    depart_minutes = hours * 60 + minutes
+    arrive_minutes = (depart_minutes + np.round(spec["flight_time_hr"][route] * 60)).astype(np.int64)
+    
+    price_per_person = np.round(
+        _base_fare(spec["distance_km"][route]) *
+        CLASS_FARE_MULTIPLIER[travel_class] *
+        np.sqrt(spec["season_factor"][day]) *
+        rng.lognormal(0.0, 0.15, size=count),
+        -3
+    ).astype(np.int64)
+    total_price = price_per_person * passengers
+    
+    start_day = np.datetime64(spec["start_day"], "m")
+    depart_at = (start_day + day.astype("timedelta64[D]") +
+                 depart_minutes.astype("timedelta64[m]")).astype("datetime64[ms]").tolist()
+    booked_at = (start_day + (day - lead_days).astype("timedelta64[D]")).astype("datetime64[ms]").tolist()
+    
+    origins = spec["origins"]
+    destinations = spec["destinations"]
+    flight_ids = spec["flight_ids"]
+    classes, statuses = CLASS_MIX[0], STATUS_MIX[0]
+    route, slot = route.tolist(), slot.tolist()
+    travel_class, status = travel_class.tolist(), status.tolist()
+    passengers, customer = passengers.tolist(), customer.tolist()
+    depart_minutes, arrive_minutes = depart_minutes.tolist(), arrive_minutes.tolist()
+    price_per_person, total_price = price_per_person.tolist(), total_price.tolist()
+    
+    return [
+        {
+            "order_id": f"ORD{first_index + i:010d}",
+            "customer_id": f"CUST{customer[i]:08d}",
+            "flight_id": flight_ids[route[i]][slot[i]],
+            "origin": origins[route[i]],
+            "destination": destinations[route[i]],
+            "depart_date": depart_at[i],
+            "departure_time": f"{depart_minutes[i] // 60:02d}:{depart_minutes[i] % 60:02d}",
+            "arrival_time": f"{arrive_minutes[i] // 60 % 24:02d}:{arrive_minutes[i] % 60:02d}",
+            "class": classes[travel_class[i]],
+            "passengers": passengers[i],
+            "price_per_person": price_per_person[i],
+            "total_price": total_price[i],
+            "booking_date": booked_at[i],
+            "status": statuses[status[i]]
+        }
+        for i in range(count)
+    ]
+
+
+def generate_flight_prices(spec, route_indexes, first_index):
+    """
+    Generate one economy price document per flight and departure day
+    
+    Args:
+        spec: Output of build_order_spec()
+        route_indexes: Routes to generate prices for
+        first_index: Sequence number of the first document (for id)
+    
+    Returns:
+        list: flight_prices documents
+    """
+    documents = []
+    num_days = len(spec["day_p"])
+    for r in route_indexes:
+        fare = _base_fare(spec["distance_km"][r])
+        for slot in range(FLIGHTS_PER_ROUTE):
+            for day in range(num_days):
+                documents.append({
+                    "id": f"FP{first_index + len(documents):010d}",
+                    "flight_id": spec["flight_ids"][r][slot],
+                    "date": spec["start_day"] + timedelta(days=day),
+                    "price": int(round(fare * math.sqrt(spec["season_factor"][day]), -3)),
+                    "currency": "IDR"
+                })
+    return documents
+
+
+def _write_orders_chunk(task):
+    """Process-pool worker: generate and bulk insert one share of the orders"""
+    mongo_uri, db_name, spec, first_index, count, batch_size, seed, with_timeseries = task
+    rng = np.random.default_rng(seed)
+    client = MongoClient(mongo_uri)
+    try:
+        orders = client[db_name]["orders"]
+        timeseries = client[db_name][TIMESERIES_COLLECTION]
+        written = 0
+        while written < count:
+            size = min(batch_size, count - written)
+            documents = generate_orders(spec, first_index + written, size, rng)
+            if with_timeseries:
+                # Converted first: insert_many adds _id to the order documents
+                timeseries.insert_many(to_timeseries_documents(documents), ordered=False)
+            orders.insert_many(documents, ordered=False)
+            written += size
+    finally:
+        client.close()
+    return count
+
+
+def _write_flight_prices_chunk(task):
+    """Process-pool worker: generate and bulk insert prices for a set of routes"""
+    mongo_uri, db_name, spec, route_indexes, first_index, batch_size = task
+    documents = generate_flight_prices(spec, route_indexes, first_index)
+    client = MongoClient(mongo_uri)
+    try:
+        flight_prices = client[db_name]["flight_prices"]
+        for offset in range(0, len(documents), batch_size):
+            flight_prices.insert_many(documents[offset:offset + batch_size], ordered=False)
+    finally:
+        client.close()
+    return len(documents)
+
+
+def write_graph(driver, airports, routes, batch_size=1000, workers=4):
+    """
+    Write airports and routes to Neo4j with batched UNWIND statements
+    
+    Airports are merged first so the route batches, which run in parallel
+    write transactions, only match existing nodes.
+    
+    Args:
+        driver: Neo4j driver instance
+        airports: Output of generate_airports()
+        routes: Output of generate_routes()
+        batch_size: Rows per UNWIND statement
+        workers: Parallel route writers
+    """
+    def merge_airports(tx, rows):
+        tx.run("""
+            UNWIND $rows AS row
+            MERGE (a:Airport {airport_code: row.airport_code})
+            SET a += row
+        """, rows=rows)
+    
+    def merge_routes(tx, rows):
+        tx.run("""
+            UNWIND $rows AS row
+            MATCH (a:Airport {airport_code: row.origin})
+            MATCH (b:Airport {airport_code: row.destination})
+            MERGE (a)-[r:CONNECTED_TO]->(b)
+            SET r.distance_km = row.distance_km,
+                r.flight_time_hr = row.flight_time_hr,
+                r.frequency_per_week = row.frequency_per_week,
+                r.airlines = row.airlines
+        """, rows=rows)
+    
+    def write_batch(work, rows):
+        with driver.session() as session:
+            session.execute_write(work, rows)
+    
+    with driver.session() as session:
+        session.run("CREATE INDEX idx_airport_code IF NOT EXISTS FOR (a:Airport) ON (a.airport_code)")
+    for offset in range(0, len(airports), batch_size):
+        write_batch(merge_airports, airports[offset:offset + batch_size])
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(write_batch, merge_routes, routes[offset:offset + batch_size])
+            for offset in range(0, len(routes), batch_size)
+        ]
+        for future in futures:
+            future.result()
+
+
+def clear_dataset(mongo_db, driver):
+    """Remove orders, their time-series copy, flight_prices and the airport graph"""
+    mongo_db["orders"].delete_many({})
+    mongo_db.drop_collection(TIMESERIES_COLLECTION)
+    mongo_db["flight_prices"].delete_many({})
+    with driver.session() as session:
+        session.run("""
+            MATCH (a:Airport)
+            CALL { WITH a DETACH DELETE a } IN TRANSACTIONS OF 1000 ROWS
+        """)
+
+
+def generate_dataset(mongo_db, driver, total_orders, start_date, end_date, airports=40,
+                     routes_per_airport=6, batch_size=10000, workers=4, seed=42,
+                     with_flight_prices=True, with_timeseries=False, mongo_uri=MONGO_URI):
+    """
+    Generate a complete synthetic dataset
+    
+    Orders are split into one share per worker process; each worker opens
+    its own MongoClient and inserts unordered batches of batch_size.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        total_orders: Number of orders to generate
+        start_date: First departure day (datetime object)
+        end_date: Last departure day (datetime object)
+        airports: Number of Airport nodes
+        routes_per_airport: Outgoing routes chosen per airport
+        batch_size: Documents per insert_many call
+        workers: Parallel writer processes
+        seed: Random seed for reproducible datasets
+        with_flight_prices: Also generate flight_prices
+        with_timeseries: Also write every order to the orders_ts time-series copy
+        mongo_uri: Connection string the writer processes use
+    
+    Returns:
+        dict: Counts of generated records and elapsed seconds per phase
+    """
+    rng = np.random.default_rng(seed)
+    summary = {}
+    
+    start_time = time.time()
+    airport_rows = generate_airports(airports, rng)
+    route_rows = generate_routes(airport_rows, routes_per_airport, rng)
+    write_graph(driver, airport_rows, route_rows, workers=workers)
+    summary.update(airports=len(airport_rows), routes=len(route_rows),
+                   graph_time=time.time() - start_time)
+    
+    spec = build_order_spec(route_rows, start_date, end_date, total_orders, rng)
+    db_name = mongo_db.name
+    
+    start_time = time.time()
+    if with_timeseries:
+        ensure_timeseries_collection(mongo_db)
+    share, remainder = divmod(total_orders, workers)
+    tasks, first_index = [], 0
+    for worker in range(workers):
+        count = share + (1 if worker < remainder else 0)
+        if count:
+            tasks.append((mongo_uri, db_name, spec, first_index, count, batch_size,
+                          seed + 1 + worker, with_timeseries))
+        first_index += count
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summary["orders"] = sum(executor.map(_write_orders_chunk, tasks))
+    summary["orders_time"] = time.time() - start_time
+    
+    if with_flight_prices:
+        start_time = time.time()
+        route_groups = np.array_split(np.arange(len(route_rows)), workers)
+        prices_per_route = FLIGHTS_PER_ROUTE * len(spec["day_p"])
+        tasks, first_index = [], 0
+        for group in route_groups:
+            if len(group):
+                tasks.append((mongo_uri, db_name, spec, group.tolist(), first_index, batch_size))
+            first_index += len(group) * prices_per_route
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summary["flight_prices"] = sum(executor.map(_write_flight_prices_chunk, tasks))
+        summary["flight_prices_time"] = time.time() - start_time
+    
+    return summary
@@ -0,0 +1,114 @@
+"""
+Downsampling module
+Reduces long time series to a bounded number of chart points while keeping
+their visual shape, so large ranges do not ship every point to the browser
+"""
+
+import numpy as np
+
+DOWNSAMPLE_LTTB = "lttb"
+DOWNSAMPLE_MINMAX = "minmax"
+
+
+def _as_float(values):
+    """Numeric view of x values, with datetimes as nanoseconds"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Pick threshold points with Largest-Triangle-Three-Buckets
+    
+    The first and last points are always kept. Every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket, which preserves peaks
+    and troughs.
+    
+    Args:
+        x: Sorted x values (numbers or datetimes)
+        y: y values
+        threshold: Maximum number of points to keep
+    
+    Returns:
+        ndarray: Sorted row positions of the kept points
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    # threshold - 2 buckets between the fixed first and last point
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+    
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def minmax_indices(y, threshold):
+    """
+    Keep the minimum and maximum of each bucket
+    
+    Args:
+        y: y values
+        threshold: Maximum number of points to keep
+    
+    Returns:
+        ndarray: Sorted row positions of the kept points
+    """
+    size = len(y)
+    if threshold >= size or threshold < 2:
+        return np.arange(size)
+    
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, size, threshold // 2 + 1).astype(np.int64)
+    kept = [
+        position
+        for start, end in zip(edges[:-1], edges[1:]) if end > start
+        for position in (start + int(np.argmin(y[start:end])), start + int(np.argmax(y[start:end])))
+    ]
+    return np.unique(kept)
+
+
+def downsample(df, x, y, max_points, method=DOWNSAMPLE_LTTB):
+    """
+    Downsample a DataFrame series for plotting
+    
+    Args:
+        df: DataFrame sorted by x
+        x: x column name
+        y: y column name
+        max_points: Maximum number of points to return, e.g. the chart width
+            in pixels
+        method: "lttb" or "minmax"
+    
+    Returns:
+        tuple: (DataFrame with the kept rows, dict with points_available,
+            points_sent and method)
+    """
+    if method == DOWNSAMPLE_LTTB:
+        positions = lttb_indices(df[x].to_numpy(), df[y].to_numpy(), max_points)
+    elif method == DOWNSAMPLE_MINMAX:
+        positions = minmax_indices(df[y].to_numpy(), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    
+    stats = {"points_available": len(df), "points_sent": len(positions), "method": method}
+    return df.iloc[positions], stats
@@ -0,0 +1,217 @@
+"""
+Graph sales module
+Writes monthly route sales from the orders collection onto the CONNECTED_TO
+relationships, so revenue-ranked route questions can be answered by a
+single Cypher query without a cross-database merge at request time
+"""
+
+from datetime import datetime, time as dt_time
+
+from config.config import GRAPH_SALES_BATCH_SIZE
+from .tracing import span
+
+# Relationship property prefixes, followed by the month as YYYY_MM
+SALES_PROPERTY_PREFIX = "total_sales_"
+ORDERS_PROPERTY_PREFIX = "total_orders_"
+
+# Set the monthly properties of each route; edges missing from the graph are skipped
+WRITE_ROUTE_SALES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (a:Airport {airport_code: row.origin})-[r:CONNECTED_TO]->
+          (b:Airport {airport_code: row.destination})
+    SET r += row.properties
+    WITH row, count(r) AS edges
+    RETURN count(row) AS matched, sum(edges) AS updated
+"""
+
+# Setting a property to null removes it
+CLEAR_ROUTE_SALES_QUERY = """
+    MATCH ()-[r:CONNECTED_TO]->()
+    SET r += $cleared
+"""
+
+# Long routes ranked by revenue over the synced months of a period
+GRAPH_REVENUE_QUERY = """
+    MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
+    WHERE r.distance_km > $min_distance AND r.flight_time_hr IS NOT NULL
+    WITH a, b, r,
+         reduce(total = 0, key IN $sales_keys | total + coalesce(r[key], 0)) AS total_sales,
+         reduce(total = 0, key IN $order_keys | total + coalesce(r[key], 0)) AS total_orders
+    RETURN a.airport_code AS origin, b.airport_code AS destination,
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr,
+           total_sales, total_orders
+    ORDER BY total_sales DESC, distance_km DESC LIMIT $limit
+"""
+
+
+def month_bounds(start_date, end_date):
+    """
+    Widen a date range to whole months
+    
+    Graph sales are stored per month, so partial months cannot be
+    answered exactly.
+    """
+    start_month = datetime.combine(start_date.date().replace(day=1), dt_time.min)
+    if end_date.month == 12:
+        next_month = end_date.date().replace(year=end_date.year + 1, month=1, day=1)
+    else:
+        next_month = end_date.date().replace(month=end_date.month + 1, day=1)
+    end_month = datetime.combine(next_month, dt_time.min)
+    return start_month, end_month
+
+
+def month_keys(start_date, end_date):
+    """
+    Return the YYYY_MM suffixes of every month touched by a date range
+    
+    Returns:
+        list: Month suffixes in order, e.g. ["2023_11", "2023_12", "2024_01"]
+    """
+    keys = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        keys.append(f"{year:04d}_{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+def build_monthly_route_pipeline(start_date=None, end_date=None):
+    """
+    Build the aggregation of orders into monthly route sales
+    
+    Args:
+        start_date: Optional start date (datetime object), widened to its month
+        end_date: Optional end date (datetime object), widened to its month
+    
+    Returns:
+        list: Aggregation pipeline producing origin, destination, month,
+            total_sales and total_orders
+    """
+    pipeline = []
+    if start_date is not None and end_date is not None:
+        start_month, end_month = month_bounds(start_date, end_date)
+        pipeline.append({"$match": {"depart_date": {"$gte": start_month, "$lt": end_month}}})
+    
+    pipeline.extend([
+        {
+            "$group": {
+                "_id": {
+                    "origin": "$origin",
+                    "destination": "$destination",
+                    "month": {"$dateToString": {"format": "%Y_%m", "date": "$depart_date"}}
+                },
+                "total_sales": {"$sum": "$total_price"},
+                "total_orders": {"$sum": 1}
+            }
+        },
+        {"$match": {"_id.month": {"$ne": None}}}
+    ])
+    return pipeline
+
+
+def _order_months(orders_collection):
+    """Return the first and last departure dates of all orders, or None"""
+    bounds = list(orders_collection.aggregate([
+        {"$match": {"depart_date": {"$ne": None}}},
+        {"$group": {"_id": None, "first": {"$min": "$depart_date"}, "last": {"$max": "$depart_date"}}}
+    ]))
+    if not bounds:
+        return None
+    return bounds[0]["first"], bounds[0]["last"]
+
+
+def sync_route_sales_to_graph(mongo_db, driver, start_date=None, end_date=None,
+                              batch_size=GRAPH_SALES_BATCH_SIZE):
+    """
+    Write monthly total_sales_YYYY_MM / total_orders_YYYY_MM onto CONNECTED_TO
+    
+    The months of the range are cleared first, so a route that lost all its
+    orders in a month does not keep a stale value. Rows are then written in
+    batches of batch_size with one UNWIND statement per write transaction.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        start_date: Optional start date (datetime object); without a range
+            every month with orders is synced
+        end_date: Optional end date (datetime object)
+        batch_size: Route-month rows per write transaction
+    
+    Returns:
+        dict: months, rows read, relationships updated, rows without a
+            matching relationship and batches written
+    """
+    orders_collection = mongo_db["orders"]
+    if start_date is None or end_date is None:
+        order_range = _order_months(orders_collection)
+        if order_range is None:
+            return {"months": [], "rows": 0, "updated": 0, "unmatched": 0, "batches": 0}
+        months = month_keys(*order_range)
+    else:
+        months = month_keys(start_date, end_date)
+    
+    stats = {"months": months, "rows": 0, "updated": 0, "unmatched": 0, "batches": 0}
+    
+    def clear_months(tx, cleared):
+        tx.run(CLEAR_ROUTE_SALES_QUERY, cleared=cleared).consume()
+    
+    def write_batch(tx, rows):
+        record = tx.run(WRITE_ROUTE_SALES_QUERY, rows=rows).single()
+        return (record["matched"], record["updated"]) if record else (0, 0)
+    
+    def flush(rows):
+        with span("neo4j.write_route_sales", rows=len(rows)):
+            with driver.session() as session:
+                matched, updated = session.execute_write(write_batch, rows)
+        stats["updated"] += updated
+        stats["unmatched"] += len(rows) - matched
+        stats["batches"] += 1
+    
+    with span("graph_sales.sync", months=len(months)):
+        cleared = {prefix + month: None
+                   for month in months
+                   for prefix in (SALES_PROPERTY_PREFIX, ORDERS_PROPERTY_PREFIX)}
+        with driver.session() as session:
+            session.execute_write(clear_months, cleared)
+        
+        rows = []
+        pipeline = build_monthly_route_pipeline(start_date, end_date)
+        for doc in orders_collection.aggregate(pipeline, allowDiskUse=True):
+            key = doc["_id"]
+            rows.append({
+                "origin": key["origin"],
+                "destination": key["destination"],
+                "properties": {
+                    SALES_PROPERTY_PREFIX + key["month"]: doc["total_sales"],
+                    ORDERS_PROPERTY_PREFIX + key["month"]: doc["total_orders"]
+                }
+            })
+            stats["rows"] += 1
+            if len(rows) >= batch_size:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+    return stats
+
+
+def graph_revenue_parameters(start_date, end_date, min_distance=1000, limit=50):
+    """
+    Build the GRAPH_REVENUE_QUERY parameters for a period
+    
+    Args:
+        start_date: Start date (datetime object), widened to its month
+        end_date: End date (datetime object), widened to its month
+        min_distance: Minimum route distance in km
+        limit: Number of routes to return
+    
+    Returns:
+        dict: Cypher parameters
+    """
+    months = month_keys(start_date, end_date)
+    return {
+        "min_distance": min_distance,
+        "sales_keys": [SALES_PROPERTY_PREFIX + month for month in months],
+        "order_keys": [ORDERS_PROPERTY_PREFIX + month for month in months],
+        "limit": limit
+    }
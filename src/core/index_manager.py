@@ -0,0 +1,280 @@
+"""
+Index manager module
+Reconciles the MongoDB and Neo4j indexes with an index profile on a
+background thread and reports per-index build progress, so large index
+builds never block a dashboard rerun
+"""
+
+import threading
+import time
+
+from pymongo.errors import OperationFailure
+
+from config.config import MONGO_INDEX_PROFILE, INDEX_BUILD_POLL_INTERVAL
+from .database import (
+    MONGO_INDEX_PROFILES,
+    MONGO_INDEX_NOT_FOUND,
+    NEO4J_INDEXES,
+    managed_mongo_indexes
+)
+
+ENGINE_MONGODB = "mongodb"
+ENGINE_NEO4J = "neo4j"
+
+# Index actions of a plan
+ACTION_CREATE = "create"
+ACTION_REBUILD = "rebuild"
+ACTION_DROP = "drop"
+ACTION_KEEP = "keep"
+
+# Task states
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+NEO4J_INDEX_STATUS_QUERY = """
+    SHOW INDEXES YIELD name, state, populationPercent
+    WHERE name IN $names
+    RETURN name, state, populationPercent
+"""
+
+# Longest wait for a Neo4j index to come online before its task fails
+NEO4J_INDEX_TIMEOUT = 3600
+
+
+def _neo4j_index_status(driver, names):
+    """Return name -> (state, populationPercent) of the existing Neo4j indexes"""
+    with driver.session() as session:
+        records = session.run(NEO4J_INDEX_STATUS_QUERY, names=list(names))
+        return {record["name"]: (record["state"], record["populationPercent"])
+                for record in records}
+
+
+def plan_indexes(mongo_db, driver, profile=MONGO_INDEX_PROFILE, drop_all=False):
+    """
+    Diff the existing indexes against an index profile
+    
+    Only indexes defined by some profile (or NEO4J_INDEXES) are managed;
+    _id and the rollup's unique $merge index are never touched.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        driver: Neo4j driver instance
+        profile: Desired MongoDB index profile, see MONGO_INDEX_PROFILES
+        drop_all: Plan to drop every existing managed index instead
+    
+    Returns:
+        list: One dict per index with engine, collection, name, keys and
+            action ("create", "rebuild", "drop" or "keep"); creations come
+            before drops so queries keep an index while its successor builds
+    """
+    desired = {} if drop_all else MONGO_INDEX_PROFILES[profile]
+    creates, drops = [], []
+    
+    for collection, managed in managed_mongo_indexes().items():
+        existing = mongo_db[collection].index_information()
+        wanted = dict(desired.get(collection, []))
+        for name, keys in wanted.items():
+            current = existing.get(name)
+            if current is None:
+                action = ACTION_CREATE
+            elif [tuple(key) for key in current["key"]] != list(keys):
+                action = ACTION_REBUILD
+            else:
+                action = ACTION_KEEP
+            creates.append({"engine": ENGINE_MONGODB, "collection": collection,
+                            "name": name, "keys": keys, "action": action})
+        for name in sorted(set(managed) & set(existing) - set(wanted)):
+            drops.append({"engine": ENGINE_MONGODB, "collection": collection,
+                          "name": name, "keys": None, "action": ACTION_DROP})
+    
+    existing = _neo4j_index_status(driver, NEO4J_INDEXES)
+    for name in NEO4J_INDEXES:
+        if drop_all:
+            if name in existing:
+                drops.append({"engine": ENGINE_NEO4J, "collection": None,
+                              "name": name, "keys": None, "action": ACTION_DROP})
+        else:
+            creates.append({"engine": ENGINE_NEO4J, "collection": None, "name": name,
+                            "keys": None,
+                            "action": ACTION_KEEP if name in existing else ACTION_CREATE})
+    return creates + drops
+
+
+class IndexManager:
+    """
+    Runs index plans on a background thread
+    
+    One plan runs at a time. Every index is its own task, so a failing
+    build or drop is recorded on that index and the rest of the plan still
+    runs. MongoDB builds report progress from currentOp and Neo4j builds
+    from SHOW INDEXES populationPercent, refreshed by poll().
+    """
+    
+    def __init__(self, poll_interval=INDEX_BUILD_POLL_INTERVAL,
+                 neo4j_timeout=NEO4J_INDEX_TIMEOUT):
+        self.poll_interval = poll_interval
+        self.neo4j_timeout = neo4j_timeout
+        
+        self._lock = threading.Lock()
+        self._tasks = []
+        self._thread = None
+        self._on_complete = None
+    
+    @property
+    def busy(self):
+        """Whether a plan is still running"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, mongo_db, driver, profile=MONGO_INDEX_PROFILE, drop_all=False,
+              on_complete=None):
+        """
+        Plan and launch an index reconciliation in the background
+        
+        Args:
+            mongo_db: MongoDB database instance
+            driver: Neo4j driver instance
+            profile: Desired MongoDB index profile
+            drop_all: Drop every managed index instead of applying the profile
+            on_complete: Optional callable run after the last task, e.g. to
+                invalidate cached query results
+        
+        Returns:
+            bool: False if a plan is already running, True otherwise
+        """
+        with self._lock:
+            if self.busy:
+                return False
+            plan = plan_indexes(mongo_db, driver, profile, drop_all)
+            self._tasks = [
+                {**entry, "state": STATE_DONE if entry["action"] == ACTION_KEEP else STATE_PENDING,
+                 "progress": None, "error": None, "started_at": None, "finished_at": None}
+                for entry in plan
+            ]
+            self._on_complete = on_complete
+            self._thread = threading.Thread(
+                target=self._run, args=(mongo_db, driver), name="index-manager", daemon=True
+            )
+            self._thread.start()
+        return True
+    
+    def wait(self, timeout=None):
+        """
+        Block until the running plan finishes
+        
+        Args:
+            timeout: Optional maximum seconds to wait
+        
+        Returns:
+            bool: True if no plan is running anymore
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.busy
+    
+    def _update(self, task, **changes):
+        with self._lock:
+            task.update(changes)
+    
+    def _run(self, mongo_db, driver):
+        for task in self._tasks:
+            if task["state"] != STATE_PENDING:
+                continue
+            self._update(task, state=STATE_RUNNING, started_at=time.time())
+            try:
+                if task["engine"] == ENGINE_MONGODB:
+                    self._run_mongo(mongo_db, task)
+                else:
+                    self._run_neo4j(driver, task)
+            except Exception as e:
+                self._update(task, state=STATE_FAILED, error=str(e), finished_at=time.time())
+            else:
+                self._update(task, state=STATE_DONE, finished_at=time.time(),
+                             progress=None if task["action"] == ACTION_DROP else 100.0)
+        if self._on_complete is not None:
+            self._on_complete()
+    
+    def _run_mongo(self, mongo_db, task):
+        collection = mongo_db[task["collection"]]
+        if task["action"] in (ACTION_DROP, ACTION_REBUILD):
+            try:
+                collection.drop_index(task["name"])
+            except OperationFailure as e:
+                if e.code != MONGO_INDEX_NOT_FOUND:
+                    raise
+        if task["action"] in (ACTION_CREATE, ACTION_REBUILD):
+            # Blocks this thread until the build is finished; poll() reads its progress
+            collection.create_index(task["keys"], name=task["name"])
+    
+    def _run_neo4j(self, driver, task):
+        name = task["name"]
+        with driver.session() as session:
+            if task["action"] == ACTION_DROP:
+                session.run(f"DROP INDEX {name} IF EXISTS").consume()
+                return
+            session.run(NEO4J_INDEXES[name]).consume()
+        
+        # CREATE INDEX returns at once and the index populates in the background
+        deadline = time.monotonic() + self.neo4j_timeout
+        while True:
+            state, percent = _neo4j_index_status(driver, [name]).get(name, (None, None))
+            self._update(task, progress=percent)
+            if state == "ONLINE":
+                return
+            if state == "FAILED":
+                raise RuntimeError(f"Neo4j index {name} failed to populate")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Neo4j index {name} still {state} after {self.neo4j_timeout}s")
+            time.sleep(self.poll_interval)
+    
+    def poll(self, mongo_db):
+        """
+        Refresh the progress of running MongoDB builds from currentOp
+        
+        Servers that do not allow currentOp (e.g. shared Atlas tiers) leave
+        the progress unknown.
+        
+        Args:
+            mongo_db: MongoDB database instance
+        """
+        with self._lock:
+            running = [task for task in self._tasks
+                       if task["state"] == STATE_RUNNING and task["engine"] == ENGINE_MONGODB
+                       and task["action"] != ACTION_DROP]
+        if not running:
+            return
+        
+        try:
+            operations = mongo_db.client.admin.command(
+                {"currentOp": True, "command.createIndexes": {"$exists": True}}
+            ).get("inprog", [])
+        except Exception:
+            return
+        
+        for task in running:
+            for op in operations:
+                command = op.get("command", {})
+                names = [index.get("name") for index in command.get("indexes", [])]
+                if command.get("createIndexes") == task["collection"] and task["name"] in names:
+                    progress = op.get("progress") or {}
+                    if progress.get("total"):
+                        self._update(task, progress=100.0 * progress["done"] / progress["total"],
+                                     phase=op.get("msg"))
+                    break
+    
+    def status(self):
+        """
+        Return the tasks of the current or last plan for display
+        
+        Returns:
+            list: Copies of the task dicts with engine, collection, name,
+                action, state, progress (percent or None) and error
+        """
+        with self._lock:
+            return [dict(task) for task in self._tasks]
+
+
+# Shared by every session served by this process
+index_manager = IndexManager()
@@ -0,0 +1,389 @@
+"""
+Insight statistics module
+Single-pass, mergeable accumulators for the business insights, so route and
+day results can be summarized chunk by chunk as they stream in and partial
+results from parallel workers can be combined
+"""
+
+import heapq
+import math
+import random
+from itertools import count
+
+import numpy as np
+
+# Rows reduced at a time when summarizing a materialized DataFrame
+INSIGHT_CHUNK_ROWS = 50_000
+
+# Routes kept by each bounded top-K table
+INSIGHT_TOP_K = 5
+
+# Columns reported for the revenue efficiency rankings
+EFFICIENCY_KM_COLUMNS = ['origin', 'destination', 'distance_km', 'total_sales', 'revenue_per_km']
+EFFICIENCY_HOUR_COLUMNS = [
+    'origin', 'destination', 'flight_time_hr', 'total_sales', 'revenue_per_hour'
+]
+
+
+class RunningMoments:
+    """
+    Count, mean, variance, minimum and maximum of a stream of values
+    
+    Chunks are reduced with numpy and combined with the pairwise update of
+    Chan et al., which is numerically stable and lets two accumulators
+    merge exactly. The labels of the minimum and maximum values are kept
+    so the extremes can be reported (first occurrence wins on ties).
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.min_label = None
+        self.max_label = None
+    
+    def update(self, values, labels=None):
+        """
+        Add a chunk of values
+        
+        Args:
+            values: Array-like of numbers
+            labels: Optional array-like of labels aligned with values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        
+        chunk = RunningMoments()
+        chunk.count = int(values.size)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.total = values.sum()
+        low, high = int(values.argmin()), int(values.argmax())
+        chunk.min, chunk.max = float(values[low]), float(values[high])
+        if labels is not None:
+            chunk.min_label, chunk.max_label = labels[low], labels[high]
+        self.merge(chunk)
+    
+    def merge(self, other):
+        """Fold another accumulator's values into this one"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        
+        combined = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / combined
+        self.m2 += other.m2 + delta * delta * self.count * other.count / combined
+        self.count = combined
+        self.total += other.total
+        # Strict comparisons keep the earlier extreme on ties, like idxmax()
+        if other.min < self.min:
+            self.min, self.min_label = other.min, other.min_label
+        if other.max > self.max:
+            self.max, self.max_label = other.max, other.max_label
+        return self
+    
+    def variance(self, ddof=1):
+        """Variance with pandas' default of ddof=1"""
+        if self.count <= ddof:
+            return math.nan
+        return self.m2 / (self.count - ddof)
+    
+    def std(self, ddof=1):
+        return math.sqrt(self.variance(ddof))
+
+
+class RunningCovariance:
+    """
+    Online covariance and Pearson correlation of paired values
+    
+    Uses the same pairwise update as RunningMoments on the co-moment, so
+    chunks and workers merge exactly.
+    """
+    
+    def __init__(self):
+        self.x = RunningMoments()
+        self.y = RunningMoments()
+        self.c2 = 0.0
+    
+    @property
+    def count(self):
+        return self.x.count
+    
+    def update(self, x, y):
+        """Add a chunk of (x, y) pairs; pairs with a missing value are skipped"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[valid], y[valid]
+        if x.size == 0:
+            return
+        
+        chunk = RunningCovariance()
+        chunk.x.update(x)
+        chunk.y.update(y)
+        chunk.c2 = float(((x - chunk.x.mean) * (y - chunk.y.mean)).sum())
+        self.merge(chunk)
+    
+    def merge(self, other):
+        """Fold another accumulator's pairs into this one"""
+        if other.count and self.count:
+            combined = self.count + other.count
+            self.c2 += other.c2 + (
+                (other.x.mean - self.x.mean) * (other.y.mean - self.y.mean)
+                * self.count * other.count / combined
+            )
+        elif other.count:
+            self.c2 = other.c2
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+        return self
+    
+    def correlation(self):
+        """Pearson correlation, NaN when either side has no variance"""
+        denominator = math.sqrt(self.x.m2 * self.y.m2)
+        if self.count < 2 or denominator == 0:
+            return math.nan
+        return self.c2 / denominator
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch after Karnin, Lang and Liberty (KLL)
+    
+    Values are buffered in a hierarchy of compactors; a full compactor is
+    sorted and every other value is promoted to the next level with twice
+    the weight. Memory stays around 3 * k values however many are added,
+    ranks are accurate to roughly 1.7 / k of the count, and results are
+    exact until the first compaction.
+    """
+    
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self._compactors = [[]]
+        self._random = random.Random(seed)
+    
+    def _capacity(self, level):
+        depth = len(self._compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+    
+    def _size(self):
+        return sum(len(compactor) for compactor in self._compactors)
+    
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self._compactors)))
+    
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, compactor in enumerate(self._compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 == len(self._compactors):
+                        self._compactors.append([])
+                    compactor.sort()
+                    # An odd value out stays behind at its own weight
+                    kept = compactor[-1:] if len(compactor) % 2 else []
+                    promoted = compactor[:len(compactor) - len(kept)]
+                    offset = self._random.randint(0, 1)
+                    self._compactors[level + 1].extend(promoted[offset::2])
+                    self._compactors[level] = kept
+                    break
+    
+    def update(self, values):
+        """Add a chunk of values, skipping NaN"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += int(values.size)
+        for offset in range(0, values.size, self.k):
+            self._compactors[0].extend(values[offset:offset + self.k].tolist())
+            self._compress()
+    
+    def merge(self, other):
+        """Fold another sketch's values into this one"""
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append([])
+        for level, compactor in enumerate(other._compactors):
+            self._compactors[level].extend(compactor)
+        self.count += other.count
+        self._compress()
+        return self
+    
+    def _weighted(self):
+        items = sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self._compactors)
+            for value in compactor
+        )
+        values = np.array([value for value, _ in items])
+        weights = np.cumsum([weight for _, weight in items])
+        return values, weights
+    
+    def quantile(self, q):
+        """
+        Return the value at quantile q
+        
+        Args:
+            q: Quantile between 0 and 1
+        
+        Returns:
+            float: The largest retained value whose estimated rank is at most
+                q, NaN when empty. Before compaction this is the "lower"
+                interpolation of Series.quantile().
+        """
+        values, weights = self._weighted()
+        if values.size == 0:
+            return math.nan
+        target = q * (weights[-1] - 1)
+        position = int(np.searchsorted(weights - 1, target, side="right")) - 1
+        return float(values[max(position, 0)])
+    
+    def rank(self, value):
+        """Estimated number of values less than or equal to value"""
+        values, weights = self._weighted()
+        position = int(np.searchsorted(values, value, side="right"))
+        return int(weights[position - 1]) if position else 0
+
+
+class TopK:
+    """
+    Bounded table of the k rows with the largest key
+    
+    A min-heap of size k holds the current winners, so memory is bounded
+    by k whatever the number of rows offered. Ties keep the row offered
+    first, like DataFrame.nlargest().
+    """
+    
+    def __init__(self, k=INSIGHT_TOP_K):
+        self.k = k
+        self._heap = []
+        self._sequence = count()
+    
+    def update(self, df, key):
+        """
+        Offer the rows of a DataFrame chunk
+        
+        Args:
+            df: DataFrame chunk
+            key: Column ranked in descending order
+        """
+        if df.empty:
+            return
+        for row in df.nlargest(self.k, key).to_dict("records"):
+            self._push(row[key], row)
+    
+    def _push(self, key, row):
+        # Later rows rank lower on ties, so their negated sequence is smaller
+        entry = (key, -next(self._sequence), row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+    
+    def merge(self, other):
+        """Fold another table's rows into this one, ranking them after existing ties"""
+        for key, _, row in sorted(other._heap, key=lambda entry: (-entry[0], -entry[1])):
+            self._push(key, row)
+        return self
+    
+    def rows(self):
+        """Return the kept rows, largest key first"""
+        return [row for _, _, row in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
+
+
+class InsightAccumulator:
+    """
+    Everything generate_insights() and the insights tab report, in one pass
+    
+    Feed day and route chunks with add_days() and add_routes() in any
+    order and from any number of workers, then merge() the partial
+    accumulators. Route statistics cover routes with sales; routes without
+    sales are only counted.
+    """
+    
+    def __init__(self, top_k=INSIGHT_TOP_K, sketch_k=200):
+        self.daily_sales = RunningMoments()
+        self.daily_quantiles = QuantileSketch(sketch_k)
+        self.route_sales = RunningMoments()
+        self.distance_sales = RunningCovariance()
+        self.top_routes = TopK(top_k)
+        self.revenue_per_km = TopK(top_k)
+        self.revenue_per_hour = TopK(top_k)
+        self.zero_sales_routes = 0
+    
+    def add_days(self, df_daily):
+        """Add a chunk of the daily trend (date, daily_sales, daily_orders)"""
+        if df_daily.empty:
+            return self
+        sales = df_daily['daily_sales'].to_numpy(dtype=np.float64)
+        self.daily_sales.update(sales, df_daily['date'].to_numpy())
+        self.daily_quantiles.update(sales)
+        return self
+    
+    def add_routes(self, df_routes):
+        """Add a chunk of routes with distance, flight time, total_sales and total_orders"""
+        if df_routes.empty:
+            return self
+        with_sales = df_routes['total_sales'] > 0
+        self.zero_sales_routes += int((df_routes['total_sales'] == 0).sum())
+        routes = df_routes[with_sales]
+        if routes.empty:
+            return self
+        
+        self.route_sales.update(routes['total_sales'])
+        self.distance_sales.update(routes['distance_km'], routes['total_sales'])
+        self.top_routes.update(routes, 'total_sales')
+        efficiency = routes.assign(
+            revenue_per_km=routes['total_sales'] / routes['distance_km'],
+            revenue_per_hour=routes['total_sales'] / routes['flight_time_hr']
+        )
+        self.revenue_per_km.update(efficiency[EFFICIENCY_KM_COLUMNS], 'revenue_per_km')
+        self.revenue_per_hour.update(efficiency[EFFICIENCY_HOUR_COLUMNS], 'revenue_per_hour')
+        return self
+    
+    def merge(self, other):
+        """Fold another accumulator into this one"""
+        self.daily_sales.merge(other.daily_sales)
+        self.daily_quantiles.merge(other.daily_quantiles)
+        self.route_sales.merge(other.route_sales)
+        self.distance_sales.merge(other.distance_sales)
+        self.top_routes.merge(other.top_routes)
+        self.revenue_per_km.merge(other.revenue_per_km)
+        self.revenue_per_hour.merge(other.revenue_per_hour)
+        self.zero_sales_routes += other.zero_sales_routes
+        return self
+
+
+def summarize_results(results, chunk_rows=INSIGHT_CHUNK_ROWS):
+    """
+    Build the insight accumulator of an optimized scenario result
+    
+    A scenario that streamed its routes already carries the route statistics
+    in 'insight_stats'; otherwise df_sorted is reduced chunk_rows at a time.
+    
+    Args:
+        results: Results of run_scenario_with_optimization()
+        chunk_rows: Rows reduced at a time
+    
+    Returns:
+        InsightAccumulator: Statistics of the daily trend and the routes
+    """
+    accumulator = InsightAccumulator()
+    streamed = results.get('insight_stats')
+    if streamed is not None:
+        # Copy so the cached scenario result is never mutated
+        accumulator.merge(streamed)
+    else:
+        df_sorted = results['df_sorted']
+        for offset in range(0, len(df_sorted), chunk_rows):
+            accumulator.add_routes(df_sorted.iloc[offset:offset + chunk_rows])
+    
+    df_daily = results['df_daily']
+    for offset in range(0, len(df_daily), chunk_rows):
+        accumulator.add_days(df_daily.iloc[offset:offset + chunk_rows])
+    return accumulator
@@ -0,0 +1,127 @@
+"""
+Result loader module
+Streams MongoDB cursor documents and Neo4j records straight into per-column
+buffers and builds each DataFrame once
+"""
+
+import pandas as pd
+
+from .tracing import span
+
+
+def _getter(path):
+    """Build a value getter for a field name or dotted path such as "_id.origin" """
+    keys = path.split(".")
+    if len(keys) == 1:
+        return lambda record: record.get(path)
+    
+    def get_nested(record):
+        value = record
+        for key in keys:
+            value = value.get(key) if value is not None else None
+        return value
+    return get_nested
+
+
+def _column_buffers(columns):
+    """Create the per-column buffers and (append, getter) pairs filling them"""
+    buffers = {name: [] for name in columns}
+    fields = [(buffers[name].append, _getter(path)) for name, path in columns.items()]
+    return buffers, fields
+
+
+def _build_frame(buffers, columns, dtypes):
+    """Build the DataFrame once from the filled column buffers"""
+    dtypes = dtypes or {}
+    return pd.DataFrame({
+        name: pd.Series(values, dtype=dtypes.get(name))
+        for name, values in buffers.items()
+    }, columns=list(columns))
+
+
+def _attach_stats(df, rows, truncated, load):
+    """Record the load statistics of a finished load span on the DataFrame"""
+    df.attrs["load_stats"] = {
+        "rows": rows,
+        "bytes": int(df.memory_usage(index=False, deep=True).sum()),
+        "build_time": load.duration,
+        "truncated": truncated
+    }
+    return df
+
+
+def load_frame(records, columns, dtypes=None, row_cap=None):
+    """
+    Build a DataFrame from an iterable of documents or records
+    
+    Records are consumed one at a time as the cursor returns its batches,
+    so no intermediate list of rows or per-row dicts is materialized.
+    
+    Args:
+        records: MongoDB cursor, Neo4j result or any iterable of mappings
+        columns: Dict of output column -> source field or dotted path
+        dtypes: Optional dict of output column -> dtype
+        row_cap: Optional maximum number of rows to read
+    
+    Returns:
+        DataFrame: One column per entry in columns, with load statistics
+            (rows, bytes, build_time, truncated) in df.attrs['load_stats']
+    """
+    with span("load_frame") as load:
+        buffers, fields = _column_buffers(columns)
+        
+        rows = 0
+        truncated = False
+        for record in records:
+            if row_cap is not None and rows >= row_cap:
+                truncated = True
+                break
+            for append, get in fields:
+                append(get(record))
+            rows += 1
+        
+        if truncated and hasattr(records, "close"):
+            records.close()
+        
+        df = _build_frame(buffers, columns, dtypes)
+        load.set(rows=rows, truncated=truncated)
+    return _attach_stats(df, rows, truncated, load)
+
+
+async def aload_frame(records, columns, dtypes=None, row_cap=None):
+    """
+    Async counterpart of load_frame() for async cursors and Neo4j async results
+    
+    Args:
+        records: AsyncCommandCursor, AsyncResult or any async iterable of mappings
+        columns: Dict of output column -> source field or dotted path
+        dtypes: Optional dict of output column -> dtype
+        row_cap: Optional maximum number of rows to read
+    
+    Returns:
+        DataFrame: Same as load_frame()
+    """
+    with span("load_frame") as load:
+        buffers, fields = _column_buffers(columns)
+        
+        rows = 0
+        truncated = False
+        async for record in records:
+            if row_cap is not None and rows >= row_cap:
+                truncated = True
+                break
+            for append, get in fields:
+                append(get(record))
+            rows += 1
+        
+        if truncated and hasattr(records, "close"):
+            await records.close()
+        
+        df = _build_frame(buffers, columns, dtypes)
+        load.set(rows=rows, truncated=truncated)
+    return _attach_stats(df, rows, truncated, load)
+
+
+def load_stats(df):
+    """Return the load statistics recorded by load_frame, or None"""
+    return df.attrs.get("load_stats")
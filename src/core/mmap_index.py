@@ -0,0 +1,249 @@
+"""
+Memory-mapped index module
+Stores orders as flat arrays sorted by departure day and answers the
+date-range aggregations with a binary search plus vectorized reductions
+over memory-mapped slices, so memory use follows the range, not the dataset
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from config.config import MMAP_INDEX_DIR
+
+MMAP_METADATA_FILE = "index.json"
+
+# Array name -> dtype of the on-disk columns, all sorted by day
+MMAP_ARRAYS = {
+    "day": np.int32,
+    "route_id": np.int32,
+    "total_price": np.int64,
+    "status": np.int8
+}
+
+# Prices are split into high and low bits so float64 bincount sums stay exact
+_PRICE_SPLIT_BITS = 20
+_PRICE_LOW_MASK = (1 << _PRICE_SPLIT_BITS) - 1
+
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+
+ROUTE_SALES_COLUMNS = ["origin", "destination", "total_sales", "total_orders"]
+
+
+def _day_number(value):
+    """Days since the Unix epoch of a datetime"""
+    return int((np.datetime64(value, "D") - _EPOCH_DAY).astype(np.int64))
+
+
+def _codes(values, mapping):
+    """Encode values with a growing value -> code mapping"""
+    return [mapping.setdefault(value, len(mapping)) for value in values]
+
+
+def build_mmap_index(orders_collection, path=MMAP_INDEX_DIR, batch_size=500_000):
+    """
+    Build the memory-mapped order arrays from the orders collection
+    
+    The arrays are written next to the target directory and swapped in
+    when complete, so readers never see a partially written index.
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        path: Index directory
+        batch_size: Orders converted to arrays at a time
+    
+    Returns:
+        dict: Index metadata (rows, routes, statuses, coverage, built_at)
+    """
+    route_codes, status_codes = {}, {}
+    chunks = {name: [] for name in MMAP_ARRAYS}
+    buffer = []
+    
+    def flush():
+        dates = np.array([doc["depart_date"] for doc in buffer], dtype="datetime64[D]")
+        chunks["day"].append((dates - _EPOCH_DAY).astype(np.int32))
+        chunks["route_id"].append(np.array(
+            _codes([(doc.get("origin"), doc.get("destination")) for doc in buffer], route_codes),
+            dtype=np.int32
+        ))
+        chunks["total_price"].append(np.array(
+            [doc.get("total_price") or 0 for doc in buffer], dtype=np.int64
+        ))
+        chunks["status"].append(np.array(
+            _codes([doc.get("status") for doc in buffer], status_codes), dtype=np.int8
+        ))
+        buffer.clear()
+    
+    projection = {"_id": 0, "depart_date": 1, "origin": 1, "destination": 1,
+                  "total_price": 1, "status": 1}
+    query = {"depart_date": {"$ne": None}}
+    for doc in orders_collection.find(query, projection, batch_size=10_000):
+        buffer.append(doc)
+        if len(buffer) >= batch_size:
+            flush()
+    if buffer:
+        flush()
+    
+    arrays = {
+        name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype)
+        for name, dtype in MMAP_ARRAYS.items()
+    }
+    order = np.argsort(arrays["day"], kind="stable")
+    
+    staging_path = path + ".tmp"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(staging_path, f"{name}.npy"), values[order])
+    
+    days = arrays["day"]
+    metadata = {
+        "rows": int(days.size),
+        "routes": [list(pair) for pair in route_codes],
+        "statuses": list(status_codes),
+        "first_day": str(_EPOCH_DAY + int(days.min())) if days.size else None,
+        "last_day": str(_EPOCH_DAY + int(days.max())) if days.size else None,
+        "built_at": datetime.now(timezone.utc).isoformat()
+    }
+    with open(os.path.join(staging_path, MMAP_METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(staging_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return metadata
+
+
+class MmapIndex:
+    """
+    Answers total sales, daily trend and route sales from the mapped arrays
+    
+    Ranges are resolved at day granularity: every order departing on a day
+    from start_date's day through end_date's day is included, which matches
+    the whole-day periods used by the dashboard and benchmarks.
+    """
+    
+    def __init__(self, path=MMAP_INDEX_DIR):
+        self.path = path
+        with open(os.path.join(path, MMAP_METADATA_FILE), encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self._arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in MMAP_ARRAYS
+        }
+        self.route_ids = {
+            (origin, destination): route_id
+            for route_id, (origin, destination) in enumerate(self.metadata["routes"])
+        }
+    
+    def _bounds(self, start_date, end_date):
+        """Binary search the row range departing within the period"""
+        days = self._arrays["day"]
+        lo = int(np.searchsorted(days, _day_number(start_date), side="left"))
+        hi = int(np.searchsorted(days, _day_number(end_date), side="right"))
+        return lo, max(lo, hi)
+    
+    def total_sales(self, start_date, end_date):
+        """
+        Returns:
+            tuple: (total_sales, total_orders)
+        """
+        lo, hi = self._bounds(start_date, end_date)
+        return int(self._arrays["total_price"][lo:hi].sum()), hi - lo
+    
+    def sales_by_date(self, start_date, end_date):
+        """
+        Returns:
+            DataFrame: date, daily_sales, daily_orders sorted by date
+        """
+        lo, hi = self._bounds(start_date, end_date)
+        if lo == hi:
+            return pd.DataFrame()
+        
+        days = self._arrays["day"][lo:hi]
+        # Rows are sorted by day, so each day starts where the value changes
+        starts = np.flatnonzero(np.diff(days, prepend=days[0] - 1))
+        ends = np.append(starts[1:], days.size)
+        
+        return pd.DataFrame({
+            "date": (_EPOCH_DAY + days[starts].astype(np.int64)).astype("datetime64[ns]"),
+            "daily_sales": np.add.reduceat(self._arrays["total_price"][lo:hi], starts),
+            "daily_orders": (ends - starts).astype(np.int64)
+        })
+    
+    def route_sales(self, route_pairs, start_date, end_date):
+        """
+        Returns:
+            DataFrame: origin, destination, total_sales, total_orders for the
+                requested routes that have orders in the range
+        """
+        known = [pair for pair in dict.fromkeys(route_pairs) if pair in self.route_ids]
+        if not known:
+            return pd.DataFrame(columns=ROUTE_SALES_COLUMNS)
+        
+        sums, counts = self._route_totals(start_date, end_date)
+        ids = np.array([self.route_ids[pair] for pair in known])
+        return self._route_frame(ids[counts[ids] > 0], sums, counts)
+    
+    def top_routes(self, start_date, end_date, limit):
+        """
+        Returns:
+            DataFrame: origin, destination, total_sales, total_orders of the
+                limit routes with the highest sales in the range
+        """
+        sums, counts = self._route_totals(start_date, end_date)
+        ids = np.flatnonzero(counts)
+        # Highest sales first, ties by route id
+        ids = ids[np.lexsort((ids, -sums[ids]))][:limit]
+        return self._route_frame(ids, sums, counts)
+    
+    def _route_totals(self, start_date, end_date):
+        """Sum sales and count orders per route id within the range"""
+        lo, hi = self._bounds(start_date, end_date)
+        route_ids = self._arrays["route_id"][lo:hi]
+        prices = self._arrays["total_price"][lo:hi]
+        size = len(self.route_ids)
+        
+        counts = np.bincount(route_ids, minlength=size)
+        high = np.bincount(route_ids, weights=prices >> _PRICE_SPLIT_BITS, minlength=size)
+        low = np.bincount(route_ids, weights=prices & _PRICE_LOW_MASK, minlength=size)
+        sums = (high.astype(np.int64) << _PRICE_SPLIT_BITS) + low.astype(np.int64)
+        return sums, counts
+    
+    def _route_frame(self, ids, sums, counts):
+        """Build the route sales DataFrame for the given route ids"""
+        routes = self.metadata["routes"]
+        return pd.DataFrame({
+            "origin": [routes[route_id][0] for route_id in ids],
+            "destination": [routes[route_id][1] for route_id in ids],
+            "total_sales": sums[ids],
+            "total_orders": counts[ids].astype(np.int64)
+        }, columns=ROUTE_SALES_COLUMNS)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_mmap_index(path=MMAP_INDEX_DIR):
+    """
+    Return an MmapIndex for path, reopening it after a rebuild
+    
+    Raises:
+        FileNotFoundError: If no index has been built at path
+    """
+    version = os.path.getmtime(os.path.join(path, MMAP_METADATA_FILE))
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, MmapIndex(path))
+            _indexes[path] = cached
+        return cached[1]
@@ -0,0 +1,268 @@
+"""
+Period rollup module
+Buckets sales by hour, day, week or month in a market timezone and keeps a
+pyramid of pre-aggregated levels in sales_by_period: hours are folded from
+orders, days from hours, and weeks and months from days
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+
+from config.config import SALES_TIMEZONE
+
+PERIOD_ROLLUP_COLLECTION = "sales_by_period"
+PERIOD_ROLLUP_INDEX_NAME = "idx_period_tz_bucket"
+
+GRANULARITY_HOUR = "hour"
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+GRANULARITY_MONTH = "month"
+
+# Pyramid levels in build order
+GRANULARITIES = (GRANULARITY_HOUR, GRANULARITY_DAY, GRANULARITY_WEEK, GRANULARITY_MONTH)
+
+# Level each pyramid level is folded from; hours are folded from orders
+PERIOD_PARENTS = {
+    GRANULARITY_DAY: GRANULARITY_HOUR,
+    GRANULARITY_WEEK: GRANULARITY_DAY,
+    GRANULARITY_MONTH: GRANULARITY_DAY
+}
+
+# ISO weeks; $dateTrunc starts weeks on Sunday by default
+WEEK_START = "monday"
+
+
+def _truncate_local(local, granularity):
+    """Start of the period containing a naive wall-clock datetime"""
+    if granularity == GRANULARITY_HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = datetime.combine(local.date(), datetime.min.time())
+    if granularity == GRANULARITY_DAY:
+        return day
+    if granularity == GRANULARITY_WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == GRANULARITY_MONTH:
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def _next_local(start, granularity):
+    """Start of the period following the one starting at start"""
+    if granularity == GRANULARITY_HOUR:
+        return start + timedelta(hours=1)
+    if granularity == GRANULARITY_DAY:
+        return start + timedelta(days=1)
+    if granularity == GRANULARITY_WEEK:
+        return start + timedelta(weeks=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def period_bounds(start_date, end_date, granularity, timezone=SALES_TIMEZONE):
+    """
+    Widen a wall-clock range to whole periods and convert it to UTC
+    
+    Orders store depart_date as naive UTC, while periods are cut in the
+    market timezone, so the bounds are computed locally and converted.
+    
+    Args:
+        start_date: Start, naive wall-clock time in timezone or tz-aware
+        end_date: End (inclusive), naive wall-clock time in timezone or tz-aware
+        granularity: "hour", "day", "week" or "month"
+        timezone: IANA timezone name, e.g. "Asia/Jakarta"
+    
+    Returns:
+        tuple: (start of the first period, end of the last period exclusive)
+            as naive UTC datetimes
+    """
+    zone = ZoneInfo(timezone)
+    
+    def to_local(value):
+        return value.astimezone(zone).replace(tzinfo=None) if value.tzinfo else value
+    
+    def to_utc(local):
+        return local.replace(tzinfo=zone).astimezone(dt_timezone.utc).replace(tzinfo=None)
+    
+    first = _truncate_local(to_local(start_date), granularity)
+    last = _truncate_local(to_local(end_date), granularity)
+    if granularity == GRANULARITY_HOUR:
+        # Whole hours in UTC, so a DST change does not skip or repeat one
+        return to_utc(first), to_utc(last) + timedelta(hours=1)
+    return to_utc(first), to_utc(_next_local(last, granularity))
+
+
+def period_trunc(date_expression, granularity, timezone=SALES_TIMEZONE):
+    """$dateTrunc expression for the start of a date's period in timezone"""
+    trunc = {"date": date_expression, "unit": granularity, "timezone": timezone}
+    if granularity == GRANULARITY_WEEK:
+        trunc["startOfWeek"] = WEEK_START
+    return {"$dateTrunc": trunc}
+
+
+def build_period_pipeline(start_date, end_date, granularity, timezone=SALES_TIMEZONE):
+    """
+    Build the pipeline bucketing orders (or their time-series copy) by period
+    
+    Args:
+        start_date: Start date (datetime object), see period_bounds()
+        end_date: End date (datetime object)
+        granularity: "hour", "day", "week" or "month"
+        timezone: IANA timezone the periods are cut in
+    
+    Returns:
+        list: Aggregation pipeline producing one document per period with
+            the period start (UTC) as _id, sales and orders
+    """
+    lower, upper = period_bounds(start_date, end_date, granularity, timezone)
+    return [
+        {"$match": {"depart_date": {"$gte": lower, "$lt": upper}}},
+        {
+            "$group": {
+                "_id": period_trunc("$depart_date", granularity, timezone),
+                "sales": {"$sum": "$total_price"},
+                "orders": {"$sum": 1}
+            }
+        },
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def period_rollup_pipeline(start_date, end_date, granularity, timezone=SALES_TIMEZONE):
+    """Pyramid equivalent of the period pipeline: one document per period"""
+    lower, upper = period_bounds(start_date, end_date, granularity, timezone)
+    return [
+        {
+            "$match": {
+                "granularity": granularity,
+                "timezone": timezone,
+                "bucket": {"$gte": lower, "$lt": upper}
+            }
+        },
+        {"$sort": {"bucket": 1}},
+        {"$project": {"_id": "$bucket", "sales": "$total_sales", "orders": "$order_count"}}
+    ]
+
+
+def ensure_period_indexes(mongo_db):
+    """
+    Create the unique (granularity, timezone, bucket) index required by $merge
+    
+    Args:
+        mongo_db: MongoDB database instance
+    """
+    mongo_db[PERIOD_ROLLUP_COLLECTION].create_index(
+        [("granularity", 1), ("timezone", 1), ("bucket", 1)],
+        name=PERIOD_ROLLUP_INDEX_NAME,
+        unique=True
+    )
+
+
+def build_level_pipeline(granularity, timezone=SALES_TIMEZONE, bounds=None, refresh_id=None):
+    """
+    Build the aggregation that folds one pyramid level from the level below
+    
+    Hours are folded from orders (run it on the orders collection); every
+    other level from its parent level in sales_by_period. $merge into the
+    collection being aggregated needs MongoDB 4.4+, $dateTrunc 5.0+.
+    
+    Args:
+        granularity: Level to build
+        timezone: IANA timezone the periods are cut in
+        bounds: Optional (start, end exclusive) in UTC, aligned to whole periods
+        refresh_id: Optional marker stored on every written row, so rows
+            this refresh did not write can be told apart afterwards
+    
+    Returns:
+        list: Aggregation pipeline ending in a $merge into sales_by_period
+    """
+    if granularity == GRANULARITY_HOUR:
+        date_field, sales, orders = "depart_date", "$total_price", 1
+        match = {"depart_date": {"$type": "date"}}
+    else:
+        date_field, sales, orders = "bucket", "$total_sales", "$order_count"
+        match = {"granularity": PERIOD_PARENTS[granularity], "timezone": timezone}
+    if bounds is not None:
+        match[date_field] = {"$gte": bounds[0], "$lt": bounds[1]}
+    
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": period_trunc(f"${date_field}", granularity, timezone),
+                "total_sales": {"$sum": sales},
+                "order_count": {"$sum": orders}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "granularity": {"$literal": granularity},
+                "timezone": {"$literal": timezone},
+                "bucket": "$_id",
+                "total_sales": 1,
+                "order_count": 1,
+                **({"refresh_id": {"$literal": refresh_id}} if refresh_id is not None else {})
+            }
+        },
+        {
+            "$merge": {
+                "into": PERIOD_ROLLUP_COLLECTION,
+                "on": ["granularity", "timezone", "bucket"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }
+    ]
+
+
+def refresh_period_rollups(mongo_db, start_date=None, end_date=None, timezone=SALES_TIMEZONE):
+    """
+    Build or refresh every level of the sales_by_period pyramid
+    
+    Without a range every level of the timezone is rebuilt. With a range
+    the weeks and months touching it are rebuilt, and the days and hours
+    are rebuilt over all of those weeks and months first, so each level is
+    folded from a complete parent.
+    
+    Each level is merged in place and only then are the rows of its range
+    that this refresh did not write deleted, so readers never see a level
+    empty and a failed aggregate leaves the previous rows in place.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        start_date: Optional start date (datetime object), see period_bounds()
+        end_date: Optional end date (datetime object)
+        timezone: IANA timezone the periods are cut in
+    
+    Returns:
+        dict: Granularity -> number of documents now covering the range
+    """
+    rollup = mongo_db[PERIOD_ROLLUP_COLLECTION]
+    ensure_period_indexes(mongo_db)
+    
+    if start_date is not None and end_date is not None:
+        ranges = {
+            granularity: period_bounds(start_date, end_date, granularity, timezone)
+            for granularity in (GRANULARITY_WEEK, GRANULARITY_MONTH)
+        }
+        # Weeks and months start at local midnight, so their union is whole days and hours
+        days = (min(lower for lower, _ in ranges.values()),
+                max(upper for _, upper in ranges.values()))
+        ranges[GRANULARITY_DAY] = ranges[GRANULARITY_HOUR] = days
+    else:
+        ranges = dict.fromkeys(GRANULARITIES)
+    
+    refresh_id = ObjectId()
+    counts = {}
+    for granularity in GRANULARITIES:
+        bounds = ranges[granularity]
+        level_filter = {"granularity": granularity, "timezone": timezone}
+        if bounds is not None:
+            level_filter["bucket"] = {"$gte": bounds[0], "$lt": bounds[1]}
+        
+        source = mongo_db["orders"] if granularity == GRANULARITY_HOUR else rollup
+        list(source.aggregate(build_level_pipeline(granularity, timezone, bounds, refresh_id)))
+        rollup.delete_many({**level_filter, "refresh_id": {"$ne": refresh_id}})
+        counts[granularity] = rollup.count_documents(level_filter)
+    return counts
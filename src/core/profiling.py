@@ -0,0 +1,332 @@
+"""
+Query profiling module
+Runs MongoDB explain and Neo4j PROFILE on the analytics queries and
+summarizes the chosen plans and how much work the servers did for them
+"""
+
+import time
+
+from .analytics import (
+    SOURCE_ORDERS,
+    ROUTE_MATCH_PAIRS,
+    ROUTE_MATCH_CROSS_PRODUCT,
+    _source_collection,
+    build_total_pipeline,
+    build_daily_pipeline,
+    build_single_route_pipeline,
+    build_route_batch_pipeline,
+    build_top_routes_pipeline
+)
+
+# Plan stages that read documents instead of index keys
+DOCUMENT_STAGES = ("FETCH", "COLLSCAN")
+
+# Explain sections describing the candidate plans the planner did not choose
+REJECTED_PLAN_KEYS = ("rejectedPlans", "allPlansExecution")
+
+
+def explain_aggregate(collection, pipeline, verbosity="executionStats"):
+    """
+    Run explain for an aggregation pipeline
+    
+    Args:
+        collection: MongoDB collection the pipeline runs against
+        pipeline: Aggregation pipeline
+        verbosity: Explain verbosity ("queryPlanner", "executionStats", ...)
+    
+    Returns:
+        dict: Raw explain output
+    """
+    return collection.database.command(
+        "explain",
+        {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity=verbosity
+    )
+
+
+def _find_key(node, key, skip=()):
+    """
+    Yield every value stored under key anywhere in a nested explain document,
+    without descending into the sections named in skip
+    """
+    if isinstance(node, dict):
+        for name, value in node.items():
+            if name in skip:
+                continue
+            if name == key:
+                yield value
+            yield from _find_key(value, key, skip)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _find_key(item, key, skip)
+
+
+def _plan_stages(plan):
+    """Flatten a winning plan tree into its stage names, root first"""
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    stages = [plan.get("stage", "?")]
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _stage_timings(explain):
+    """
+    Per-stage time estimates of an aggregation
+    
+    Pipelines that were not fully pushed down report a "stages" list with one
+    entry per aggregation stage; otherwise the execution stage tree is used.
+    """
+    timings = []
+    for stage in explain.get("stages", []):
+        name = next((key for key in stage if key.startswith("$")), "?")
+        timings.append({
+            "stage": name,
+            "time_ms": stage.get("executionTimeMillisEstimate"),
+            "n_returned": stage.get("nReturned")
+        })
+    if timings:
+        return timings
+    
+    node = next(_find_key(explain, "executionStages"), None)
+    while node:
+        timings.append({
+            "stage": node.get("stage", "?"),
+            "time_ms": node.get("executionTimeMillisEstimate"),
+            "n_returned": node.get("nReturned")
+        })
+        node = node.get("inputStage")
+    return timings
+
+
+def summarize_explain(explain):
+    """
+    Reduce explain output to the counters used for comparisons
+    
+    Aggregations report executionStats either at the top level (pushed-down
+    plans) or inside a $cursor stage, and sharded clusters report one set
+    per shard, so the counters are summed over every executionStats found.
+    Only the winning plans and their execution stages name the indexes
+    used; rejected candidate plans are skipped.
+    
+    Args:
+        explain: Raw explain output from explain_aggregate()
+    
+    Returns:
+        dict: docs_examined, keys_examined, n_returned, execution_time_ms,
+            the names of the indexes used, the winning plan stages and the
+            per-stage time estimates
+    """
+    stats = list(_find_key(explain, "executionStats"))
+    index_names = sorted(set(_find_key(explain, "indexName", skip=REJECTED_PLAN_KEYS)))
+    winning_plan = next(_find_key(explain, "winningPlan"), None)
+    return {
+        "docs_examined": sum(s.get("totalDocsExamined", 0) for s in stats),
+        "keys_examined": sum(s.get("totalKeysExamined", 0) for s in stats),
+        "n_returned": sum(s.get("nReturned", 0) for s in stats),
+        "execution_time_ms": max((s.get("executionTimeMillis", 0) for s in stats), default=0),
+        "indexes_used": index_names,
+        "winning_plan": " <- ".join(_plan_stages(winning_plan)) if winning_plan else None,
+        "stage_timings": _stage_timings(explain)
+    }
+
+
+def profile_cypher(driver, query, parameters=None):
+    """
+    Run a Cypher query with PROFILE in a read transaction
+    
+    Args:
+        driver: Neo4j driver instance
+        query: Cypher query without the PROFILE prefix
+        parameters: Optional query parameters
+    
+    Returns:
+        dict: Raw profiled plan from the result summary
+    """
+    def profile(tx):
+        return tx.run("PROFILE " + query, parameters or {}).consume().profile
+    
+    with driver.session() as session:
+        return session.execute_read(profile)
+
+
+def summarize_profile(profile):
+    """
+    Reduce a Neo4j profiled plan to its operators and totals
+    
+    Args:
+        profile: Profiled plan from profile_cypher()
+    
+    Returns:
+        dict: db_hits (all operators), rows (root operator), the operator
+            list in plan order and the index-backed operators
+    """
+    operators = []
+    
+    def walk(node):
+        details = node.get("args", {}).get("Details", "")
+        operators.append({
+            "operator": node.get("operatorType", "?").split("@")[0],
+            "db_hits": node.get("dbHits", 0),
+            "rows": node.get("rows", 0),
+            "details": details
+        })
+        for child in node.get("children", []):
+            walk(child)
+    
+    walk(profile)
+    return {
+        "db_hits": sum(op["db_hits"] for op in operators),
+        "rows": operators[0]["rows"],
+        "operators": operators,
+        "index_operators": [op["operator"] for op in operators if "Index" in op["operator"]]
+    }
+
+
+def capture_query_plans(collection, pipelines, driver=None, cypher_queries=None):
+    """
+    Explain MongoDB pipelines and profile Cypher queries for display
+    
+    Failures are recorded per query so one unsupported explain does not
+    hide the other plans.
+    
+    Args:
+        collection: MongoDB collection the pipelines run against
+        pipelines: Dict of query name -> aggregation pipeline
+        driver: Neo4j driver instance, required for cypher_queries
+        cypher_queries: Optional dict of query name -> Cypher query or
+            (query, parameters) tuple
+    
+    Returns:
+        dict: Query name -> summary with "engine" set to "mongodb" or "neo4j"
+    """
+    plans = {}
+    for name, pipeline in pipelines.items():
+        try:
+            plans[name] = summarize_explain(explain_aggregate(collection, pipeline))
+        except Exception as e:
+            plans[name] = {"error": str(e)}
+        plans[name]["engine"] = "mongodb"
+    for name, query in (cypher_queries or {}).items():
+        query, parameters = query if isinstance(query, tuple) else (query, None)
+        try:
+            plans[name] = summarize_profile(profile_cypher(driver, query, parameters))
+        except Exception as e:
+            plans[name] = {"error": str(e)}
+        plans[name]["engine"] = "neo4j"
+    return plans
+
+
+def analytics_pipelines(start_date, end_date, route_pairs, source=SOURCE_ORDERS):
+    """
+    Build every MongoDB pipeline the analytics scenarios run
+    
+    Args:
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        route_pairs: List of (origin, destination) tuples for the route queries
+        source: "orders", "rollup" or "timeseries"
+    
+    Returns:
+        dict: Query name -> aggregation pipeline
+    """
+    pipelines = {
+        "total_sales": build_total_pipeline(start_date, end_date, source),
+        "daily_trend": build_daily_pipeline(start_date, end_date, source),
+        "route_batch_pairs": build_route_batch_pipeline(
+            start_date, end_date, route_pairs, source, ROUTE_MATCH_PAIRS
+        ),
+        "route_batch_cross_product": build_route_batch_pipeline(
+            start_date, end_date, route_pairs, source, ROUTE_MATCH_CROSS_PRODUCT
+        ),
+        "top_routes": build_top_routes_pipeline(start_date, end_date, source=source)
+    }
+    if source == SOURCE_ORDERS and route_pairs:
+        origin, destination = route_pairs[0]
+        pipelines["single_route"] = build_single_route_pipeline(
+            origin, destination, start_date, end_date
+        )
+    return pipelines
+
+
+def is_covered(summary):
+    """
+    Whether an explain summary shows an index-only execution
+    
+    A pipeline is covered when no documents were examined and the winning
+    plan uses an index and has no FETCH or COLLSCAN stage; the plan check
+    keeps an empty range from passing as covered. indexes_used lists the
+    winning plans' indexes only, so an index scan in a rejected plan does
+    not count.
+    """
+    plan = summary.get("winning_plan") or ""
+    return (summary.get("docs_examined") == 0
+            and bool(summary.get("indexes_used"))
+            and not any(stage in plan.split(" <- ") for stage in DOCUMENT_STAGES))
+
+
+def verify_index_coverage(orders_collection, start_date, end_date, route_pairs,
+                          source=SOURCE_ORDERS):
+    """
+    Explain every analytics pipeline and report whether it ran index-only
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        route_pairs: List of (origin, destination) tuples for the route queries
+        source: "orders", "rollup" or "timeseries"
+    
+    Returns:
+        dict: Query name -> explain summary with "covered" set, or "error"
+            if the explain failed
+    """
+    collection = _source_collection(orders_collection, source)
+    report = {}
+    for name, pipeline in analytics_pipelines(start_date, end_date, route_pairs, source).items():
+        try:
+            summary = summarize_explain(explain_aggregate(collection, pipeline))
+        except Exception as e:
+            report[name] = {"error": str(e), "covered": False}
+            continue
+        summary["covered"] = is_covered(summary)
+        report[name] = summary
+    return report
+
+
+def compare_route_match_strategies(orders_collection, route_pairs, start_date, end_date,
+                                   source=SOURCE_ORDERS):
+    """
+    Benchmark the batch route sales query under each route match strategy
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        route_pairs: List of (origin, destination) tuples
+        start_date: Start date (datetime object)
+        end_date: End date (datetime object)
+        source: "orders", "rollup" or "timeseries"
+    
+    Returns:
+        list: One dict per strategy with explain counters, the number of
+            route groups returned and the measured query time in seconds
+    """
+    collection = _source_collection(orders_collection, source)
+    report = []
+    for strategy in (ROUTE_MATCH_CROSS_PRODUCT, ROUTE_MATCH_PAIRS):
+        pipeline = build_route_batch_pipeline(start_date, end_date, route_pairs, source, strategy)
+        
+        start_time = time.time()
+        groups = list(collection.aggregate(pipeline))
+        query_time = time.time() - start_time
+        
+        summary = summarize_explain(explain_aggregate(collection, pipeline))
+        summary.update({
+            "strategy": strategy,
+            "routes_requested": len(route_pairs),
+            "route_groups": len(groups),
+            "query_time": query_time
+        })
+        report.append(summary)
+    return report
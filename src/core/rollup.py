@@ -0,0 +1,212 @@
+"""
+Rollup module
+Maintains the daily_route_sales collection, a pre-aggregated copy of orders
+(day x origin x destination) used to answer date-range analytics without
+re-scanning raw orders
+"""
+
+from datetime import datetime, time as dt_time
+
+from bson import ObjectId
+
+ROLLUP_COLLECTION = "daily_route_sales"
+ROLLUP_INDEX_NAME = "idx_rollup_day_route"
+
+# Full rebuilds are built here and renamed over the live rollup
+ROLLUP_BUILD_COLLECTION = f"{ROLLUP_COLLECTION}_build"
+
+
+def day_bounds(start_date, end_date):
+    """
+    Widen a date range to whole days
+    
+    Rollup documents are keyed by day, so partial-day bounds cannot be
+    answered exactly. The dashboard always passes midnight and end-of-day,
+    for which the rollup matches the raw orders scan.
+    """
+    start_day = datetime.combine(start_date.date(), dt_time.min)
+    end_day = datetime.combine(end_date.date(), dt_time.min)
+    return start_day, end_day
+
+
+def ensure_rollup_indexes(mongo_db, collection=ROLLUP_COLLECTION):
+    """
+    Create the unique (day, origin, destination) index required by $merge
+    
+    Args:
+        mongo_db: MongoDB database instance
+        collection: Rollup collection to index
+    """
+    mongo_db[collection].create_index(
+        [("day", 1), ("origin", 1), ("destination", 1)],
+        name=ROLLUP_INDEX_NAME,
+        unique=True
+    )
+
+
+def build_rollup_pipeline(start_date=None, end_date=None, into=ROLLUP_COLLECTION,
+                          refresh_id=None):
+    """
+    Build the aggregation that folds orders into daily route rows
+    
+    Args:
+        start_date: Optional start date (datetime object)
+        end_date: Optional end date (datetime object)
+        into: Collection the rows are merged into
+        refresh_id: Optional marker stored on every written row, so rows
+            this refresh did not write can be told apart afterwards
+    
+    Returns:
+        list: Aggregation pipeline ending in a $merge into the rollup
+    """
+    pipeline = []
+    if start_date is not None and end_date is not None:
+        start_day, end_day = day_bounds(start_date, end_date)
+        pipeline.append({
+            "$match": {
+                "depart_date": {
+                    "$gte": start_day,
+                    "$lte": datetime.combine(end_day.date(), dt_time.max)
+                }
+            }
+        })
+    
+    pipeline.extend([
+        {
+            "$group": {
+                "_id": {
+                    "day": {"$dateTrunc": {"date": "$depart_date", "unit": "day"}},
+                    "origin": "$origin",
+                    "destination": "$destination"
+                },
+                "total_sales": {"$sum": "$total_price"},
+                "order_count": {"$sum": 1}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "day": "$_id.day",
+                "origin": "$_id.origin",
+                "destination": "$_id.destination",
+                "total_sales": 1,
+                "order_count": 1,
+                **({"refresh_id": {"$literal": refresh_id}} if refresh_id is not None else {})
+            }
+        },
+        {
+            "$merge": {
+                "into": into,
+                "on": ["day", "origin", "destination"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }
+    ])
+    return pipeline
+
+
+def refresh_daily_route_rollup(mongo_db, start_date=None, end_date=None):
+    """
+    Build or refresh the daily_route_sales rollup from raw orders
+    
+    Readers never see an empty or partial rollup. Without a range the
+    rollup is built in daily_route_sales_build, given the live rollup's
+    indexes and renamed over it in one step. With a range the affected
+    days are merged in place and the rows the refresh did not write
+    afterwards (routes that lost all their orders) are deleted.
+    
+    Args:
+        mongo_db: MongoDB database instance
+        start_date: Optional start date (datetime object)
+        end_date: Optional end date (datetime object)
+    
+    Returns:
+        int: Number of rollup documents now covering the refreshed range
+    """
+    rollup = mongo_db[ROLLUP_COLLECTION]
+    ensure_rollup_indexes(mongo_db)
+    
+    if start_date is None or end_date is None:
+        # A stale build collection is left over from an interrupted rebuild
+        mongo_db.drop_collection(ROLLUP_BUILD_COLLECTION)
+        build = mongo_db[ROLLUP_BUILD_COLLECTION]
+        ensure_rollup_indexes(mongo_db, ROLLUP_BUILD_COLLECTION)
+        list(mongo_db["orders"].aggregate(build_rollup_pipeline(into=ROLLUP_BUILD_COLLECTION)))
+        _copy_indexes(rollup, build)
+        build.rename(ROLLUP_COLLECTION, dropTarget=True)
+        return rollup.count_documents({})
+    
+    start_day, end_day = day_bounds(start_date, end_date)
+    day_filter = {"day": {"$gte": start_day, "$lte": end_day}}
+    refresh_id = ObjectId()
+    list(mongo_db["orders"].aggregate(
+        build_rollup_pipeline(start_date, end_date, refresh_id=refresh_id)
+    ))
+    rollup.delete_many({**day_filter, "refresh_id": {"$ne": refresh_id}})
+    return rollup.count_documents(day_filter)
+
+
+def _copy_indexes(source, target):
+    """Create the secondary indexes of source (e.g. a covered profile's) on target"""
+    for name, info in source.index_information().items():
+        if name in ("_id_", ROLLUP_INDEX_NAME):
+            continue
+        target.create_index(info["key"], name=name, unique=info.get("unique", False))
+
+
+def rollup_total_pipeline(start_date, end_date):
+    """Rollup equivalent of the total sales pipeline"""
+    start_day, end_day = day_bounds(start_date, end_date)
+    return [
+        {"$match": {"day": {"$gte": start_day, "$lte": end_day}}},
+        {
+            "$group": {
+                "_id": None,
+                "total_sales": {"$sum": "$total_sales"},
+                "total_orders": {"$sum": "$order_count"}
+            }
+        }
+    ]
+
+
+def rollup_daily_pipeline(start_date, end_date):
+    """Rollup equivalent of the daily trend pipeline"""
+    start_day, end_day = day_bounds(start_date, end_date)
+    return [
+        {"$match": {"day": {"$gte": start_day, "$lte": end_day}}},
+        {
+            "$group": {
+                "_id": {
+                    "$dateToString": {
+                        "format": "%Y-%m-%d",
+                        "date": "$day"
+                    }
+                },
+                "daily_sales": {"$sum": "$total_sales"},
+                "daily_orders": {"$sum": "$order_count"}
+            }
+        },
+        {
+            "$sort": {"_id": 1}
+        }
+    ]
+
+
+def rollup_route_batch_pipeline(route_filter):
+    """
+    Rollup equivalent of the batch route sales pipeline
+    
+    Args:
+        route_filter: $match filter on day and route built by the analytics layer
+    """
+    return [
+        {"$match": route_filter},
+        {
+            "$group": {
+                "_id": {"origin": "$origin", "destination": "$destination"},
+                "total_sales": {"$sum": "$total_sales"},
+                "total_orders": {"$sum": "$order_count"}
+            }
+        }
+    ]
@@ -0,0 +1,236 @@
+"""
+Route catalog module
+Keeps an in-process snapshot of every CONNECTED_TO edge so route selection
+queries are answered locally instead of by a Neo4j round trip per run
+pandas is imported on first use, so the catalog status is cheap to import
+"""
+
+import threading
+import time
+
+from config.config import ROUTE_CATALOG_TTL_SECONDS, ROUTE_CATALOG_CHECK_INTERVAL
+
+ROUTE_CATALOG_QUERY = """
+    MATCH (a:Airport)-[r:CONNECTED_TO]->(b:Airport)
+    RETURN a.airport_code AS origin, b.airport_code AS destination,
+           r.distance_km AS distance_km, r.flight_time_hr AS flight_time_hr,
+           r.frequency_per_week AS frequency_per_week
+"""
+
+# Fingerprint of the route graph: the relationship count plus sums of the
+# properties the catalog holds, so edits to a route's attributes are picked
+# up as well as added or removed routes. One scan returning a single row is
+# far cheaper than reloading every route.
+ROUTE_VERSION_QUERY = """
+    MATCH ()-[r:CONNECTED_TO]->()
+    RETURN count(r) AS route_count,
+           sum(r.distance_km) AS distance_sum,
+           sum(r.flight_time_hr) AS flight_time_sum,
+           sum(r.frequency_per_week) AS frequency_sum
+"""
+
+ROUTE_COLUMNS = ["origin", "destination", "distance_km", "flight_time_hr"]
+
+
+class RouteCatalog:
+    """
+    In-memory table of all routes with background refresh
+    
+    The first request loads the catalog synchronously. Afterwards requests
+    are always answered from the current snapshot; once the check interval
+    has passed a background thread compares the graph version and reloads
+    if it changed or the snapshot is older than the TTL.
+    """
+    
+    def __init__(self, ttl_seconds=ROUTE_CATALOG_TTL_SECONDS,
+                 check_interval=ROUTE_CATALOG_CHECK_INTERVAL):
+        self.ttl_seconds = ttl_seconds
+        self.check_interval = check_interval
+        
+        self._lock = threading.Lock()
+        self._table = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._refreshing = False
+        self.load_count = 0
+        self.last_error = None
+    
+    @staticmethod
+    def _read_version(driver):
+        with driver.session() as session:
+            record = session.run(ROUTE_VERSION_QUERY).single()
+        return tuple(record.values()) if record else None
+    
+    @staticmethod
+    def _read_routes(driver):
+        """Load all CONNECTED_TO edges into a compact DataFrame"""
+        def get_routes(tx):
+            return [record.values() for record in tx.run(ROUTE_CATALOG_QUERY)]
+        
+        with driver.session() as session:
+            rows = session.execute_read(get_routes)
+        
+        import pandas as pd
+        
+        table = pd.DataFrame(rows, columns=ROUTE_COLUMNS + ["frequency_per_week"])
+        table["origin"] = table["origin"].astype("category")
+        table["destination"] = table["destination"].astype("category")
+        table["distance_km"] = pd.to_numeric(table["distance_km"])
+        table["flight_time_hr"] = pd.to_numeric(table["flight_time_hr"])
+        # Rounded first, since a fractional frequency cannot be cast to Int32
+        table["frequency_per_week"] = (
+            pd.to_numeric(table["frequency_per_week"]).round().astype("Int32")
+        )
+        
+        # Match Cypher's ORDER BY distance_km DESC, where nulls sort first
+        return table.sort_values(
+            ["distance_km", "origin", "destination"],
+            ascending=[False, True, True],
+            na_position="first",
+            kind="stable"
+        ).reset_index(drop=True)
+    
+    def load(self, driver):
+        """
+        Load the catalog from Neo4j, replacing the current snapshot
+        
+        Args:
+            driver: Neo4j driver instance
+        """
+        version = self._read_version(driver)
+        table = self._read_routes(driver)
+        now = time.monotonic()
+        with self._lock:
+            self._table = table
+            self._version = version
+            self._loaded_at = now
+            self._checked_at = now
+            self.load_count += 1
+            self.last_error = None
+    
+    def _refresh(self, driver):
+        """Reload if the graph version changed or the TTL expired"""
+        try:
+            version = self._read_version(driver)
+            expired = time.monotonic() - self._loaded_at >= self.ttl_seconds
+            if expired or version != self._version:
+                self.load(driver)
+            else:
+                with self._lock:
+                    self._checked_at = time.monotonic()
+        except Exception as e:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self.last_error = e
+        finally:
+            with self._lock:
+                self._refreshing = False
+    
+    def snapshot(self, driver):
+        """
+        Return the current route table, scheduling a background check if due
+        
+        Args:
+            driver: Neo4j driver instance used for (re)loading
+        
+        Returns:
+            DataFrame: origin, destination, distance_km, flight_time_hr,
+                frequency_per_week sorted by distance descending
+        """
+        with self._lock:
+            table = self._table
+            due = (not self._refreshing and
+                   time.monotonic() - self._checked_at >= self.check_interval)
+            if table is not None and due:
+                self._refreshing = True
+        
+        if table is None:
+            self.load(driver)
+            with self._lock:
+                return self._table
+        
+        if due:
+            threading.Thread(target=self._refresh, args=(driver,), daemon=True).start()
+        return table
+    
+    def top_by_distance(self, driver, limit=50, min_distance=None, require_flight_time=False):
+        """
+        Answer the scenario route queries from the snapshot
+        
+        Equivalent to the Neo4j route queries: optional distance_km >
+        min_distance and flight_time_hr IS NOT NULL filters, ordered by
+        distance descending.
+        
+        Args:
+            driver: Neo4j driver instance used for (re)loading
+            limit: Maximum number of routes, None for all matching routes
+            min_distance: Only routes longer than this many km
+            require_flight_time: Only routes with a known flight time
+        
+        Returns:
+            DataFrame: origin, destination, distance_km, flight_time_hr
+        """
+        import pandas as pd
+        
+        table = self.snapshot(driver)
+        mask = pd.Series(True, index=table.index)
+        if min_distance is not None:
+            mask &= table["distance_km"] > min_distance
+        if require_flight_time:
+            mask &= table["flight_time_hr"].notna()
+        
+        routes = table.loc[mask, ROUTE_COLUMNS]
+        if limit is not None:
+            routes = routes.head(limit)
+        routes = routes.reset_index(drop=True)
+        routes["origin"] = routes["origin"].astype(str)
+        routes["destination"] = routes["destination"].astype(str)
+        return routes
+    
+    def lookup(self, driver, route_pairs):
+        """
+        Return the attributes of the given routes from the snapshot
+        
+        Args:
+            driver: Neo4j driver instance used for (re)loading
+            route_pairs: List of (origin, destination) tuples
+        
+        Returns:
+            DataFrame: origin, destination, distance_km, flight_time_hr for
+                the requested routes that exist in the graph
+        """
+        import pandas as pd
+        
+        table = self.snapshot(driver)
+        if not route_pairs:
+            return pd.DataFrame(columns=ROUTE_COLUMNS)
+        keys = pd.MultiIndex.from_arrays(
+            [table["origin"].astype(str), table["destination"].astype(str)]
+        )
+        routes = table.loc[keys.isin(pd.MultiIndex.from_tuples(route_pairs)), ROUTE_COLUMNS]
+        routes = routes.drop_duplicates(["origin", "destination"]).reset_index(drop=True)
+        routes["origin"] = routes["origin"].astype(str)
+        routes["destination"] = routes["destination"].astype(str)
+        return routes
+    
+    def get_status(self):
+        """
+        Return catalog status for display
+        
+        Returns:
+            dict: routes, version, age_seconds, loads and last_error
+        """
+        with self._lock:
+            return {
+                "routes": 0 if self._table is None else len(self._table),
+                "version": self._version,
+                "age_seconds": (time.monotonic() - self._loaded_at
+                                if self._table is not None else None),
+                "loads": self.load_count,
+                "last_error": str(self.last_error) if self.last_error else None
+            }
+
+
+# Shared by every session served by this process
+route_catalog = RouteCatalog()
@@ -0,0 +1,252 @@
+"""
+Snapshot module
+Exports orders to a month-partitioned Parquet snapshot on local disk and
+answers the analytics aggregations from it with vectorized Arrow compute,
+keeping large historical scans off MongoDB
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config.config import SNAPSHOT_DIR
+
+SNAPSHOT_METADATA_FILE = "_snapshot.json"
+
+# Compact column types; airport codes, status and class are dictionary encoded
+SNAPSHOT_SCHEMA = pa.schema([
+    ("depart_date", pa.timestamp("ms")),
+    ("origin", pa.dictionary(pa.int16(), pa.string())),
+    ("destination", pa.dictionary(pa.int16(), pa.string())),
+    ("total_price", pa.int64()),
+    ("status", pa.dictionary(pa.int8(), pa.string())),
+    ("class", pa.dictionary(pa.int8(), pa.string())),
+    ("month", pa.string())
+])
+
+SNAPSHOT_FIELDS = [field.name for field in SNAPSHOT_SCHEMA if field.name != "month"]
+
+ROUTE_SALES_COLUMNS = ["origin", "destination", "total_sales", "total_orders"]
+
+
+def _write_part(columns, path, part_number):
+    """Write one buffered batch of orders into the month partitions"""
+    arrays = []
+    for field in SNAPSHOT_SCHEMA:
+        if field.name == "month":
+            values = [value.strftime("%Y-%m") if value else None for value in columns["depart_date"]]
+            arrays.append(pa.array(values, pa.string()))
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[field.name], pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(columns[field.name], field.type))
+    table = pa.Table.from_arrays(arrays, schema=SNAPSHOT_SCHEMA).sort_by("depart_date")
+    pq.write_to_dataset(
+        table, path, partition_cols=["month"],
+        basename_template=f"part-{part_number:05d}-{{i}}.parquet"
+    )
+
+
+def export_orders_snapshot(orders_collection, path=SNAPSHOT_DIR, start_date=None, end_date=None,
+                           batch_size=200_000):
+    """
+    Export orders into a month-partitioned Parquet snapshot
+    
+    The snapshot is written next to the target directory and swapped in
+    when complete, so readers never see a half-written snapshot.
+    
+    Args:
+        orders_collection: MongoDB orders collection
+        path: Snapshot directory
+        start_date: Optional first departure date to include (datetime object)
+        end_date: Optional last departure date to include (datetime object)
+        batch_size: Orders buffered per Parquet write
+    
+    Returns:
+        dict: Snapshot metadata (rows, coverage, exported_at)
+    """
+    query = {}
+    if start_date is not None and end_date is not None:
+        query["depart_date"] = {"$gte": start_date, "$lte": end_date}
+    
+    staging_path = path + ".tmp"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+    
+    projection = {"_id": 0, **{name: 1 for name in SNAPSHOT_FIELDS}}
+    columns = {name: [] for name in SNAPSHOT_FIELDS}
+    rows, parts = 0, 0
+    first_day, last_day = None, None
+    
+    for doc in orders_collection.find(query, projection, batch_size=10_000):
+        for name in SNAPSHOT_FIELDS:
+            columns[name].append(doc.get(name))
+        rows += 1
+        if len(columns["depart_date"]) >= batch_size:
+            _write_part(columns, staging_path, parts)
+            parts += 1
+            columns = {name: [] for name in SNAPSHOT_FIELDS}
+        depart_date = doc.get("depart_date")
+        if depart_date is not None:
+            first_day = depart_date if first_day is None else min(first_day, depart_date)
+            last_day = depart_date if last_day is None else max(last_day, depart_date)
+    if columns["depart_date"]:
+        _write_part(columns, staging_path, parts)
+    
+    metadata = {
+        "rows": rows,
+        "first_depart_date": first_day.isoformat() if first_day else None,
+        "last_depart_date": last_day.isoformat() if last_day else None,
+        "range_start": start_date.isoformat() if start_date else None,
+        "range_end": end_date.isoformat() if end_date else None,
+        "exported_at": datetime.now(timezone.utc).isoformat()
+    }
+    with open(os.path.join(staging_path, SNAPSHOT_METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(staging_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return metadata
+
+
+class SnapshotEngine:
+    """
+    Answers total sales, daily trend and route sales from a snapshot
+    
+    Month partitions outside the requested range are pruned before any
+    file is read, and only the needed columns are loaded.
+    """
+    
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+        with open(os.path.join(path, SNAPSHOT_METADATA_FILE), encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self._dataset = ds.dataset(
+            path, format="parquet", partitioning="hive",
+            exclude_invalid_files=True
+        )
+    
+    def _scan(self, start_date, end_date, columns, extra_filter=None):
+        """Read the rows departing within the range"""
+        row_filter = (
+            (ds.field("month") >= start_date.strftime("%Y-%m")) &
+            (ds.field("month") <= end_date.strftime("%Y-%m")) &
+            (ds.field("depart_date") >= pa.scalar(start_date, pa.timestamp("ms"))) &
+            (ds.field("depart_date") <= pa.scalar(end_date, pa.timestamp("ms")))
+        )
+        if extra_filter is not None:
+            row_filter &= extra_filter
+        return self._dataset.to_table(columns=columns, filter=row_filter)
+    
+    def total_sales(self, start_date, end_date):
+        """
+        Returns:
+            tuple: (total_sales, total_orders)
+        """
+        table = self._scan(start_date, end_date, ["total_price"])
+        total = pc.sum(table["total_price"]).as_py()
+        return (total or 0), table.num_rows
+    
+    def sales_by_date(self, start_date, end_date):
+        """
+        Returns:
+            DataFrame: date, daily_sales, daily_orders sorted by date
+        """
+        table = self._scan(start_date, end_date, ["depart_date", "total_price"])
+        if table.num_rows == 0:
+            return pd.DataFrame()
+        table = table.append_column("date", pc.floor_temporal(table["depart_date"], unit="day"))
+        daily = table.group_by("date").aggregate([
+            ("total_price", "sum"),
+            ([], "count_all")
+        ]).sort_by("date").to_pandas()
+        
+        df_daily = pd.DataFrame({
+            "date": pd.to_datetime(daily["date"]).astype("datetime64[ns]"),
+            "daily_sales": daily["total_price_sum"].fillna(0).astype("int64"),
+            "daily_orders": daily["count_all"].astype("int64")
+        })
+        return df_daily
+    
+    def route_sales(self, route_pairs, start_date, end_date):
+        """
+        Returns:
+            DataFrame: origin, destination, total_sales, total_orders for the
+                requested routes that have orders in the range
+        """
+        if not route_pairs:
+            return pd.DataFrame(columns=ROUTE_SALES_COLUMNS)
+        
+        origins = sorted({origin for origin, _ in route_pairs})
+        destinations = sorted({destination for _, destination in route_pairs})
+        df_routes = self._route_totals(self._scan(
+            start_date, end_date, ["origin", "destination", "total_price"],
+            ds.field("origin").isin(origins) & ds.field("destination").isin(destinations)
+        ))
+        
+        # Keep exactly the requested pairs
+        requested = pd.MultiIndex.from_tuples(route_pairs)
+        keys = pd.MultiIndex.from_arrays([df_routes["origin"], df_routes["destination"]])
+        return df_routes[keys.isin(requested)].reset_index(drop=True)
+    
+    def top_routes(self, start_date, end_date, limit):
+        """
+        Returns:
+            DataFrame: origin, destination, total_sales, total_orders of the
+                limit routes with the highest sales in the range
+        """
+        df_routes = self._route_totals(
+            self._scan(start_date, end_date, ["origin", "destination", "total_price"])
+        )
+        return df_routes.sort_values(
+            ["total_sales", "origin", "destination"], ascending=[False, True, True]
+        ).head(limit).reset_index(drop=True)
+    
+    @staticmethod
+    def _route_totals(table):
+        """Sum sales and count orders per route of a scanned table"""
+        # Each Parquet file carries its own dictionary; align them before grouping
+        grouped = table.unify_dictionaries().group_by(["origin", "destination"]).aggregate([
+            ("total_price", "sum"),
+            ([], "count_all")
+        ]).to_pandas()
+        
+        return pd.DataFrame({
+            "origin": grouped["origin"].astype(str),
+            "destination": grouped["destination"].astype(str),
+            "total_sales": grouped["total_price_sum"].fillna(0).astype("int64"),
+            "total_orders": grouped["count_all"].astype("int64")
+        }, columns=ROUTE_SALES_COLUMNS)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_snapshot_engine(path=SNAPSHOT_DIR):
+    """
+    Return a SnapshotEngine for path, reopening it after a new export
+    
+    Raises:
+        FileNotFoundError: If no snapshot has been exported to path
+    """
+    metadata_path = os.path.join(path, SNAPSHOT_METADATA_FILE)
+    version = os.path.getmtime(metadata_path)
+    with _engines_lock:
+        cached = _engines.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, SnapshotEngine(path))
+            _engines[path] = cached
+        return cached[1]
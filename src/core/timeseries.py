@@ -0,0 +1,157 @@
+"""
+Time-series module
+Maintains orders_ts, a MongoDB time-series copy of orders bucketed by
+departure time with the route, class and status as metadata, which the
+analytics pipelines can target instead of the regular collection
+"""
+
+from config.config import TIMESERIES_BATCH_SIZE, TIMESERIES_GRANULARITY
+
+TIMESERIES_COLLECTION = "orders_ts"
+TIMESERIES_TIME_FIELD = "depart_date"
+TIMESERIES_META_FIELD = "meta"
+
+# Order fields stored in the metaField; measurements with equal metadata
+# share buckets, so these should change rarely within a time span
+TIMESERIES_META_FIELDS = ("origin", "destination", "class", "status")
+
+# Measurement fields copied next to the timeField
+TIMESERIES_MEASUREMENTS = ("total_price",)
+
+TIMESERIES_INDEX_NAME = "idx_ts_route_date"
+
+
+def timeseries_field(field):
+    """Document path of an order field in orders_ts, e.g. "meta.origin" for origin"""
+    if field in TIMESERIES_META_FIELDS:
+        return f"{TIMESERIES_META_FIELD}.{field}"
+    return field
+
+
+def ensure_timeseries_collection(mongo_db, granularity=TIMESERIES_GRANULARITY):
+    """
+    Create orders_ts and its route-date index if they do not exist
+    
+    Args:
+        mongo_db: MongoDB database instance
+        granularity: Bucket granularity ("seconds", "minutes" or "hours")
+    """
+    if TIMESERIES_COLLECTION not in mongo_db.list_collection_names(
+        filter={"name": TIMESERIES_COLLECTION}
+    ):
+        mongo_db.create_collection(
+            TIMESERIES_COLLECTION,
+            timeseries={
+                "timeField": TIMESERIES_TIME_FIELD,
+                "metaField": TIMESERIES_META_FIELD,
+                "granularity": granularity
+            }
+        )
+    # Date-only queries use the clustered bucket time bounds; route queries need this
+    mongo_db[TIMESERIES_COLLECTION].create_index(
+        [(timeseries_field("origin"), 1), (timeseries_field("destination"), 1),
+         (TIMESERIES_TIME_FIELD, 1)],
+        name=TIMESERIES_INDEX_NAME
+    )
+
+
+def to_timeseries_documents(orders):
+    """
+    Convert order documents to orders_ts measurements
+    
+    Orders without a departure date cannot be stored in a time-series
+    collection and are skipped.
+    
+    Args:
+        orders: Iterable of order documents
+    
+    Returns:
+        list: Measurements with depart_date, total_price and meta
+    """
+    return [
+        {
+            TIMESERIES_TIME_FIELD: order[TIMESERIES_TIME_FIELD],
+            **{field: order.get(field) for field in TIMESERIES_MEASUREMENTS},
+            TIMESERIES_META_FIELD: {field: order.get(field) for field in TIMESERIES_META_FIELDS}
+        }
+        for order in orders
+        if order.get(TIMESERIES_TIME_FIELD) is not None
+    ]
+
+
+def refresh_orders_timeseries(mongo_db, start_date=None, end_date=None,
+                              batch_size=TIMESERIES_BATCH_SIZE):
+    """
+    Build or refresh orders_ts from the orders collection
+    
+    Without a range the collection is dropped and rebuilt. With a range
+    only the departures within it are deleted and copied again, which needs
+    arbitrary deletes on time-series collections (MongoDB 7.0+).
+    
+    Args:
+        mongo_db: MongoDB database instance
+        start_date: Optional start date (datetime object)
+        end_date: Optional end date (datetime object)
+        batch_size: Measurements per insert_many call
+    
+    Returns:
+        int: Number of measurements copied
+    """
+    time_filter = {TIMESERIES_TIME_FIELD: {"$type": "date"}}
+    if start_date is not None and end_date is not None:
+        time_filter = {TIMESERIES_TIME_FIELD: {"$gte": start_date, "$lte": end_date}}
+        ensure_timeseries_collection(mongo_db)
+        mongo_db[TIMESERIES_COLLECTION].delete_many(time_filter)
+    else:
+        mongo_db.drop_collection(TIMESERIES_COLLECTION)
+        ensure_timeseries_collection(mongo_db)
+    
+    timeseries = mongo_db[TIMESERIES_COLLECTION]
+    projection = {"_id": 0, TIMESERIES_TIME_FIELD: 1,
+                  **{field: 1 for field in TIMESERIES_MEASUREMENTS + TIMESERIES_META_FIELDS}}
+    # Sorted input fills each bucket before the next one is opened
+    cursor = mongo_db["orders"].find(
+        time_filter, projection, batch_size=batch_size, allow_disk_use=True
+    ).sort(TIMESERIES_TIME_FIELD, 1)
+    
+    copied, buffer = 0, []
+    for order in cursor:
+        buffer.append(order)
+        if len(buffer) >= batch_size:
+            copied += _insert_measurements(timeseries, buffer)
+            buffer = []
+    if buffer:
+        copied += _insert_measurements(timeseries, buffer)
+    return copied
+
+
+def _insert_measurements(timeseries, orders):
+    documents = to_timeseries_documents(orders)
+    if documents:
+        timeseries.insert_many(documents, ordered=False)
+    return len(documents)
+
+
+def collection_storage(mongo_db, name):
+    """
+    Storage statistics of a collection from $collStats
+    
+    Args:
+        mongo_db: MongoDB database instance
+        name: Collection name
+    
+    Returns:
+        dict: documents, data size, storage size and index size in bytes,
+            plus the bucket count for time-series collections
+    """
+    stats = next(mongo_db[name].aggregate([{"$collStats": {"storageStats": {}}}]), {})
+    storage = stats.get("storageStats", {})
+    report = {
+        "documents": mongo_db[name].estimated_document_count(),
+        "size_bytes": storage.get("size", 0),
+        "storage_bytes": storage.get("storageSize", 0),
+        "index_bytes": storage.get("totalIndexSize", 0)
+    }
+    if "timeseries" in storage:
+        report["buckets"] = storage["timeseries"].get("bucketCount")
+    return report
@@ -0,0 +1,193 @@
+"""
+Tracing module
+Lightweight nested spans with nanosecond timing, propagated through
+contextvars (including into thread pools) and exportable as JSON or in
+the Chrome trace-event format
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed unit of work with optional attributes and child spans"""
+    
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.thread_id = threading.get_ident()
+        self.children = []
+        self._lock = threading.Lock()
+    
+    def _add_child(self, child):
+        with self._lock:
+            self.children.append(child)
+    
+    def set(self, **attributes):
+        """Attach attributes, e.g. row counts known only at the end"""
+        self.attributes.update(attributes)
+    
+    @property
+    def duration_ns(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return end_ns - self.start_ns
+    
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.duration_ns / 1e9
+    
+    def to_dict(self):
+        """
+        Returns:
+            dict: name, start_ns, duration_ns, thread_id, attributes and
+                children, recursively
+        """
+        with self._lock:
+            children = list(self.children)
+        return {
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "thread_id": self.thread_id,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in children]
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a child of the current span
+    
+    Usage:
+        with span("mongo.total_sales", source=source) as stage:
+            ...
+        elapsed_seconds = stage.duration
+    
+    Args:
+        name: Span name, dotted by component (e.g. "neo4j.routes")
+        **attributes: Values recorded with the span
+    
+    Yields:
+        Span: The span, closed when the block exits
+    """
+    current = Span(name, attributes)
+    parent = _current_span.get()
+    if parent is not None:
+        parent._add_child(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=repr(e))
+        raise
+    finally:
+        current.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+
+
+def traced(name):
+    """Decorator running every call of a function inside a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """Return the innermost open span, or None outside any span"""
+    return _current_span.get()
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """
+    Submit work to an executor so its spans nest under the current span
+    
+    Returns:
+        Future: The executor future
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, func, *args, **kwargs)
+
+
+def to_chrome_trace(trace):
+    """
+    Convert a span dict to the Chrome trace-event format
+    
+    The result loads in chrome://tracing and Perfetto, with one track per
+    thread so concurrent stages appear side by side.
+    
+    Args:
+        trace: Span dict from Span.to_dict()
+    
+    Returns:
+        dict: {"traceEvents": [...], "displayTimeUnit": "ms"}
+    """
+    events = []
+    pid = os.getpid()
+    
+    def walk(node):
+        events.append({
+            "name": node["name"],
+            "ph": "X",
+            "ts": node["start_ns"] / 1000,
+            "dur": node["duration_ns"] / 1000,
+            "pid": pid,
+            "tid": node["thread_id"],
+            "args": {key: str(value) for key, value in node["attributes"].items()}
+        })
+        for child in node["children"]:
+            walk(child)
+    
+    walk(trace)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_trace(trace, path, chrome=False):
+    """
+    Write a span dict to a JSON file
+    
+    Args:
+        trace: Span dict from Span.to_dict()
+        path: Output file path
+        chrome: Write the Chrome trace-event format instead of the span tree
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(trace) if chrome else trace, f, indent=2, default=str)
+
+
+def flatten_trace(trace, depth=0):
+    """
+    List every span of a trace with its nesting depth, in start order
+    
+    Returns:
+        list: Dicts with name, depth, start_ms (relative to the root) and duration_ms
+    """
+    origin = trace["start_ns"]
+    rows = []
+    
+    def walk(node, level):
+        rows.append({
+            "name": node["name"],
+            "depth": level,
+            "start_ms": (node["start_ns"] - origin) / 1e6,
+            "duration_ms": node["duration_ns"] / 1e6
+        })
+        for child in sorted(node["children"], key=lambda c: c["start_ns"]):
+            walk(child, level + 1)
+    
+    walk(trace, depth)
+    return rows
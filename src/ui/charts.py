@@ -0,0 +1,168 @@
+"""
+Chart builders for the dashboard views
+Plotly is imported on first use, so reruns of views without charts never
+pay for loading it
+"""
+
+
+def daily_trend_figure(df_daily, title):
+    """Line chart of daily sales"""
+    import plotly.express as px
+    
+    fig_daily = px.line(
+        df_daily,
+        x='date',
+        y='daily_sales',
+        title=title,
+        labels={'daily_sales': 'Daily Sales (Rp)', 'date': 'Date'}
+    )
+    fig_daily.update_traces(line_color='#1f77b4', line_width=3)
+    fig_daily.update_layout(height=400)
+    return fig_daily
+
+
+def sales_orders_figure(df_sales, df_orders):
+    """
+    Side-by-side daily sales and daily orders
+    
+    The series are passed separately so each can be downsampled on its own
+    y values.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    fig_orders = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('Daily Sales', 'Daily Orders'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    fig_orders.add_trace(
+        go.Scatter(
+            x=df_sales['date'],
+            y=df_sales['daily_sales'],
+            mode='lines+markers',
+            name='Sales',
+            line=dict(color='#1f77b4')
+        ),
+        row=1, col=1
+    )
+    
+    fig_orders.add_trace(
+        go.Scatter(
+            x=df_orders['date'],
+            y=df_orders['daily_orders'],
+            mode='lines+markers',
+            name='Orders',
+            line=dict(color='#ff7f0e')
+        ),
+        row=1, col=2
+    )
+    
+    fig_orders.update_layout(height=400, title_text="Daily Sales vs Orders")
+    return fig_orders
+
+
+def period_sales_figure(df_period, title):
+    """Bar chart of sales per period, hovering the order count"""
+    import plotly.express as px
+    
+    fig_period = px.bar(
+        df_period,
+        x='period',
+        y='sales',
+        hover_data=['orders'],
+        title=title,
+        labels={'sales': 'Sales (Rp)', 'period': 'Period', 'orders': 'Orders'}
+    )
+    fig_period.update_layout(height=400)
+    return fig_period
+
+
+def top_routes_figure(top_routes):
+    """Horizontal bar chart of the top routes by revenue"""
+    import plotly.express as px
+    
+    top_routes = top_routes.copy()
+    top_routes['route'] = top_routes['origin'] + ' to ' + top_routes['destination']
+    
+    fig_routes = px.bar(
+        top_routes,
+        x='total_sales',
+        y='route',
+        orientation='h',
+        title="Top 10 Routes by Sales Revenue",
+        labels={'total_sales': 'Sales Revenue (Rp)', 'route': 'Route'}
+    )
+    fig_routes.update_layout(height=500)
+    return fig_routes
+
+
+def distance_sales_figure(routes_with_sales):
+    """Scatter plot of route distance against revenue"""
+    import plotly.express as px
+    
+    fig_scatter = px.scatter(
+        routes_with_sales,
+        x='distance_km',
+        y='total_sales',
+        size='total_orders',
+        hover_data=['origin', 'destination', 'flight_time_hr'],
+        title="Route Distance vs Sales Revenue",
+        labels={
+            'distance_km': 'Distance (km)',
+            'total_sales': 'Sales Revenue (Rp)',
+            'total_orders': 'Number of Orders'
+        }
+    )
+    fig_scatter.update_layout(height=500)
+    return fig_scatter
+
+
+def histogram_figure(df, column, title, label):
+    """Histogram of one column with 20 bins"""
+    import plotly.express as px
+    
+    return px.histogram(df, x=column, nbins=20, title=title, labels={column: label})
+
+
+def performance_figure(df_perf):
+    """Grouped bars of stage times with and without optimization"""
+    import plotly.graph_objects as go
+    
+    fig_perf = go.Figure()
+    
+    fig_perf.add_trace(go.Bar(
+        name='Without Optimization',
+        x=df_perf["Query Type"][:-1],
+        y=df_perf["Without Optimization (s)"][:-1],
+        marker_color='#ff6b6b'
+    ))
+    
+    fig_perf.add_trace(go.Bar(
+        name='With Optimization',
+        x=df_perf["Query Type"][:-1],
+        y=df_perf["With Optimization (s)"][:-1],
+        marker_color='#51cf66'
+    ))
+    
+    fig_perf.update_layout(
+        title="Performance Comparison by Query Type",
+        xaxis_title="Query Type",
+        yaxis_title="Execution Time (seconds)",
+        barmode='group',
+        height=400
+    )
+    return fig_perf
+
+
+def timing_box_figure(df_samples, title):
+    """Box plots of benchmark stage timings per strategy and phase"""
+    import plotly.express as px
+    
+    fig_box = px.box(
+        df_samples, x="stage", y="seconds", color="strategy",
+        facet_col="phase", points="outliers", title=title
+    )
+    fig_box.update_layout(height=450, yaxis_title="Execution Time (seconds)")
+    return fig_box
@@ -1,34 +1,84 @@
 """
 Flight Ticket Sales & Performance Analysis Dashboard
 Main Streamlit application
+The database drivers, pandas and the analytics, caching and benchmark
+modules are imported inside the views and handlers that use them, so
+importing the app loads little beyond Streamlit
 """
 
 import streamlit as st
+import json
 import time
 from datetime import datetime, date
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.config import APP_TITLE, APP_ICON, PAGE_LAYOUT, DEFAULT_START_DATE, DEFAULT_END_DATE
-from src.core.database import (
-    init_connections,
-    create_mongodb_indexes,
-    drop_mongodb_indexes,
-    create_neo4j_indexes,
-    drop_neo4j_indexes
+from config.config import (
+    APP_TITLE, APP_ICON, PAGE_LAYOUT, DEFAULT_START_DATE, DEFAULT_END_DATE, CHART_MAX_POINTS,
+    MONGO_INDEX_PROFILE, INDEX_BUILD_POLL_INTERVAL, SALES_TIMEZONE
 )
-from src.core.analytics import (
-    run_scenario_without_optimization,
-    run_scenario_with_optimization,
-    generate_insights
+from src.core.periods import (
+    GRANULARITY_HOUR,
+    GRANULARITY_DAY,
+    GRANULARITY_WEEK,
+    GRANULARITY_MONTH
 )
+from src.ui import charts
+from src.core.tracing import span, traced, current_span, to_chrome_trace, flatten_trace
+
+# The label values below spell out the SOURCE_*, ROUTE_RANKING_*, INDEX_STATE_*,
+# INDEX_PROFILE_* and DOWNSAMPLE_* constants, so building the sidebar does not
+# import their modules
+
+# Sidebar labels for the data sources of the optimized scenario
+SOURCE_LABELS = {
+    "Raw orders": "orders",
+    "Daily route rollup": "rollup",
+    "Time-series orders copy": "timeseries",
+    "Local columnar snapshot": "snapshot",
+    "Memory-mapped index": "mmap"
+}
+
+# Labels for how the optimized scenario picks the routes it reports
+ROUTE_RANKING_LABELS = {
+    "Longest routes (Neo4j first)": "distance",
+    "Top routes by sales (MongoDB first)": "sales",
+    "All routes (streamed in chunks)": "all",
+    "Long routes by synced graph revenue": "graph"
+}
+
+# Labels for the index state a statistical benchmark is pinned to
+INDEX_STATE_LABELS = {
+    "Leave as is": "as_is",
+    "Create indexes first": "created",
+    "Drop indexes first": "dropped"
+}
+
+# Labels for the MongoDB index profiles
+INDEX_PROFILE_LABELS = {
+    "Covered (index-only analytics)": "covered",
+    "Basic": "basic"
+}
+
+# Labels for the chart downsampling methods
+DOWNSAMPLE_LABELS = {
+    "Largest-Triangle-Three-Buckets": "lttb",
+    "Min/max per bucket": "minmax"
+}
+
+# Labels for the sales by period granularities
+GRANULARITY_LABELS = {
+    "Hourly": GRANULARITY_HOUR,
+    "Daily": GRANULARITY_DAY,
+    "Weekly": GRANULARITY_WEEK,
+    "Monthly": GRANULARITY_MONTH
+}
+
+# Reruns kept for the render timing summary
+RENDER_TIMING_HISTORY = 50
 
 
 def configure_page():
@@ -40,6 +90,65 @@ def configure_page():
     )
 
 
+def _start_index_plan(profile, drop_all):
+    """Launch an index reconciliation on the shared background index manager"""
+    from src.core.cache import query_cache
+    from src.core.database import get_shared_connections
+    from src.core.index_manager import index_manager
+    
+    driver, mongo_client, mongo_db = get_shared_connections()
+    if not (driver and mongo_client):
+        return
+    try:
+        # Cached results were computed against the old indexes
+        started = index_manager.start(
+            mongo_db, driver, profile, drop_all, on_complete=query_cache.invalidate
+        )
+    except Exception as e:
+        st.sidebar.error(f"Error: {e}")
+        return
+    if not started:
+        st.sidebar.warning("An index build is already running")
+
+
+def _render_index_progress():
+    """Show the per-index state of the current or last index plan"""
+    from src.core.database import get_shared_connections
+    from src.core.index_manager import index_manager, STATE_DONE, STATE_FAILED, STATE_RUNNING
+    
+    busy = index_manager.busy
+    if busy:
+        _, mongo_client, mongo_db = get_shared_connections()
+        if mongo_client:
+            index_manager.poll(mongo_db)
+    
+    tasks = index_manager.status()
+    if not tasks:
+        return
+    
+    finished = sum(task["state"] in (STATE_DONE, STATE_FAILED) for task in tasks)
+    st.caption(f"Index plan: {finished} of {len(tasks)} indexes finished"
+               + (", building in the background" if busy else ""))
+    for task in tasks:
+        target = f"{task['collection']}.{task['name']}" if task['collection'] else task['name']
+        label = f"{task['engine']} {target}: {task['action']} ({task['state']})"
+        if task['state'] == STATE_FAILED:
+            st.error(f"{label}: {task['error']}")
+        elif task['state'] == STATE_RUNNING and task['progress'] is not None:
+            st.progress(min(task['progress'], 100.0) / 100, text=f"{label} {task['progress']:.0f}%")
+        else:
+            st.caption(label)
+    
+    if busy and not hasattr(st, "fragment"):
+        st.button("Refresh progress", use_container_width=True)
+    elif not busy and st.session_state.get('index_plan_running'):
+        # The plan just finished inside the auto-refreshing fragment
+        st.session_state['index_plan_running'] = False
+        st.rerun()
+    st.session_state['index_plan_running'] = busy
+
+
+@traced("dashboard.sidebar_controls")
 def render_sidebar_controls(start_date, end_date):
     """
     Render sidebar controls for period selection and index management
@@ -47,6 +156,12 @@ def render_sidebar_controls(start_date, end_date):
     Returns:
         tuple: (start_date, end_date, period_days)
     """
+    from src.core.cache import query_cache
+    from src.core.daily_store import daily_trend_store
+    from src.core.database import get_shared_connections, get_connection_manager
+    from src.core.index_manager import index_manager
+    from src.core.route_catalog import route_catalog
+    
     st.sidebar.header("Configuration")
     
     # Analysis Period Section
@@ -72,81 +187,607 @@ def render_sidebar_controls(start_date, end_date):
     
     # Index Management Section
     st.sidebar.subheader("Index Management")
+    index_profile = INDEX_PROFILE_LABELS[st.sidebar.selectbox(
+        "MongoDB index profile:",
+        list(INDEX_PROFILE_LABELS.keys()),
+        index=list(INDEX_PROFILE_LABELS.values()).index(MONGO_INDEX_PROFILE),
+        help="The covered profile adds total_price (and the rollup totals) to the compound "
+             "indexes, so the analytics pipelines never fetch documents"
+    )]
     col1, col2 = st.sidebar.columns(2)
     
     with col1:
-        if st.button("Create Index", use_container_width=True):
-            with st.spinner("Creating indexes..."):
-                driver, mongo_client, mongo_db = init_connections()
-                if driver and mongo_client:
-                    try:
-                        create_mongodb_indexes(mongo_db)
-                        with driver.session() as session:
-                            session.execute_write(create_neo4j_indexes)
-                        st.sidebar.success("Indexes created successfully!")
-                    except Exception as e:
-                        st.sidebar.error(f"Error: {e}")
-                    finally:
-                        if driver:
-                            driver.close()
-                        if mongo_client:
-                            mongo_client.close()
+        if st.button("Create Index", use_container_width=True, disabled=index_manager.busy):
+            _start_index_plan(index_profile, drop_all=False)
     
     with col2:
-        if st.button("Drop Index", use_container_width=True):
-            with st.spinner("Dropping indexes..."):
-                driver, mongo_client, mongo_db = init_connections()
-                if driver and mongo_client:
-                    try:
-                        drop_mongodb_indexes(mongo_db)
-                        with driver.session() as session:
-                            session.execute_write(drop_neo4j_indexes)
-                        st.sidebar.success("Indexes dropped successfully!")
-                    except Exception as e:
-                        st.sidebar.error(f"Error: {e}")
-                    finally:
-                        if driver:
-                            driver.close()
-                        if mongo_client:
-                            mongo_client.close()
+        if st.button("Drop Index", use_container_width=True, disabled=index_manager.busy):
+            _start_index_plan(index_profile, drop_all=True)
+    
+    with st.sidebar:
+        if index_manager.busy and hasattr(st, "fragment"):
+            # Re-runs only the progress panel until the plan finishes
+            st.fragment(run_every=INDEX_BUILD_POLL_INTERVAL)(_render_index_progress)()
+        else:
+            _render_index_progress()
+    
+    if st.sidebar.button("Verify Index Coverage", use_container_width=True):
+        with st.spinner("Explaining analytics pipelines..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.analytics import (
+                        SOURCE_ORDERS, MONGO_SOURCES, OPTIMIZED_ROUTES_QUERY,
+                        fetch_routes, route_pairs_from_frame
+                    )
+                    from src.core.profiling import verify_index_coverage
+                    
+                    source = SOURCE_LABELS[st.session_state.get('analytics_source_label', "Raw orders")]
+                    df_routes, _ = fetch_routes(driver, OPTIMIZED_ROUTES_QUERY)
+                    st.session_state['index_coverage'] = verify_index_coverage(
+                        mongo_db["orders"],
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.max.time()),
+                        route_pairs_from_frame(df_routes),
+                        source if source in MONGO_SOURCES else SOURCE_ORDERS
+                    )
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    coverage = st.session_state.get('index_coverage')
+    if coverage:
+        import pandas as pd
+        
+        covered = sum(row["covered"] for row in coverage.values())
+        st.sidebar.caption(f"{covered} of {len(coverage)} analytics pipelines run index-only")
+        st.sidebar.dataframe(
+            pd.DataFrame([
+                {"Pipeline": name, "Covered": row["covered"],
+                 "Docs examined": row.get("docs_examined"), "Keys examined": row.get("keys_examined")}
+                for name, row in coverage.items()
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    # Rollup Section
+    st.sidebar.subheader("Daily Route Rollup")
+    st.sidebar.selectbox(
+        "Optimized Scenario Source:",
+        list(SOURCE_LABELS.keys()),
+        key="analytics_source_label",
+        help="Answer total, daily trend and route sales from the daily_route_sales rollup, "
+             "the orders_ts time-series copy or the local columnar snapshot / "
+             "memory-mapped index"
+    )
+    
+    if st.sidebar.button("Refresh Rollup", use_container_width=True):
+        with st.spinner("Refreshing daily_route_sales..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.analytics import SOURCE_ROLLUP
+                    from src.core.rollup import refresh_daily_route_rollup
+                    count = refresh_daily_route_rollup(
+                        mongo_db,
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.max.time())
+                    )
+                    query_cache.invalidate()
+                    daily_trend_store.invalidate(SOURCE_ROLLUP)
+                    st.sidebar.success(f"Rollup refreshed: {count:,} documents")
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    if st.sidebar.button("Refresh Period Rollups", use_container_width=True,
+                         help=f"Rebuild the hourly, daily, weekly and monthly sales levels "
+                              f"({SALES_TIMEZONE}) touching the selected dates"):
+        with st.spinner("Refreshing sales_by_period..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.periods import refresh_period_rollups
+                    counts = refresh_period_rollups(
+                        mongo_db,
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.max.time())
+                    )
+                    query_cache.invalidate()
+                    st.sidebar.success(
+                        "Period rollups refreshed: " +
+                        ", ".join(f"{count:,} {level}s" for level, count in counts.items())
+                    )
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    if st.sidebar.button("Refresh Time-Series Copy", use_container_width=True):
+        with st.spinner("Refreshing orders_ts..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.analytics import SOURCE_TIMESERIES
+                    from src.core.timeseries import refresh_orders_timeseries
+                    count = refresh_orders_timeseries(
+                        mongo_db,
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.max.time())
+                    )
+                    query_cache.invalidate()
+                    daily_trend_store.invalidate(SOURCE_TIMESERIES)
+                    st.sidebar.success(f"Time-series copy refreshed: {count:,} measurements")
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    if st.sidebar.button("Export Snapshot", use_container_width=True):
+        with st.spinner("Exporting orders to the local snapshot..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.analytics import SOURCE_SNAPSHOT
+                    from src.core.snapshot import export_orders_snapshot
+                    metadata = export_orders_snapshot(mongo_db["orders"])
+                    query_cache.invalidate()
+                    daily_trend_store.invalidate(SOURCE_SNAPSHOT)
+                    st.sidebar.success(f"Snapshot exported: {metadata['rows']:,} orders")
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    if st.sidebar.button("Build Memory-Mapped Index", use_container_width=True):
+        with st.spinner("Building the memory-mapped order arrays..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.analytics import SOURCE_MMAP
+                    from src.core.mmap_index import build_mmap_index
+                    metadata = build_mmap_index(mongo_db["orders"])
+                    query_cache.invalidate()
+                    daily_trend_store.invalidate(SOURCE_MMAP)
+                    st.sidebar.success(f"Index built: {metadata['rows']:,} orders")
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    if st.sidebar.button("Sync Sales to Graph", use_container_width=True,
+                         help="Write monthly sales of the selected months onto CONNECTED_TO"):
+        with st.spinner("Writing monthly route sales to Neo4j..."):
+            driver, mongo_client, mongo_db = get_shared_connections()
+            if driver and mongo_client:
+                try:
+                    from src.core.graph_sales import sync_route_sales_to_graph
+                    stats = sync_route_sales_to_graph(
+                        mongo_db,
+                        driver,
+                        datetime.combine(start_date, datetime.min.time()),
+                        datetime.combine(end_date, datetime.max.time())
+                    )
+                    query_cache.invalidate()
+                    st.sidebar.success(
+                        f"Graph sales synced: {stats['updated']:,} relationships "
+                        f"over {len(stats['months'])} months"
+                    )
+                except Exception as e:
+                    st.sidebar.error(f"Error: {e}")
+    
+    # Query Cache Section
+    st.sidebar.subheader("Query Cache")
+    st.sidebar.checkbox(
+        "Use query cache", value=True, key="use_query_cache",
+        help="Serve repeated scenario runs for the same period from the shared result cache"
+    )
+    if st.sidebar.button("Clear Cache", use_container_width=True):
+        query_cache.invalidate()
+        st.sidebar.success("Query cache cleared!")
+    
+    # Daily Trend Store Section
+    st.sidebar.subheader("Daily Trend Store")
+    st.sidebar.checkbox(
+        "Reuse fetched days", value=True, key="use_daily_store",
+        help="Fetch only the days of the daily trend that were not queried before; "
+             "recent days are always re-fetched"
+    )
+    store_stats = daily_trend_store.get_stats()
+    if store_stats['days_served']:
+        st.sidebar.caption(
+            f"{store_stats['days_stored']:,} days stored, "
+            f"{store_stats['days_fetched']:,} of {store_stats['days_served']:,} requested days fetched"
+        )
+    if st.sidebar.button("Clear Daily Store", use_container_width=True):
+        daily_trend_store.invalidate()
+        st.sidebar.success("Daily trend store cleared!")
+    
+    # Route Catalog Section
+    st.sidebar.subheader("Route Catalog")
+    st.sidebar.checkbox(
+        "Use in-process route catalog", value=True, key="use_route_catalog",
+        help="Answer route selection from a cached copy of all CONNECTED_TO edges "
+             "instead of querying Neo4j on every run"
+    )
+    catalog_status = route_catalog.get_status()
+    if catalog_status['age_seconds'] is not None:
+        st.sidebar.caption(
+            f"{catalog_status['routes']:,} routes loaded "
+            f"{catalog_status['age_seconds'] / 60:.0f} min ago"
+        )
+    
+    # Query Plans Section
+    st.sidebar.subheader("Query Plans")
+    st.sidebar.checkbox(
+        "Capture query plans", value=False, key="capture_query_plans",
+        help="Record MongoDB explain and Neo4j PROFILE output for each scenario query "
+             "to check whether the indexes are used"
+    )
+    
+    # Display Section
+    st.sidebar.subheader("Display")
+    st.sidebar.checkbox(
+        "Render only the active view", value=True, key="render_active_view_only",
+        help="Compute and draw just the selected view on each rerun instead of all five tabs"
+    )
+    st.sidebar.number_input(
+        "Max chart points per trace", min_value=100, max_value=20000,
+        value=CHART_MAX_POINTS, step=100, key="chart_max_points",
+        help="About one point per horizontal pixel of the chart; longer series are downsampled"
+    )
+    st.sidebar.selectbox(
+        "Downsampling", list(DOWNSAMPLE_LABELS.keys()), key="downsample_label",
+        help="Both methods keep the peaks and troughs of the series"
+    )
+    render_timings = st.session_state.get('render_timings')
+    if render_timings:
+        import pandas as pd
+        
+        last = render_timings[-1]
+        st.sidebar.caption(
+            f"Last rerun: first paint {last['first_paint_ms']:.0f} ms, "
+            f"total {last['rerun_ms']:.0f} ms ({last['mode']})"
+        )
+        with st.sidebar.expander("Render Timing"):
+            st.dataframe(
+                pd.DataFrame(render_timings).groupby("mode")[["first_paint_ms", "rerun_ms"]]
+                .median().round(1),
+                use_container_width=True
+            )
+            st.caption(f"Median over the last {len(render_timings)} reruns")
+    
+    # Tracing Section
+    last_trace = st.session_state.get('last_rerun_trace')
+    if last_trace:
+        st.sidebar.subheader("Tracing")
+        st.sidebar.caption(f"Last rerun: {last_trace['duration_ns'] / 1e9:.3f}s")
+        st.sidebar.download_button(
+            "Download Last Rerun Trace",
+            json.dumps(to_chrome_trace(last_trace)),
+            file_name="dashboard_rerun_trace.json",
+            mime="application/json",
+            use_container_width=True,
+            help="Chrome trace-event format; open in chrome://tracing or Perfetto"
+        )
+    
+    # Connection Pool Section
+    with st.sidebar.expander("Connection Pool"):
+        pool_metrics = get_connection_manager().get_metrics()
+        st.metric("Connection Reuse", f"{pool_metrics['reuse_ratio'] * 100:.0f}%",
+                  help=f"{pool_metrics['reuses']} of {pool_metrics['acquisitions']} requests reused the shared clients")
+        st.metric("Avg Acquire Time", f"{pool_metrics['avg_acquire_time'] * 1000:.1f} ms")
+        st.metric("Avg MongoDB Pool Wait", f"{pool_metrics['mongo_avg_pool_wait'] * 1000:.2f} ms")
+        st.metric("Max MongoDB Pool Wait", f"{pool_metrics['mongo_max_pool_wait'] * 1000:.2f} ms")
     
     return start_date, end_date, period_days
 
 
+def _store_results(slot, results, total_time):
+    """Keep a scenario's results in the session under a new version"""
+    st.session_state[f'results{slot}'] = results
+    st.session_state[f'total_time{slot}'] = total_time
+    st.session_state[f'results{slot}_version'] = time.time_ns()
+
+
+def _results_version(*slots):
+    """Version tuple of the stored results of the given scenarios"""
+    return tuple(st.session_state.get(f'results{slot}_version') for slot in slots)
+
+
+def _cached_view(name, version, build):
+    """
+    Return a figure or table built for the given version
+    
+    One object is kept per name in the session, so reruns that leave the
+    results and view settings unchanged reuse it instead of rebuilding.
+    
+    Args:
+        name: View element name
+        version: Hashable version, e.g. results version plus view settings
+        build: Function building the element
+    """
+    cache = st.session_state.setdefault('view_cache', {})
+    cached = cache.get(name)
+    if cached is None or cached[0] != version:
+        cached = (version, build())
+        cache[name] = cached
+    return cached[1]
+
+
+def _run_scenario(scenario_func, orders_collection, driver, start_datetime, end_datetime,
+                  **options):
+    """
+    Run a scenario, through the shared query cache when enabled
+    
+    Returns:
+        tuple: (copy of the results dict, True if served from cache)
+    """
+    from src.core.analytics import run_cached
+    from src.core.route_catalog import route_catalog
+    
+    if st.session_state.get('use_route_catalog', True):
+        options['route_catalog'] = route_catalog
+    if st.session_state.get('capture_query_plans', False):
+        options['instrument'] = True
+    
+    if st.session_state.get('use_query_cache', True):
+        results, cache_hit = run_cached(
+            scenario_func, (orders_collection, driver), start_datetime, end_datetime,
+            **options
+        )
+    else:
+        results = scenario_func(orders_collection, driver, start_datetime, end_datetime, **options)
+        cache_hit = False
+    # Cached results are shared between sessions, so never annotate them in place
+    return dict(results), cache_hit
+
+
+def _run_async_scenario(start_datetime, end_datetime, **options):
+    """
+    Run the async optimized scenario on the shared event loop, through the
+    query cache when enabled
+    
+    Returns:
+        tuple: (copy of the results dict, True if served from cache)
+    """
+    from src.core.analytics import run_cached
+    from src.core.async_analytics import run_scenario_async
+    
+    if st.session_state.get('use_query_cache', True):
+        results, cache_hit = run_cached(
+            run_scenario_async, (), start_datetime, end_datetime, **options
+        )
+    else:
+        results = run_scenario_async(start_datetime, end_datetime, **options)
+        cache_hit = False
+    return dict(results), cache_hit
+
+
+def _render_load_stats(results):
+    """Show rows, memory and build time of the DataFrames loaded from the databases"""
+    load_stats = results.get('load_stats')
+    if not load_stats:
+        return
+    import pandas as pd
+    
+    with st.expander("Result Loading"):
+        st.dataframe(
+            pd.DataFrame([
+                {"result": name, **stats} for name, stats in load_stats.items()
+            ]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "bytes": st.column_config.NumberColumn("Bytes", format="%d"),
+                "build_time": st.column_config.NumberColumn("Build Time (s)", format="%.4f")
+            }
+        )
+
+
+def _render_trace(results, key):
+    """Show the span tree of a scenario run with a Chrome trace download"""
+    trace = results.get('trace')
+    if trace is None:
+        return
+    trace = trace.to_dict()
+    import pandas as pd
+    
+    with st.expander("Trace"):
+        df_spans = pd.DataFrame(flatten_trace(trace))
+        df_spans['name'] = ["  " * depth + name
+                            for depth, name in zip(df_spans['depth'], df_spans['name'])]
+        st.dataframe(
+            df_spans[['name', 'start_ms', 'duration_ms']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "start_ms": st.column_config.NumberColumn("Start (ms)", format="%.2f"),
+                "duration_ms": st.column_config.NumberColumn("Duration (ms)", format="%.2f")
+            }
+        )
+        st.download_button(
+            "Download Trace",
+            json.dumps(to_chrome_trace(trace)),
+            file_name=f"{key}_trace.json",
+            mime="application/json",
+            key=f"{key}_trace_download"
+        )
+
+
+def _render_query_plans(results):
+    """Show the captured MongoDB explain and Neo4j PROFILE summaries per query"""
+    query_plans = results.get('query_plans')
+    if not query_plans:
+        return
+    import pandas as pd
+    
+    with st.expander("Query Plans"):
+        for name, plan in query_plans.items():
+            st.markdown(f"**{name}** ({plan['engine']})")
+            if 'error' in plan:
+                st.warning(plan['error'])
+            elif plan['engine'] == "mongodb":
+                plan_col1, plan_col2, plan_col3 = st.columns(3)
+                with plan_col1:
+                    st.metric("Indexes Used", ", ".join(plan['indexes_used']) or "none (COLLSCAN)")
+                with plan_col2:
+                    st.metric("Keys Examined", f"{plan['keys_examined']:,}")
+                with plan_col3:
+                    st.metric("Docs Examined", f"{plan['docs_examined']:,}")
+                st.caption(f"Winning plan: {plan['winning_plan']}")
+                if plan['stage_timings']:
+                    st.dataframe(pd.DataFrame(plan['stage_timings']),
+                                 use_container_width=True, hide_index=True)
+            else:
+                plan_col1, plan_col2, plan_col3 = st.columns(3)
+                with plan_col1:
+                    st.metric("Index Operators", ", ".join(plan['index_operators']) or "none")
+                with plan_col2:
+                    st.metric("DB Hits", f"{plan['db_hits']:,}")
+                with plan_col3:
+                    st.metric("Rows", f"{plan['rows']:,}")
+                st.dataframe(pd.DataFrame(plan['operators']),
+                             use_container_width=True, hide_index=True)
+
+
+def _render_statistical_benchmark(start_datetime, end_datetime):
+    """Run each strategy repeatedly and show medians, tails and confidence intervals"""
+    import pandas as pd
+    from src.core.database import get_shared_connections
+    from src.core.benchmark import STRATEGIES, STAGE_KEYS, PHASE_COLD, PHASE_WARM, run_comparison
+    
+    st.subheader("Statistical Benchmark")
+    st.caption("Runs every strategy N times in alternating order. The cold phase clears the "
+               "query, plan and Cypher caches before each run; the warm phase measures after "
+               "discarded warm-up runs.")
+    
+    bench_col1, bench_col2, bench_col3 = st.columns(3)
+    with bench_col1:
+        strategies = st.multiselect(
+            "Strategies (first is the baseline)", list(STRATEGIES),
+            default=["without_optimization", "with_optimization"], key="bench_strategies"
+        )
+        repeats = st.number_input("Runs per strategy", min_value=2, max_value=200,
+                                  value=10, key="bench_repeats")
+    with bench_col2:
+        phases = st.multiselect("Phases", [PHASE_COLD, PHASE_WARM],
+                                default=[PHASE_COLD, PHASE_WARM], key="bench_phases")
+        warmup = st.number_input("Warm-up runs", min_value=0, max_value=20,
+                                 value=2, key="bench_warmup")
+    with bench_col3:
+        index_label = st.radio("Index state", list(INDEX_STATE_LABELS), key="bench_index_state")
+        profile_label = st.selectbox(
+            "Index profile", list(INDEX_PROFILE_LABELS),
+            index=list(INDEX_PROFILE_LABELS.values()).index(MONGO_INDEX_PROFILE),
+            key="bench_index_profile", help="Profile built by \"Create indexes first\""
+        )
+    
+    if st.button("Run Benchmark", key="run_benchmark", disabled=not strategies or not phases):
+        driver, mongo_client, mongo_db = get_shared_connections()
+        if not driver or not mongo_client:
+            st.error("Failed to connect to databases!")
+            return
+        progress_bar = st.progress(0.0, text="Benchmarking...")
+        try:
+            st.session_state['benchmark_report'] = run_comparison(
+                mongo_db, driver, start_datetime, end_datetime, strategies,
+                repeats=int(repeats), warmup=int(warmup), phases=phases,
+                index_state=INDEX_STATE_LABELS[index_label],
+                index_profile=INDEX_PROFILE_LABELS[profile_label],
+                progress=lambda done, total: progress_bar.progress(
+                    done / total, text=f"Run {done} of {total}"
+                )
+            )
+        except RuntimeError as e:
+            st.error(f"Benchmark failed: {e}")
+        progress_bar.empty()
+    
+    report = st.session_state.get('benchmark_report')
+    if not report:
+        return
+    
+    baseline = report['parameters']['baseline']
+    summary_rows, sample_rows = [], []
+    for phase, strategies_report in report['phases'].items():
+        for name, result in strategies_report.items():
+            for key in STAGE_KEYS + ["wall_time"]:
+                stats = result['summary'][key]
+                summary_rows.append({
+                    "phase": phase, "strategy": name, "stage": key,
+                    "median": stats['median'], "p95": stats['p95'],
+                    "ci_low": stats['median_ci_low'], "ci_high": stats['median_ci_high']
+                })
+                sample_rows.extend({"phase": phase, "strategy": name, "stage": key,
+                                    "seconds": value} for value in result['samples'][key])
+    
+    speedup_cols = st.columns(max(len(report['phases']), 1))
+    for col, (phase, strategies_report) in zip(speedup_cols, report['phases'].items()):
+        with col:
+            for name, result in strategies_report.items():
+                if name == baseline:
+                    continue
+                speedup = result['speedup']
+                st.metric(
+                    f"Speedup vs {baseline} ({phase}): {name}",
+                    f"{speedup['speedup']:.2f}x",
+                    help=f"95% CI {speedup['ci_low']:.2f}x - {speedup['ci_high']:.2f}x"
+                )
+    
+    st.dataframe(
+        pd.DataFrame(summary_rows),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            column: st.column_config.NumberColumn(column, format="%.4f")
+            for column in ["median", "p95", "ci_low", "ci_high"]
+        }
+    )
+    
+    fig_box = charts.timing_box_figure(
+        pd.DataFrame(sample_rows),
+        f"Timing Distributions ({report['parameters']['repeats']} runs per strategy, "
+        f"index state: {report['parameters']['index_state']}"
+        + (f", {report['parameters']['index_profile']} profile)"
+           if report['parameters'].get('index_profile') else ")")
+    )
+    st.plotly_chart(fig_box, use_container_width=True)
+    
+    st.download_button(
+        "Download Benchmark Report",
+        json.dumps(report, indent=2),
+        file_name="benchmark_report.json",
+        mime="application/json",
+        key="benchmark_report_download"
+    )
+
+
+@traced("dashboard.tab_scenario_1")
 def render_tab_scenario_1(start_datetime, end_datetime):
     """Render tab for scenario without optimization"""
+    from src.core.analytics import run_scenario_without_optimization
+    from src.core.database import get_shared_connections
+    
     st.header("Scenario 1: Without Indexing & Optimization")
     
     if st.button("Run Scenario 1", key="scenario1"):
         with st.spinner("Running analysis without optimization..."):
             total_start = time.time()
             
-            driver, mongo_client, mongo_db = init_connections()
+            driver, mongo_client, mongo_db = get_shared_connections()
             if not driver or not mongo_client:
                 st.error("Failed to connect to databases!")
                 return
             
-            try:
-                orders_collection = mongo_db["orders"]
-                results1 = run_scenario_without_optimization(
-                    orders_collection, driver, start_datetime, end_datetime
-                )
-                total_time1 = time.time() - total_start
-                
-                st.session_state['results1'] = results1
-                st.session_state['total_time1'] = total_time1
-                
-            finally:
-                if driver:
-                    driver.close()
-                if mongo_client:
-                    mongo_client.close()
+            orders_collection = mongo_db["orders"]
+            results1, cache_hit = _run_scenario(
+                run_scenario_without_optimization,
+                orders_collection, driver, start_datetime, end_datetime
+            )
+            total_time1 = time.time() - total_start
+            results1['cache_hit'] = cache_hit
+            
+            _store_results(1, results1, total_time1)
     
     # Display results if available
     if 'results1' in st.session_state:
         results = st.session_state['results1']
         total_time = st.session_state['total_time1']
         
+        if results.get('cache_hit'):
+            st.info("Served from the query cache; stage timings are from the original run.")
+        
         # Metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -172,6 +813,18 @@ def render_tab_scenario_1(start_datetime, end_datetime):
         with perf_col4:
             st.metric("MongoDB Routes (Individual)", f"{results['mongo_routes_time']:.4f}s")
         
+        path_col1, path_col2 = st.columns(2)
+        with path_col1:
+            st.metric("Critical Path", f"{results.get('critical_path_time', 0):.4f}s",
+                      help="Wall-clock time of all query stages")
+        with path_col2:
+            st.metric("Summed Stage Time", f"{results.get('summed_stage_time', 0):.4f}s",
+                      help="Sum of the individual stage times")
+        
+        _render_load_stats(results)
+        _render_query_plans(results)
+        _render_trace(results, "scenario1")
+        
         # Top routes
         st.subheader("Top 10 Best-Selling Routes")
         top_routes = results['df_sorted'][results['df_sorted']['total_sales'] > 0].head(10)
@@ -188,40 +841,99 @@ def render_tab_scenario_1(start_datetime, end_datetime):
             )
 
 
+@traced("dashboard.tab_scenario_2")
 def render_tab_scenario_2(start_datetime, end_datetime):
     """Render tab for scenario with optimization"""
+    from src.core.analytics import (
+        run_scenario_with_optimization,
+        MONGO_SOURCES,
+        ROUTE_RANKING_DISTANCE,
+        ROUTE_RANKING_SALES,
+        ROUTE_RANKING_GRAPH
+    )
+    from src.core.daily_store import daily_trend_store
+    from src.core.database import get_shared_connections
+    
     st.header("Scenario 2: With Indexing & Optimization")
     
+    st.checkbox(
+        "Run independent stages concurrently",
+        key="concurrent_stages",
+        help="Total sales, daily trend and the Neo4j route read run in parallel; "
+             "only the route sales batch waits for Neo4j"
+    )
+    st.selectbox(
+        "Route ranking",
+        list(ROUTE_RANKING_LABELS.keys()),
+        key="route_ranking_label",
+        help="Report the sales of the longest graph routes, rank every route by "
+             "revenue in MongoDB and look up only the top routes in Neo4j, page "
+             "through every graph route with chunked concurrent sales batches, or rank "
+             "long routes by the monthly sales synced onto the graph"
+    )
+    st.checkbox(
+        "Use async drivers",
+        key="use_async_drivers",
+        help="Issue all queries together from one background event loop with the async "
+             "MongoDB and Neo4j drivers (MongoDB sources and longest-route ranking only)"
+    )
+    
     if st.button("Run Scenario 2", key="scenario2"):
         with st.spinner("Running analysis with optimization..."):
             total_start = time.time()
             
-            driver, mongo_client, mongo_db = init_connections()
-            if not driver or not mongo_client:
-                st.error("Failed to connect to databases!")
-                return
+            source = SOURCE_LABELS[
+                st.session_state.get('analytics_source_label', "Raw orders")
+            ]
+            route_ranking = ROUTE_RANKING_LABELS[
+                st.session_state.get('route_ranking_label', "Longest routes (Neo4j first)")
+            ]
+            use_async = (st.session_state.get('use_async_drivers', False) and
+                         source in MONGO_SOURCES and
+                         route_ranking == ROUTE_RANKING_DISTANCE)
+            if st.session_state.get('use_async_drivers', False) and not use_async:
+                st.info("The async drivers cover MongoDB sources with longest-route ranking; "
+                        "running synchronously.")
             
-            try:
+            if use_async:
+                try:
+                    results2, cache_hit = _run_async_scenario(
+                        start_datetime, end_datetime, source=source
+                    )
+                except Exception as e:
+                    st.error(f"Async scenario failed: {e}")
+                    return
+            else:
+                driver, mongo_client, mongo_db = get_shared_connections()
+                if not driver or not mongo_client:
+                    st.error("Failed to connect to databases!")
+                    return
+                
                 orders_collection = mongo_db["orders"]
-                results2 = run_scenario_with_optimization(
-                    orders_collection, driver, start_datetime, end_datetime
+                options = {}
+                if st.session_state.get('use_daily_store', True):
+                    options['daily_store'] = daily_trend_store
+                results2, cache_hit = _run_scenario(
+                    run_scenario_with_optimization,
+                    orders_collection, driver, start_datetime, end_datetime,
+                    source=source,
+                    concurrent=st.session_state.get('concurrent_stages', False),
+                    route_ranking=route_ranking,
+                    **options
                 )
-                total_time2 = time.time() - total_start
-                
-                st.session_state['results2'] = results2
-                st.session_state['total_time2'] = total_time2
-                
-            finally:
-                if driver:
-                    driver.close()
-                if mongo_client:
-                    mongo_client.close()
+            total_time2 = time.time() - total_start
+            results2['cache_hit'] = cache_hit
+            
+            _store_results(2, results2, total_time2)
     
     # Display results if available
     if 'results2' in st.session_state:
         results = st.session_state['results2']
         total_time = st.session_state['total_time2']
         
+        if results.get('cache_hit'):
+            st.info("Served from the query cache; stage timings are from the original run.")
+        
         # Metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -247,8 +959,33 @@ def render_tab_scenario_2(start_datetime, end_datetime):
         with perf_col4:
             st.metric("MongoDB Routes (Batch)", f"{results['mongo_routes_time']:.4f}s")
         
+        path_col1, path_col2 = st.columns(2)
+        with path_col1:
+            st.metric("Critical Path", f"{results.get('critical_path_time', 0):.4f}s",
+                      help="Wall-clock time of all query stages")
+        with path_col2:
+            st.metric("Summed Stage Time", f"{results.get('summed_stage_time', 0):.4f}s",
+                      help="Sum of the individual stage times")
+        
+        route_stream = results.get('route_stream')
+        if route_stream:
+            st.caption(
+                f"Streamed {route_stream['routes']:,} routes in {route_stream['chunks']:,} "
+                f"chunks, at most {route_stream['max_in_flight']} sales batches in flight."
+            )
+        
+        _render_load_stats(results)
+        _render_query_plans(results)
+        _render_trace(results, "scenario2")
+        
         # Top routes
         st.subheader("Top 10 Best-Selling Routes")
+        if results.get('route_ranking') == ROUTE_RANKING_SALES:
+            st.caption("Ranked across all routes by revenue; distance is blank for "
+                       "routes with no edge in the graph.")
+        elif results.get('route_ranking') == ROUTE_RANKING_GRAPH:
+            st.caption("Sales read from the CONNECTED_TO relationships for whole months, "
+                       "as of the last graph sales sync.")
         top_routes = results['df_sorted'][results['df_sorted']['total_sales'] > 0].head(10)
         if not top_routes.empty:
             st.dataframe(
@@ -263,8 +1000,11 @@ def render_tab_scenario_2(start_datetime, end_datetime):
             )
 
 
-def render_tab_performance_comparison():
+@traced("dashboard.tab_performance_comparison")
+def render_tab_performance_comparison(start_datetime, end_datetime):
     """Render tab for performance comparison between scenarios"""
+    import pandas as pd
+    
     st.header("Database Performance Comparison")
     
     if 'results1' in st.session_state and 'results2' in st.session_state:
@@ -339,33 +1079,14 @@ def render_tab_performance_comparison():
             }
         )
         
+        _render_query_cache_stats()
+        
         # Performance visualization
         st.subheader("Performance Comparison Chart")
         
-        fig_perf = go.Figure()
-        
-        fig_perf.add_trace(go.Bar(
-            name='Without Optimization',
-            x=df_perf["Query Type"][:-1],
-            y=df_perf["Without Optimization (s)"][:-1],
-            marker_color='#ff6b6b'
-        ))
-        
-        fig_perf.add_trace(go.Bar(
-            name='With Optimization',
-            x=df_perf["Query Type"][:-1],
-            y=df_perf["With Optimization (s)"][:-1],
-            marker_color='#51cf66'
-        ))
-        
-        fig_perf.update_layout(
-            title="Performance Comparison by Query Type",
-            xaxis_title="Query Type",
-            yaxis_title="Execution Time (seconds)",
-            barmode='group',
-            height=400
+        fig_perf = _cached_view(
+            "performance", _results_version(1, 2), lambda: charts.performance_figure(df_perf)
         )
-        
         st.plotly_chart(fig_perf, use_container_width=True)
         
         # Performance insights
@@ -387,21 +1108,61 @@ def render_tab_performance_comparison():
         """
         
         st.info(insight_text)
-        
+    
     else:
         st.warning("Run both scenarios first to see performance comparison!")
+        _render_query_cache_stats()
+    
+    st.markdown("---")
+    _render_statistical_benchmark(start_datetime, end_datetime)
 
 
+def _render_query_cache_stats():
+    """Show query cache effectiveness once the cache holds any results"""
+    from src.core.cache import query_cache
+    
+    cache_stats = query_cache.get_stats()
+    if not cache_stats['size']:
+        return
+    st.subheader("Query Cache")
+    cache_col1, cache_col2, cache_col3, cache_col4 = st.columns(4)
+    with cache_col1:
+        st.metric("Cache Hits", f"{cache_stats['hits']:,}")
+    with cache_col2:
+        st.metric("Cache Misses", f"{cache_stats['misses']:,}")
+    with cache_col3:
+        st.metric("Coalesced Requests", f"{cache_stats['coalesced']:,}")
+    with cache_col4:
+        st.metric("Hit Ratio", f"{cache_stats['hit_ratio'] * 100:.1f}%")
+
+
+@traced("dashboard.tab_business_insights")
 def render_tab_business_insights(period_days, start_date, end_date):
     """Render tab for business insights and analytics"""
+    import pandas as pd
+    from src.core.analytics import generate_insights
+    from src.core.insight_stats import (
+        EFFICIENCY_KM_COLUMNS,
+        EFFICIENCY_HOUR_COLUMNS,
+        summarize_results
+    )
+    
     st.header("Business Insights & Advanced Analytics")
     
     if 'results2' in st.session_state:
         results1 = st.session_state.get('results1', {})
         results2 = st.session_state['results2']
         
+        # One pass over the optimized results feeds the insights and the tables below
+        stats = _cached_view(
+            "insight_stats", _results_version(2), lambda: summarize_results(results2)
+        )
+        
         # Generate insights
-        insights = generate_insights(results1, results2, period_days)
+        insights = _cached_view(
+            "insights", (_results_version(1, 2), period_days),
+            lambda: generate_insights(results1, results2, period_days, stats)
+        )
         
         # Display insights
         for insight in insights:
@@ -421,123 +1182,188 @@ def render_tab_business_insights(period_days, start_date, end_date):
         # Additional analysis
         st.subheader("Route Efficiency Analysis")
         
-        df_sorted = results2['df_sorted']
-        df_daily = results2['df_daily']
-        
-        if not df_sorted.empty and not df_daily.empty:
-            routes_with_sales = df_sorted[df_sorted['total_sales'] > 0].copy()
-            if not routes_with_sales.empty:
-                routes_with_sales['revenue_per_km'] = (
-                    routes_with_sales['total_sales'] / routes_with_sales['distance_km']
+        # Each block depends only on its own statistics
+        efficient_km = stats.revenue_per_km.rows()
+        if efficient_km:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("Most Efficient Routes (Revenue per km)")
+                top_efficient_km = pd.DataFrame(efficient_km, columns=EFFICIENCY_KM_COLUMNS)
+                st.dataframe(
+                    top_efficient_km,
+                    use_container_width=True,
+                    column_config={
+                        "revenue_per_km": st.column_config.NumberColumn("Revenue/km", format="Rp %.0f")
+                    }
                 )
-                routes_with_sales['revenue_per_hour'] = (
-                    routes_with_sales['total_sales'] / routes_with_sales['flight_time_hr']
+            
+            with col2:
+                st.subheader("Most Efficient Routes (Revenue per hour)")
+                top_efficient_hr = pd.DataFrame(
+                    stats.revenue_per_hour.rows(), columns=EFFICIENCY_HOUR_COLUMNS
                 )
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("Most Efficient Routes (Revenue per km)")
-                    top_efficient_km = routes_with_sales.nlargest(5, 'revenue_per_km')[
-                        ['origin', 'destination', 'distance_km', 'total_sales', 'revenue_per_km']
-                    ]
-                    st.dataframe(
-                        top_efficient_km,
-                        use_container_width=True,
-                        column_config={
-                            "revenue_per_km": st.column_config.NumberColumn("Revenue/km", format="Rp %.0f")
-                        }
-                    )
-                
-                with col2:
-                    st.subheader("Most Efficient Routes (Revenue per hour)")
-                    top_efficient_hr = routes_with_sales.nlargest(5, 'revenue_per_hour')[
-                        ['origin', 'destination', 'flight_time_hr', 'total_sales', 'revenue_per_hour']
-                    ]
-                    st.dataframe(
-                        top_efficient_hr,
-                        use_container_width=True,
-                        column_config={
-                            "revenue_per_hour": st.column_config.NumberColumn("Revenue/hour", format="Rp %.0f")
-                        }
-                    )
+                st.dataframe(
+                    top_efficient_hr,
+                    use_container_width=True,
+                    column_config={
+                        "revenue_per_hour": st.column_config.NumberColumn("Revenue/hour", format="Rp %.0f")
+                    }
+                )
+        
+        # Daily sales statistics
+        daily = stats.daily_sales
+        if daily.count > 1:
+            st.subheader("Daily Sales Statistics")
             
-            # Daily sales statistics
-            if len(df_daily) > 1:
-                st.subheader("Daily Sales Statistics")
-                
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Highest Daily Sales", f"Rp {df_daily['daily_sales'].max():,.0f}")
-                with col2:
-                    st.metric("Lowest Daily Sales", f"Rp {df_daily['daily_sales'].min():,.0f}")
-                with col3:
-                    st.metric("Average Daily Sales", f"Rp {df_daily['daily_sales'].mean():,.0f}")
-                with col4:
-                    std_dev = df_daily['daily_sales'].std()
-                    st.metric("Standard Deviation", f"Rp {std_dev:,.0f}")
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Highest Daily Sales", f"Rp {daily.max:,.0f}")
+            with col2:
+                st.metric("Lowest Daily Sales", f"Rp {daily.min:,.0f}")
+            with col3:
+                st.metric("Average Daily Sales", f"Rp {daily.mean:,.0f}")
+            with col4:
+                st.metric("Standard Deviation", f"Rp {daily.std():,.0f}")
     
     else:
         st.warning("Run the optimization scenario first to see business insights!")
 
 
+def _daily_zoom(df_daily, max_points, version):
+    """
+    Offer a date range slider when the daily trend is downsampled
+    
+    The slider selects from the full-resolution series, so zooming in
+    shows more of the original points.
+    
+    Returns:
+        DataFrame: Rows of df_daily within the selected range
+    """
+    if len(df_daily) <= max_points:
+        return df_daily
+    
+    first = df_daily['date'].min().to_pydatetime()
+    last = df_daily['date'].max().to_pydatetime()
+    zoom_start, zoom_end = st.slider(
+        "Zoom", min_value=first, max_value=last, value=(first, last),
+        key=f"daily_zoom_{version}"
+    )
+    return df_daily[(df_daily['date'] >= zoom_start) & (df_daily['date'] <= zoom_end)]
+
+
+def _render_sales_by_period(start_date, end_date):
+    """
+    Sales per hour, day, week or month in the market timezone
+    
+    The rollup source reads the sales_by_period level of the chosen
+    granularity; other MongoDB sources bucket the orders directly.
+    """
+    from src.core.analytics import (
+        get_sales_by_period, run_cached, SOURCE_ORDERS, SOURCE_ROLLUP, MONGO_SOURCES
+    )
+    from src.core.database import get_shared_connections
+    
+    st.subheader(f"Sales by Period ({SALES_TIMEZONE})")
+    label = st.radio("Granularity", list(GRANULARITY_LABELS), index=1, horizontal=True,
+                     key="period_granularity_label")
+    granularity = GRANULARITY_LABELS[label]
+    source = SOURCE_LABELS[st.session_state.get('analytics_source_label', "Raw orders")]
+    if source not in MONGO_SOURCES:
+        source = SOURCE_ORDERS
+    
+    driver, mongo_client, mongo_db = get_shared_connections()
+    if not driver or not mongo_client:
+        st.error("Failed to connect to databases!")
+        return
+    start_datetime = datetime.combine(start_date, datetime.min.time())
+    end_datetime = datetime.combine(end_date, datetime.max.time())
+    options = {"granularity": granularity, "timezone": SALES_TIMEZONE, "source": source}
+    try:
+        if st.session_state.get('use_query_cache', True):
+            (df_period, query_time), cache_hit = run_cached(
+                get_sales_by_period, (mongo_db["orders"],), start_datetime, end_datetime,
+                **options
+            )
+        else:
+            df_period, query_time = get_sales_by_period(
+                mongo_db["orders"], start_datetime, end_datetime, **options
+            )
+            cache_hit = False
+    except Exception as e:
+        st.error(f"Sales by period failed: {e}")
+        return
+    
+    if df_period.empty:
+        st.info("No sales in this range" +
+                (" - refresh the period rollups first." if source == SOURCE_ROLLUP else "."))
+        return
+    
+    fig_period = _cached_view(
+        "sales_by_period", (str(start_date), str(end_date), granularity, source, query_time),
+        lambda: charts.period_sales_figure(df_period, f"{label} Sales ({start_date} - {end_date})")
+    )
+    st.plotly_chart(fig_period, use_container_width=True)
+    st.caption(f"{len(df_period):,} periods from {source} in {query_time:.4f}s"
+               f"{' (cached)' if cache_hit else ''}")
+
+
+@traced("dashboard.tab_data_visualization")
 def render_tab_data_visualization(start_date, end_date):
     """Render tab for data visualization and charts"""
+    import pandas as pd
+    from src.core.downsample import downsample
+    
     st.header("Data Visualization & Dashboard")
     
     if 'results2' in st.session_state:
         results = st.session_state['results2']
         df_daily = results['df_daily']
         df_sorted = results['df_sorted']
+        version = _results_version(2)
         
         # Daily sales trend
         if not df_daily.empty:
             st.subheader("Daily Sales Trend")
             
-            fig_daily = px.line(
-                df_daily,
-                x='date',
-                y='daily_sales',
-                title=f"Daily Sales Trend ({start_date} - {end_date})",
-                labels={'daily_sales': 'Daily Sales (Rp)', 'date': 'Date'}
-            )
-            fig_daily.update_traces(line_color='#1f77b4', line_width=3)
-            fig_daily.update_layout(height=400)
-            st.plotly_chart(fig_daily, use_container_width=True)
-            
-            # Orders vs Sales comparison
-            fig_orders = make_subplots(
-                rows=1, cols=2,
-                subplot_titles=('Daily Sales', 'Daily Orders'),
-                specs=[[{"secondary_y": False}, {"secondary_y": False}]]
-            )
+            max_points = int(st.session_state.get('chart_max_points', CHART_MAX_POINTS))
+            method = DOWNSAMPLE_LABELS[
+                st.session_state.get('downsample_label', "Largest-Triangle-Three-Buckets")
+            ]
+            df_view = _daily_zoom(df_daily, max_points, version[0])
             
-            fig_orders.add_trace(
-                go.Scatter(
-                    x=df_daily['date'],
-                    y=df_daily['daily_sales'],
-                    mode='lines+markers',
-                    name='Sales',
-                    line=dict(color='#1f77b4')
-                ),
-                row=1, col=1
-            )
+            def build_daily_figures():
+                # Each trace keeps the peaks and troughs of its own values
+                df_sales, sales_points = downsample(
+                    df_view, 'date', 'daily_sales', max_points, method
+                )
+                df_orders, _ = downsample(df_view, 'date', 'daily_orders', max_points, method)
+                return (
+                    charts.daily_trend_figure(
+                        df_sales, f"Daily Sales Trend ({start_date} - {end_date})"
+                    ),
+                    charts.sales_orders_figure(df_sales, df_orders),
+                    sales_points
+                )
             
-            fig_orders.add_trace(
-                go.Scatter(
-                    x=df_daily['date'],
-                    y=df_daily['daily_orders'],
-                    mode='lines+markers',
-                    name='Orders',
-                    line=dict(color='#ff7f0e')
-                ),
-                row=1, col=2
+            view_version = (version, str(start_date), str(end_date), max_points, method,
+                            df_view['date'].min(), df_view['date'].max())
+            fig_daily, fig_orders, points = _cached_view(
+                "daily_trend", view_version, build_daily_figures
             )
+            st.plotly_chart(fig_daily, use_container_width=True)
+            if points['points_sent'] < points['points_available']:
+                st.caption(
+                    f"Showing {points['points_sent']:,} of {points['points_available']:,} "
+                    f"points per trace ({method}); zoom in for full resolution."
+                )
             
-            fig_orders.update_layout(height=400, title_text="Daily Sales vs Orders")
+            # Orders vs Sales comparison
             st.plotly_chart(fig_orders, use_container_width=True)
         
+        _render_sales_by_period(start_date, end_date)
+        
         # Route analysis visualizations
         if not df_sorted.empty:
             routes_with_sales = df_sorted[df_sorted['total_sales'] > 0]
@@ -546,38 +1372,17 @@ def render_tab_data_visualization(start_date, end_date):
                 st.subheader("Route Analysis Visualizations")
                 
                 # Top routes bar chart
-                top_10_routes = routes_with_sales.head(10)
-                top_10_routes_copy = top_10_routes.copy()
-                top_10_routes_copy['route'] = (
-                    top_10_routes_copy['origin'] + ' to ' + top_10_routes_copy['destination']
-                )
-                
-                fig_routes = px.bar(
-                    top_10_routes_copy,
-                    x='total_sales',
-                    y='route',
-                    orientation='h',
-                    title="Top 10 Routes by Sales Revenue",
-                    labels={'total_sales': 'Sales Revenue (Rp)', 'route': 'Route'}
+                fig_routes = _cached_view(
+                    "top_routes", version,
+                    lambda: charts.top_routes_figure(routes_with_sales.head(10))
                 )
-                fig_routes.update_layout(height=500)
                 st.plotly_chart(fig_routes, use_container_width=True)
                 
                 # Distance vs Sales scatter plot
-                fig_scatter = px.scatter(
-                    routes_with_sales,
-                    x='distance_km',
-                    y='total_sales',
-                    size='total_orders',
-                    hover_data=['origin', 'destination', 'flight_time_hr'],
-                    title="Route Distance vs Sales Revenue",
-                    labels={
-                        'distance_km': 'Distance (km)',
-                        'total_sales': 'Sales Revenue (Rp)',
-                        'total_orders': 'Number of Orders'
-                    }
+                fig_scatter = _cached_view(
+                    "distance_sales", version,
+                    lambda: charts.distance_sales_figure(routes_with_sales)
                 )
-                fig_scatter.update_layout(height=500)
                 st.plotly_chart(fig_scatter, use_container_width=True)
                 
                 # Sales distribution
@@ -586,36 +1391,38 @@ def render_tab_data_visualization(start_date, end_date):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig_hist = px.histogram(
-                        routes_with_sales,
-                        x='total_sales',
-                        nbins=20,
-                        title="Sales Revenue Distribution",
-                        labels={'total_sales': 'Sales Revenue (Rp)'}
+                    fig_hist = _cached_view(
+                        "sales_histogram", version,
+                        lambda: charts.histogram_figure(
+                            routes_with_sales, 'total_sales',
+                            "Sales Revenue Distribution", 'Sales Revenue (Rp)'
+                        )
                     )
                     st.plotly_chart(fig_hist, use_container_width=True)
                 
                 with col2:
-                    fig_dist = px.histogram(
-                        routes_with_sales,
-                        x='distance_km',
-                        nbins=20,
-                        title="Route Distance Distribution",
-                        labels={'distance_km': 'Distance (km)'}
+                    fig_dist = _cached_view(
+                        "distance_histogram", version,
+                        lambda: charts.histogram_figure(
+                            routes_with_sales, 'distance_km',
+                            "Route Distance Distribution", 'Distance (km)'
+                        )
                     )
                     st.plotly_chart(fig_dist, use_container_width=True)
                 
                 # Summary statistics table
                 st.subheader("Summary Statistics")
                 
-                summary_stats = {
-                    'Revenue': routes_with_sales['total_sales'].describe(),
-                    'Orders': routes_with_sales['total_orders'].describe(),
-                    'Distance (km)': routes_with_sales['distance_km'].describe(),
-                    'Flight Time (hr)': routes_with_sales['flight_time_hr'].describe()
-                }
+                def build_summary():
+                    summary_stats = {
+                        'Revenue': routes_with_sales['total_sales'].describe(),
+                        'Orders': routes_with_sales['total_orders'].describe(),
+                        'Distance (km)': routes_with_sales['distance_km'].describe(),
+                        'Flight Time (hr)': routes_with_sales['flight_time_hr'].describe()
+                    }
+                    return pd.DataFrame(summary_stats).round(2)
                 
-                summary_df = pd.DataFrame(summary_stats).round(2)
+                summary_df = _cached_view("summary_statistics", version, build_summary)
                 st.dataframe(summary_df, use_container_width=True)
     
     else:
@@ -626,6 +1433,34 @@ def main():
     """Main application entry point"""
     configure_page()
     
+    with span("dashboard.rerun") as rerun:
+        first_paint = render_page()
+    # Offered for download in the sidebar on the next rerun
+    st.session_state['last_rerun_trace'] = rerun.to_dict()
+    _record_render_timing(first_paint, rerun.duration)
+
+
+def _record_render_timing(first_paint, rerun_time):
+    """Append one rerun's time to first paint and total time to the session history"""
+    active_only = st.session_state.get('render_active_view_only', True)
+    timings = st.session_state.setdefault('render_timings', [])
+    timings.append({
+        "mode": "active view" if active_only else "all tabs",
+        "view": st.session_state.get('active_view') if active_only else None,
+        "first_paint_ms": first_paint * 1000,
+        "rerun_ms": rerun_time * 1000
+    })
+    del timings[:-RENDER_TIMING_HISTORY]
+
+
+def render_page():
+    """
+    Render the header, sidebar and views of one rerun
+    
+    Returns:
+        float: Seconds from the start of the rerun until the header, sidebar
+            and navigation were sent, before any view body is computed
+    """
     # Header
     st.title("Flight Ticket Sales & Performance Analysis")
     st.markdown("Comprehensive analysis of flight ticket sales with database performance comparison")
@@ -640,34 +1475,38 @@ def main():
     start_datetime = datetime.combine(start_date, datetime.min.time())
     end_datetime = datetime.combine(end_date, datetime.max.time())
     
-    # Main tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "Without Optimization",
-        "With Optimization",
-        "Performance Comparison",
-        "Business Insights",
-        "Data Visualization"
-    ])
-    
-    # Render tabs
-    with tab1:
-        render_tab_scenario_1(start_datetime, end_datetime)
-    
-    with tab2:
-        render_tab_scenario_2(start_datetime, end_datetime)
+    views = {
+        "Without Optimization": lambda: render_tab_scenario_1(start_datetime, end_datetime),
+        "With Optimization": lambda: render_tab_scenario_2(start_datetime, end_datetime),
+        "Performance Comparison": lambda: render_tab_performance_comparison(
+            start_datetime, end_datetime
+        ),
+        "Business Insights": lambda: render_tab_business_insights(
+            period_days, start_date, end_date
+        ),
+        "Data Visualization": lambda: render_tab_data_visualization(start_date, end_date)
+    }
     
-    with tab3:
-        render_tab_performance_comparison()
-    
-    with tab4:
-        render_tab_business_insights(period_days, start_date, end_date)
-    
-    with tab5:
-        render_tab_data_visualization(start_date, end_date)
+    if st.session_state.get('render_active_view_only', True):
+        # Only the selected view is computed on each rerun
+        active_view = st.radio(
+            "View", list(views.keys()), horizontal=True, key="active_view",
+            label_visibility="collapsed"
+        )
+        first_paint = current_span().duration
+        views[active_view]()
+    else:
+        # Tabs run every view body on every rerun
+        tabs = st.tabs(list(views.keys()))
+        first_paint = current_span().duration
+        for tab, render_view in zip(tabs, views.values()):
+            with tab:
+                render_view()
     
     # Footer
     st.markdown("---")
     st.markdown("Flight Ticket Sales Analysis Dashboard | Built with Streamlit, MongoDB & Neo4j")
+    return first_paint
 
 
 if __name__ == "__main__":
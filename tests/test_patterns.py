@@ -42,6 +42,46 @@ class TestDatabaseConnections:
         assert mongo_db is None
 
 
+class TestConnectionManager:
+    """Test the shared, process-wide connection manager"""
+    
+    @patch('src.core.database.GraphDatabase.driver')
+    @patch('src.core.database.MongoClient')
+    def test_connections_reused_across_requests(self, mock_mongo, mock_neo4j):
+        """Test that repeated requests reuse one driver and one client"""
+        from src.core.database import ConnectionManager
+        
+        manager = ConnectionManager(health_check_interval=3600)
+        first = manager.get_connections()
+        second = manager.get_connections()
+        
+        assert first[0] is second[0]
+        assert first[1] is second[1]
+        assert mock_neo4j.call_count == 1
+        assert mock_mongo.call_count == 1
+        assert mock_mongo.call_args.kwargs['maxPoolSize'] == manager.mongo_max_pool_size
+        
+        metrics = manager.get_metrics()
+        assert metrics['acquisitions'] == 2
+        assert metrics['reuses'] == 1
+        assert metrics['health_checks'] == 1
+    
+    @patch('src.core.database.GraphDatabase.driver')
+    @patch('src.core.database.MongoClient')
+    def test_failed_health_check_reconnects(self, mock_mongo, mock_neo4j):
+        """Test that a stale connection is rebuilt after a failed health check"""
+        from src.core.database import ConnectionManager
+        
+        manager = ConnectionManager(health_check_interval=0)
+        manager.get_connections()
+        mock_neo4j.return_value.verify_connectivity.side_effect = [Exception("gone"), None]
+        manager.get_connections()
+        
+        assert mock_neo4j.call_count == 2
+        manager.close()
+        mock_mongo.return_value.close.assert_called()
+
+
 class TestAnalytics:
     """Test analytics functions"""
     
@@ -210,6 +250,1955 @@ class TestErrorHandling:
         assert len(df_clean) == 2
 
 
+class TestDailyRouteRollup:
+    """Test the daily_route_sales rollup data source"""
+    
+    def test_rollup_pipeline_merges_into_rollup_collection(self):
+        """Test that the rollup build ends in a $merge keyed by day and route"""
+        from src.core.rollup import build_rollup_pipeline, ROLLUP_COLLECTION
+        
+        pipeline = build_rollup_pipeline(
+            datetime(2023, 3, 10, 12, 30), datetime(2023, 3, 20)
+        )
+        
+        assert pipeline[0]["$match"]["depart_date"]["$gte"] == datetime(2023, 3, 10)
+        assert pipeline[-1]["$merge"]["into"] == ROLLUP_COLLECTION
+        assert pipeline[-1]["$merge"]["on"] == ["day", "origin", "destination"]
+    
+    def _rollup_db(self):
+        collections = {name: MagicMock()
+                       for name in ("orders", "daily_route_sales", "daily_route_sales_build")}
+        collections["daily_route_sales"].index_information.return_value = {
+            "_id_": {"key": [("_id", 1)]},
+            "idx_rollup_day_route": {"key": [("day", 1)], "unique": True},
+            "idx_rollup_day_route_totals": {"key": [("day", 1), ("total_sales", 1)]}
+        }
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.side_effect = collections.__getitem__
+        return mongo_db, collections
+    
+    def test_full_rebuild_swaps_in_built_collection(self):
+        """A full rebuild should never empty the live rollup"""
+        from src.core.rollup import refresh_daily_route_rollup
+        
+        mongo_db, collections = self._rollup_db()
+        refresh_daily_route_rollup(mongo_db)
+        
+        collections["daily_route_sales"].delete_many.assert_not_called()
+        pipeline = collections["orders"].aggregate.call_args[0][0]
+        assert pipeline[-1]["$merge"]["into"] == "daily_route_sales_build"
+        build = collections["daily_route_sales_build"]
+        assert "idx_rollup_day_route_totals" in [
+            call.kwargs["name"] for call in build.create_index.call_args_list
+        ]
+        build.rename.assert_called_once_with("daily_route_sales", dropTarget=True)
+    
+    def test_ranged_refresh_replaces_rows_in_place(self):
+        """A ranged refresh should merge first and only then delete rows it did not write"""
+        from src.core.rollup import refresh_daily_route_rollup
+        
+        mongo_db, collections = self._rollup_db()
+        refresh_daily_route_rollup(mongo_db, datetime(2023, 3, 10), datetime(2023, 3, 20))
+        
+        pipeline = collections["orders"].aggregate.call_args[0][0]
+        refresh_id = pipeline[-2]["$project"]["refresh_id"]["$literal"]
+        stale = collections["daily_route_sales"].delete_many.call_args[0][0]
+        assert stale["refresh_id"] == {"$ne": refresh_id}
+        assert stale["day"] == {"$gte": datetime(2023, 3, 10), "$lte": datetime(2023, 3, 20)}
+    
+    def test_get_sales_by_date_reads_rollup(self):
+        """Test that the rollup source queries daily_route_sales, not orders"""
+        from src.core.analytics import get_sales_by_date
+        from src.core.rollup import ROLLUP_COLLECTION
+        
+        orders = MagicMock()
+        rollup = orders.database.__getitem__.return_value
+        rollup.aggregate.return_value = [
+            {"_id": "2023-03-10", "daily_sales": 1000000, "daily_orders": 100}
+        ]
+        
+        df, _ = get_sales_by_date(
+            orders, datetime(2023, 3, 10), datetime(2023, 3, 10, 23, 59, 59), source="rollup"
+        )
+        
+        orders.database.__getitem__.assert_called_with(ROLLUP_COLLECTION)
+        orders.aggregate.assert_not_called()
+        pipeline = rollup.aggregate.call_args[0][0]
+        assert pipeline[0]["$match"]["day"]["$lte"] == datetime(2023, 3, 10)
+        assert df.iloc[0]["daily_sales"] == 1000000
+    
+    def test_unknown_source_rejected(self):
+        """Test that an unknown analytics source raises an error"""
+        from src.core.analytics import get_sales_by_date
+        
+        with pytest.raises(ValueError):
+            get_sales_by_date(Mock(), datetime(2023, 3, 10), datetime(2023, 3, 20), source="csv")
+
+
+class TestConcurrentStages:
+    """Test concurrent execution of independent scenario stages"""
+    
+    @pytest.mark.parametrize("concurrent", [False, True])
+    def test_optimized_scenario_records_stage_times(self, concurrent):
+        """Test that both execution modes produce the same results and timings"""
+        from src.core.analytics import run_scenario_with_optimization
+        
+        def aggregate(pipeline):
+            group = pipeline[1]["$group"]
+            if group["_id"] is None:
+                return [{"total_sales": 300, "total_orders": 3}]
+            if "daily_sales" in group:
+                return [{"_id": "2023-03-10", "daily_sales": 300, "daily_orders": 3}]
+            return [{"_id": {"origin": "CGK", "destination": "DPS"},
+                     "total_sales": 300, "total_orders": 3}]
+        
+        orders = Mock()
+        orders.aggregate.side_effect = aggregate
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value = [
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8},
+            {"origin": "CGK", "destination": "KNO", "distance_km": 1400, "flight_time_hr": 2.2}
+        ]
+        session.execute_read.side_effect = lambda work: work(tx)
+        
+        results = run_scenario_with_optimization(
+            orders, driver, datetime(2023, 3, 10), datetime(2023, 3, 10, 23, 59),
+            concurrent=concurrent
+        )
+        
+        assert results['total_sales'] == 300
+        assert len(results['df_daily']) == 1
+        assert results['df_sorted'].iloc[0]['destination'] == "DPS"
+        assert results['df_sorted'].iloc[1]['total_sales'] == 0
+        assert results['summed_stage_time'] == pytest.approx(
+            results['mongo_total_time'] + results['daily_trend_time'] +
+            results['neo4j_time'] + results['mongo_routes_time']
+        )
+        assert results['critical_path_time'] >= 0
+
+
+class TestRouteMatching:
+    """Test exact route-pair matching in the batch route query"""
+    
+    def test_pairs_strategy_matches_only_requested_routes(self):
+        """Test that each requested route becomes one exact $or branch"""
+        from src.core.analytics import build_route_batch_pipeline
+        
+        pairs = [("CGK", "DPS"), ("SUB", "KNO")]
+        start_date, end_date = datetime(2023, 3, 10), datetime(2023, 3, 20)
+        
+        match = build_route_batch_pipeline(start_date, end_date, pairs)[0]["$match"]
+        
+        assert [(b["origin"], b["destination"]) for b in match["$or"]] == pairs
+        assert all(b["depart_date"] == {"$gte": start_date, "$lte": end_date}
+                   for b in match["$or"])
+    
+    def test_cross_product_strategy_keeps_in_filter(self):
+        """Test that the cross-product strategy reproduces the $in filter"""
+        from src.core.analytics import build_route_batch_pipeline
+        
+        match = build_route_batch_pipeline(
+            datetime(2023, 3, 10), datetime(2023, 3, 20),
+            [("CGK", "DPS"), ("SUB", "KNO")], route_match="cross_product"
+        )[0]["$match"]
+        
+        assert match["origin"] == {"$in": ["CGK", "SUB"]}
+        assert match["destination"] == {"$in": ["DPS", "KNO"]}
+    
+    def test_summarize_explain_sums_nested_stats(self):
+        """Test that explain counters are collected from nested $cursor stages"""
+        from src.core.profiling import summarize_explain
+        
+        explain = {"stages": [{"$cursor": {
+            "queryPlanner": {"winningPlan": {"inputStage": {"indexName": "idx_origin_dest_date"}}},
+            "executionStats": {"totalDocsExamined": 120, "totalKeysExamined": 130,
+                               "nReturned": 120, "executionTimeMillis": 4}
+        }}]}
+        
+        summary = summarize_explain(explain)
+        
+        assert summary["docs_examined"] == 120
+        assert summary["keys_examined"] == 130
+        assert summary["indexes_used"] == ["idx_origin_dest_date"]
+
+
+class TestQueryCache:
+    """Test the shared analytics result cache"""
+    
+    def test_hit_miss_and_lru_eviction(self):
+        """Test cache hits, misses and least recently used eviction"""
+        from src.core.cache import QueryCache
+        
+        cache = QueryCache(max_entries=2, ttl_seconds=60)
+        compute = Mock(side_effect=lambda: "value")
+        
+        assert cache.get_or_compute("a", compute) == ("value", False)
+        assert cache.get_or_compute("a", compute) == ("value", True)
+        cache.get_or_compute("b", compute)
+        cache.get_or_compute("c", compute)
+        cache.get_or_compute("a", compute)
+        
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 4
+        assert stats["evictions"] == 2
+    
+    def test_ttl_and_invalidation(self):
+        """Test that expired and invalidated entries are recomputed"""
+        from src.core.cache import QueryCache
+        
+        compute = Mock(return_value=1)
+        expired = QueryCache(ttl_seconds=0)
+        expired.get_or_compute("k", compute)
+        expired.get_or_compute("k", compute)
+        assert compute.call_count == 2
+        
+        cache = QueryCache(ttl_seconds=60)
+        cache.get_or_compute("k", compute)
+        cache.invalidate()
+        cache.get_or_compute("k", compute)
+        assert compute.call_count == 4
+    
+    def test_concurrent_requests_are_coalesced(self):
+        """Test that identical in-flight requests share one computation"""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from src.core.cache import QueryCache
+        
+        cache = QueryCache()
+        release = threading.Event()
+        calls = []
+        
+        def slow_query():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(cache.get_or_compute, "k", slow_query) for _ in range(4)]
+            deadline = time.monotonic() + 5
+            while cache.get_stats()["coalesced"] < 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            values = [f.result()[0] for f in futures]
+        
+        assert values == ["result"] * 4
+        assert len(calls) == 1
+    
+    def test_run_cached_keys_on_dates_and_filters(self):
+        """Test that run_cached separates entries by filters"""
+        from src.core.analytics import run_cached
+        from src.core.cache import QueryCache
+        
+        cache = QueryCache()
+        scenario = Mock(return_value={"total_sales": 1})
+        scenario.__name__ = "scenario"
+        start_date, end_date = datetime(2023, 3, 10), datetime(2023, 4, 9)
+        
+        run_cached(scenario, ("orders", "driver"), start_date, end_date, cache=cache, source="orders")
+        _, hit = run_cached(scenario, ("orders", "driver"), start_date, end_date, cache=cache, source="orders")
+        run_cached(scenario, ("orders", "driver"), start_date, end_date, cache=cache, source="rollup")
+        
+        assert hit is True
+        assert scenario.call_count == 2
+        scenario.assert_called_with("orders", "driver", start_date, end_date, source="rollup")
+
+
+class TestRouteCatalog:
+    """Test the in-process route catalog"""
+    
+    ROUTES = [
+        ["CGK", "DPS", 980.0, 1.7, 70],
+        ["CGK", "KNO", 1400.0, 2.2, 35],
+        ["SUB", "KNO", 1900.0, None, 7],
+        ["CGK", "JPR", 3700.0, 5.1, 14]
+    ]
+    
+    def _driver(self):
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = {
+            "route_count": len(self.ROUTES), "distance_sum": 7980.0,
+            "flight_time_sum": 9.0, "frequency_sum": 126
+        }
+        session.execute_read.return_value = [list(row) for row in self.ROUTES]
+        return driver, session
+    
+    def test_top_by_distance_matches_route_queries(self):
+        """Test that the catalog reproduces both scenario route filters"""
+        from src.core.route_catalog import RouteCatalog
+        
+        driver, _ = self._driver()
+        catalog = RouteCatalog(check_interval=3600)
+        
+        baseline = catalog.top_by_distance(driver, limit=2)
+        optimized = catalog.top_by_distance(driver, min_distance=1000, require_flight_time=True)
+        
+        assert baseline['destination'].tolist() == ["JPR", "KNO"]
+        assert list(zip(optimized['origin'], optimized['destination'])) == [
+            ("CGK", "JPR"), ("CGK", "KNO")
+        ]
+        assert catalog.get_status()['routes'] == 4
+    
+    def test_catalog_loads_once_until_check_is_due(self):
+        """Test that repeated lookups do not query Neo4j again"""
+        from src.core.route_catalog import RouteCatalog
+        
+        driver, session = self._driver()
+        catalog = RouteCatalog(check_interval=3600)
+        
+        for _ in range(3):
+            catalog.top_by_distance(driver)
+        
+        assert session.execute_read.call_count == 1
+        assert catalog.get_status()['loads'] == 1
+    
+    def test_attribute_change_triggers_reload(self):
+        """A route whose distance changed should reload the catalog before the TTL"""
+        from src.core.route_catalog import RouteCatalog
+        
+        driver, session = self._driver()
+        catalog = RouteCatalog(check_interval=3600)
+        catalog.load(driver)
+        
+        catalog._refresh(driver)
+        assert catalog.get_status()['loads'] == 1
+        
+        session.run.return_value.single.return_value = {
+            "route_count": len(self.ROUTES), "distance_sum": 8080.0,
+            "flight_time_sum": 9.0, "frequency_sum": 126
+        }
+        catalog._refresh(driver)
+        assert catalog.get_status()['loads'] == 2
+    
+    def test_fractional_frequency_is_rounded(self):
+        """Fractional frequencies from Neo4j should not break the Int32 column"""
+        from src.core.route_catalog import RouteCatalog
+        
+        driver, session = self._driver()
+        session.execute_read.return_value = [["CGK", "DPS", 980.0, 1.7, 10.6],
+                                             ["SUB", "KNO", 1900.0, None, None]]
+        table = RouteCatalog().snapshot(driver)
+        
+        assert table["frequency_per_week"].tolist()[1] == 11
+        assert table["frequency_per_week"].isna().tolist()[0]
+    
+    def test_scenario_uses_catalog_instead_of_neo4j(self):
+        """Test that the optimized scenario reads routes from the catalog"""
+        from src.core.analytics import run_scenario_with_optimization
+        
+        catalog = Mock()
+        catalog.top_by_distance.return_value = pd.DataFrame([
+            {"origin": "CGK", "destination": "KNO", "distance_km": 1400.0, "flight_time_hr": 2.2}
+        ])
+        orders = Mock()
+        orders.aggregate.return_value = []
+        driver = Mock()
+        
+        results = run_scenario_with_optimization(
+            orders, driver, datetime(2023, 3, 10), datetime(2023, 3, 20), route_catalog=catalog
+        )
+        
+        driver.session.assert_not_called()
+        assert catalog.top_by_distance.call_args.kwargs == {
+            "limit": 50, "min_distance": 1000, "require_flight_time": True
+        }
+        assert results['df_sorted']['destination'].tolist() == ["KNO"]
+
+
+class TestBenchmark:
+    """Test the headless scenario benchmark"""
+    
+    def test_summarize_timings_percentiles(self):
+        """Test median and tail percentiles of timing samples"""
+        from src.core.benchmark import summarize_timings
+        
+        summary = summarize_timings([float(i) for i in range(1, 101)])
+        
+        assert summary["runs"] == 100
+        assert summary["median"] == pytest.approx(50.5)
+        assert summary["p95"] == pytest.approx(95.05)
+        assert summary["p99"] == pytest.approx(99.01)
+    
+    def test_run_strategy_discards_warmup(self):
+        """Test that warm-up runs are executed but not measured"""
+        from src.core import benchmark
+        
+        scenario = Mock(return_value={key: 0.1 for key in benchmark.STAGE_KEYS})
+        with patch.dict(benchmark.STRATEGIES, {"fake": (scenario, {"concurrent": True})}):
+            result = benchmark.run_strategy(
+                "fake", Mock(), Mock(), datetime(2023, 3, 10), datetime(2023, 4, 9),
+                repeats=3, warmup=2
+            )
+        
+        assert scenario.call_count == 5
+        assert scenario.call_args.kwargs == {"concurrent": True}
+        assert result["summary"]["neo4j_time"]["runs"] == 3
+        assert len(result["samples"]["wall_time"]) == 3
+    
+    def test_bootstrap_ci_brackets_median(self):
+        """Test that the median confidence interval contains the sample median"""
+        from src.core.benchmark import bootstrap_ci, speedup_ci
+        
+        samples = [1.0, 1.1, 0.9, 1.05, 0.95, 1.2, 0.8, 1.0, 1.02, 0.98]
+        low, high = bootstrap_ci(samples)
+        
+        assert low <= 1.0 <= high
+        assert bootstrap_ci([2.0]) == (2.0, 2.0)
+        speedup = speedup_ci([2.0, 2.1, 1.9], [1.0, 1.05, 0.95])
+        assert speedup["speedup"] == pytest.approx(2.0)
+        assert speedup["ci_low"] <= 2.0 <= speedup["ci_high"]
+    
+    def test_run_comparison_alternates_order_and_clears_cold_caches(self):
+        """Test interleaved order, cold-phase cache clears and per-phase reports"""
+        from src.core import benchmark
+        
+        calls = []
+        
+        def make_scenario(name):
+            def scenario(*args, **kwargs):
+                calls.append(name)
+                return {key: 0.1 for key in benchmark.STAGE_KEYS}
+            return scenario
+        
+        fake = {"a": (make_scenario("a"), {}), "b": (make_scenario("b"), {})}
+        with patch.dict(benchmark.STRATEGIES, fake), \
+                patch.object(benchmark, "clear_caches") as clear_caches, \
+                patch.object(benchmark, "collect_environment", return_value={}):
+            report = benchmark.run_comparison(
+                MagicMock(), MagicMock(), datetime(2023, 3, 10), datetime(2023, 4, 9),
+                ["a", "b"], repeats=2, warmup=1
+            )
+        
+        # cold: a b, b a; warm: warm-up a b, then a b, b a
+        assert calls == ["a", "b", "b", "a", "a", "b", "a", "b", "b", "a"]
+        assert clear_caches.call_count == 4
+        assert set(report["phases"]) == {"cold", "warm"}
+        assert report["phases"]["warm"]["a"]["speedup"]["speedup"] == pytest.approx(1.0)
+        assert report["parameters"]["baseline"] == "a"
+        assert report["phases"]["cold"]["a"]["summary"]["wall_time"]["runs"] == 2
+        assert report["parameters"]["index_state"] == "as_is"
+        assert report["parameters"]["index_profile"] is None
+    
+    def test_apply_index_state_pins_every_profile(self):
+        """Pinning one profile should drop the other profile's indexes and report what exists"""
+        from src.core import benchmark
+        from src.core.database import NEO4J_INDEXES
+        
+        collections = {name: MagicMock()
+                       for name in ("orders", "flight_prices", "daily_route_sales")}
+        collections["orders"].index_information.return_value = {
+            "_id_": {"key": [("_id", 1)]},
+            "idx_depart_date": {"key": [("depart_date", 1)]},
+            "idx_flight_id": {"key": [("flight_id", 1)]}
+        }
+        for name in ("flight_prices", "daily_route_sales"):
+            collections[name].index_information.return_value = {}
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.side_effect = collections.__getitem__
+        driver = MagicMock()
+        records = MagicMock()
+        records.__iter__.side_effect = lambda: iter(
+            [{"name": name, "state": "ONLINE", "populationPercent": 100.0}
+             for name in NEO4J_INDEXES]
+        )
+        driver.session.return_value.__enter__.return_value.run.return_value = records
+        
+        indexes = benchmark.apply_index_state(mongo_db, driver, "created", "covered")
+        
+        collections["orders"].drop_index.assert_called_once_with("idx_depart_date")
+        create_index = collections["orders"].create_index
+        created = [call.kwargs["name"] for call in create_index.call_args_list]
+        assert created == ["idx_date_route_price", "idx_route_date_price"]
+        assert "_id_" not in indexes["orders"]
+        
+        collections["orders"].drop_index.reset_mock()
+        benchmark.apply_index_state(mongo_db, driver, "dropped")
+        assert sorted(call.args[0] for call in collections["orders"].drop_index.call_args_list) \
+            == ["idx_depart_date", "idx_flight_id"]
+
+
+class TestSyntheticData:
+    """Test the synthetic dataset generator"""
+    
+    def _spec(self, seed=7):
+        import numpy as np
+        from src.core.datagen import generate_airports, generate_routes, build_order_spec
+        
+        rng = np.random.default_rng(seed)
+        airports = generate_airports(25, rng)
+        routes = generate_routes(airports, 4, rng)
+        spec = build_order_spec(routes, datetime(2023, 3, 1), datetime(2023, 4, 30), 5000, rng)
+        return airports, routes, spec, rng
+    
+    def test_graph_is_symmetric_with_unique_codes(self):
+        """Test that airports are unique and every route has a return route"""
+        airports, routes, _, _ = self._spec()
+        
+        codes = [airport["airport_code"] for airport in airports]
+        pairs = {(route["origin"], route["destination"]) for route in routes}
+        
+        assert len(set(codes)) == 25
+        assert all((destination, origin) in pairs for origin, destination in pairs)
+        assert all(route["distance_km"] > 0 for route in routes)
+    
+    def test_orders_match_schema(self):
+        """Test that generated orders follow the orders collection schema"""
+        from src.core.datagen import generate_orders
+        
+        _, _, spec, rng = self._spec()
+        orders = generate_orders(spec, 100, 2000, rng)
+        
+        assert orders[0]["order_id"] == "ORD0000000100"
+        assert set(orders[0]) == {
+            "order_id", "customer_id", "flight_id", "origin", "destination", "depart_date",
+            "departure_time", "arrival_time", "class", "passengers", "price_per_person",
+            "total_price", "booking_date", "status"
+        }
+        assert all(datetime(2023, 3, 1) <= o["depart_date"] < datetime(2023, 5, 1) for o in orders)
+        assert all(o["total_price"] == o["price_per_person"] * o["passengers"] for o in orders)
+        assert all(o["booking_date"] < o["depart_date"] for o in orders)
+    
+    def test_orders_are_reproducible(self):
+        """Test that the same seed produces the same orders"""
+        from src.core.datagen import generate_orders
+        
+        _, _, spec, rng = self._spec()
+        first = generate_orders(spec, 0, 50, rng)
+        _, _, spec, rng = self._spec()
+        second = generate_orders(spec, 0, 50, rng)
+        
+        assert first == second
+
+
+class TestColumnarSnapshot:
+    """Test the local Parquet snapshot engine against hand-computed aggregates"""
+    
+    ORDERS = [
+        {"depart_date": datetime(2023, 3, 30, 8), "origin": "CGK", "destination": "DPS",
+         "total_price": 100, "status": "confirmed", "class": "economy"},
+        {"depart_date": datetime(2023, 3, 30, 20), "origin": "CGK", "destination": "DPS",
+         "total_price": 200, "status": "confirmed", "class": "business"},
+        {"depart_date": datetime(2023, 4, 2, 9), "origin": "DPS", "destination": "CGK",
+         "total_price": 50, "status": "cancelled", "class": "economy"},
+        {"depart_date": datetime(2023, 4, 2, 9), "origin": "CGK", "destination": "SUB",
+         "total_price": 70, "status": "confirmed", "class": "economy"},
+        {"depart_date": datetime(2023, 5, 1, 9), "origin": "CGK", "destination": "DPS",
+         "total_price": 999, "status": "confirmed", "class": "economy"}
+    ]
+    
+    def _engine(self, tmp_path):
+        from src.core.snapshot import export_orders_snapshot, SnapshotEngine
+        
+        collection = Mock()
+        collection.find.return_value = [dict(order) for order in self.ORDERS]
+        path = str(tmp_path / "snapshot")
+        metadata = export_orders_snapshot(collection, path, batch_size=2)
+        return metadata, SnapshotEngine(path)
+    
+    def test_export_partitions_by_month(self, tmp_path):
+        """Test that the export writes one partition per month and its metadata"""
+        import os
+        
+        metadata, _ = self._engine(tmp_path)
+        
+        assert metadata["rows"] == 5
+        assert metadata["first_depart_date"] == "2023-03-30T08:00:00"
+        partitions = sorted(name for name in os.listdir(tmp_path / "snapshot") if name.startswith("month="))
+        assert partitions == ["month=2023-03", "month=2023-04", "month=2023-05"]
+    
+    def test_aggregates_match_orders(self, tmp_path):
+        """Test total, daily and exact route sales for a range spanning two months"""
+        _, engine = self._engine(tmp_path)
+        start, end = datetime(2023, 3, 1), datetime(2023, 4, 30, 23, 59, 59)
+        
+        assert engine.total_sales(start, end) == (420, 4)
+        
+        df_daily = engine.sales_by_date(start, end)
+        assert list(df_daily["date"]) == [pd.Timestamp("2023-03-30"), pd.Timestamp("2023-04-02")]
+        assert list(df_daily["daily_sales"]) == [300, 120]
+        assert list(df_daily["daily_orders"]) == [2, 2]
+        
+        # CGK->CGK would match an origin/destination cross product but is not requested
+        df_routes = engine.route_sales([("CGK", "DPS"), ("DPS", "CGK")], start, end)
+        rows = {(r.origin, r.destination): (r.total_sales, r.total_orders)
+                for r in df_routes.itertuples()}
+        assert rows == {("CGK", "DPS"): (300, 2), ("DPS", "CGK"): (50, 1)}
+    
+    def test_empty_range(self, tmp_path):
+        """Test that ranges without orders return zeros and an empty trend"""
+        _, engine = self._engine(tmp_path)
+        start, end = datetime(2022, 1, 1), datetime(2022, 1, 31)
+        
+        assert engine.total_sales(start, end) == (0, 0)
+        assert engine.sales_by_date(start, end).empty
+
+
+class TestMmapIndex:
+    """Test the memory-mapped order arrays against hand-computed aggregates"""
+    
+    def _index(self, tmp_path):
+        from src.core.mmap_index import build_mmap_index, MmapIndex
+        
+        collection = Mock()
+        collection.find.return_value = [
+            {"depart_date": datetime(2023, 4, 2, 9), "origin": "DPS", "destination": "CGK",
+             "total_price": 50, "status": "cancelled"},
+            {"depart_date": datetime(2023, 3, 30, 8), "origin": "CGK", "destination": "DPS",
+             "total_price": 100, "status": "confirmed"},
+            {"depart_date": datetime(2023, 5, 1, 9), "origin": "CGK", "destination": "DPS",
+             "total_price": 999, "status": "confirmed"},
+            {"depart_date": datetime(2023, 3, 30, 20), "origin": "CGK", "destination": "DPS",
+             "total_price": 3_000_000_000_007, "status": "confirmed"}
+        ]
+        path = str(tmp_path / "mmap")
+        metadata = build_mmap_index(collection, path, batch_size=3)
+        return metadata, MmapIndex(path)
+    
+    def test_arrays_are_sorted_by_day(self, tmp_path):
+        """Test that the build sorts rows by day and records routes and statuses"""
+        import numpy as np
+        
+        metadata, index = self._index(tmp_path)
+        
+        assert metadata["rows"] == 4
+        assert metadata["first_day"] == "2023-03-30"
+        assert metadata["statuses"] == ["cancelled", "confirmed"]
+        assert np.all(np.diff(index._arrays["day"]) >= 0)
+        assert isinstance(index._arrays["day"], np.memmap)
+    
+    def test_aggregates_match_orders(self, tmp_path):
+        """Test total, daily and route sums, including exact large prices"""
+        _, index = self._index(tmp_path)
+        start, end = datetime(2023, 3, 1), datetime(2023, 4, 30, 23, 59, 59)
+        
+        assert index.total_sales(start, end) == (3_000_000_000_157, 3)
+        
+        df_daily = index.sales_by_date(start, end)
+        assert list(df_daily["date"]) == [pd.Timestamp("2023-03-30"), pd.Timestamp("2023-04-02")]
+        assert list(df_daily["daily_sales"]) == [3_000_000_000_107, 50]
+        assert list(df_daily["daily_orders"]) == [2, 1]
+        
+        df_routes = index.route_sales([("CGK", "DPS"), ("CGK", "SUB")], start, end)
+        assert df_routes.to_dict("records") == [{
+            "origin": "CGK", "destination": "DPS",
+            "total_sales": 3_000_000_000_107, "total_orders": 2
+        }]
+    
+    def test_empty_range(self, tmp_path):
+        """Test that ranges without orders return zeros and an empty trend"""
+        _, index = self._index(tmp_path)
+        start, end = datetime(2022, 1, 1), datetime(2022, 1, 31)
+        
+        assert index.total_sales(start, end) == (0, 0)
+        assert index.sales_by_date(start, end).empty
+        assert index.route_sales([("CGK", "DPS")], start, end).empty
+
+
+class TestResultLoader:
+    """Test streaming cursor results into DataFrames"""
+    
+    def test_nested_fields_and_dtypes(self):
+        """Test dotted paths, dtypes and load statistics"""
+        from src.core.loader import load_frame, load_stats
+        
+        docs = iter([
+            {"_id": {"origin": "CGK", "destination": "DPS"}, "total_sales": 300, "total_orders": 3},
+            {"_id": {"origin": "DPS", "destination": "CGK"}, "total_sales": 50, "total_orders": 1}
+        ])
+        df = load_frame(docs, {"origin": "_id.origin", "total_sales": "total_sales"},
+                        dtypes={"total_sales": "int64"})
+        
+        assert list(df.columns) == ["origin", "total_sales"]
+        assert list(df["origin"]) == ["CGK", "DPS"]
+        assert df["total_sales"].dtype == "int64"
+        stats = load_stats(df)
+        assert stats["rows"] == 2
+        assert stats["bytes"] > 0
+        assert stats["truncated"] is False
+    
+    def test_row_cap_closes_cursor(self):
+        """Test that the row cap stops reading and closes the cursor"""
+        from src.core.loader import load_frame
+        
+        cursor = MagicMock()
+        cursor.__iter__.return_value = iter([{"value": i} for i in range(10)])
+        df = load_frame(cursor, {"value": "value"}, row_cap=4)
+        
+        assert list(df["value"]) == [0, 1, 2, 3]
+        assert df.attrs["load_stats"]["truncated"] is True
+        cursor.close.assert_called_once()
+    
+    def test_empty_result_keeps_columns(self):
+        """Test that an empty cursor still produces the expected columns"""
+        from src.core.analytics import fetch_routes
+        
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value = []
+        session.execute_read.side_effect = lambda work: work(tx)
+        
+        df_routes, _ = fetch_routes(driver, "MATCH (n) RETURN n")
+        
+        assert df_routes.empty
+        assert list(df_routes.columns) == ["origin", "destination", "distance_km", "flight_time_hr"]
+
+
+class TestQueryPlans:
+    """Test capturing MongoDB explain and Neo4j PROFILE output"""
+    
+    EXPLAIN = {
+        "stages": [
+            {"$cursor": {
+                "queryPlanner": {"winningPlan": {
+                    "stage": "PROJECTION_COVERED",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "idx_origin_dest_date"}
+                }},
+                "executionStats": {"totalDocsExamined": 0, "totalKeysExamined": 120,
+                                   "nReturned": 120, "executionTimeMillis": 3}
+            }, "executionTimeMillisEstimate": 2, "nReturned": 120},
+            {"$group": {}, "executionTimeMillisEstimate": 3, "nReturned": 4}
+        ]
+    }
+    
+    PROFILE = {
+        "operatorType": "ProduceResults@neo4j", "dbHits": 0, "rows": 50, "args": {},
+        "children": [{
+            "operatorType": "DirectedRelationshipIndexSeekByRange@neo4j", "dbHits": 90,
+            "rows": 50, "args": {"Details": "RANGE INDEX r:CONNECTED_TO(distance_km)"},
+            "children": []
+        }]
+    }
+    
+    def test_summarize_explain_plan_and_stages(self):
+        """Test the winning plan and per-stage timings of an aggregation explain"""
+        from src.core.profiling import summarize_explain
+        
+        summary = summarize_explain(self.EXPLAIN)
+        
+        assert summary["indexes_used"] == ["idx_origin_dest_date"]
+        assert summary["winning_plan"] == "PROJECTION_COVERED <- IXSCAN"
+        assert summary["keys_examined"] == 120
+        assert [stage["stage"] for stage in summary["stage_timings"]] == ["$cursor", "$group"]
+    
+    def test_summarize_explain_ignores_rejected_plans(self):
+        """Indexes of rejected candidate plans should not count as used"""
+        from src.core.profiling import summarize_explain
+        
+        rejected = {"stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "idx_depart_date"}}
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {"stage": "FETCH", "inputStage": {
+                    "stage": "IXSCAN", "indexName": "idx_origin_dest_date"
+                }},
+                "rejectedPlans": [rejected]
+            },
+            "executionStats": {
+                "totalDocsExamined": 12, "totalKeysExamined": 12, "nReturned": 12,
+                "executionStages": {"stage": "FETCH", "inputStage": {
+                    "stage": "IXSCAN", "indexName": "idx_origin_dest_date"
+                }},
+                "allPlansExecution": [{"executionStages": rejected}]
+            }
+        }
+        
+        assert summarize_explain(explain)["indexes_used"] == ["idx_origin_dest_date"]
+    
+    def test_summarize_profile(self):
+        """Test db hits, rows and index operators of a Cypher profile"""
+        from src.core.profiling import summarize_profile
+        
+        summary = summarize_profile(self.PROFILE)
+        
+        assert summary["db_hits"] == 90
+        assert summary["rows"] == 50
+        assert summary["index_operators"] == ["DirectedRelationshipIndexSeekByRange"]
+    
+    def test_instrumented_scenario_records_plans(self):
+        """Test that instrument=True stores one plan per query next to the timings"""
+        from src.core.analytics import run_scenario_with_optimization
+        from src.core.route_catalog import RouteCatalog
+        
+        orders = MagicMock()
+        orders.aggregate.return_value = []
+        orders.database.command.return_value = self.EXPLAIN
+        catalog = Mock(spec=RouteCatalog)
+        catalog.top_by_distance.return_value = pd.DataFrame(
+            [("CGK", "DPS", 1100, 1.8)],
+            columns=["origin", "destination", "distance_km", "flight_time_hr"]
+        )
+        
+        results = run_scenario_with_optimization(
+            orders, MagicMock(), datetime(2023, 3, 10), datetime(2023, 3, 11),
+            route_catalog=catalog, instrument=True
+        )
+        
+        plans = results['query_plans']
+        assert set(plans) == {"mongo_total", "daily_trend", "mongo_routes"}
+        assert plans["mongo_routes"]["indexes_used"] == ["idx_origin_dest_date"]
+        assert orders.database.command.call_count == 3
+
+
+class TestTracing:
+    """Test nested spans, thread propagation and trace export"""
+    
+    def test_nested_spans_across_threads(self):
+        """Test that spans nest, including spans opened in pool threads"""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.core.tracing import span, submit_in_context
+        
+        def work():
+            with span("child.thread"):
+                pass
+        
+        with span("root") as root:
+            with span("child.local", rows=3):
+                pass
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                submit_in_context(executor, work).result()
+        
+        trace = root.to_dict()
+        assert [child["name"] for child in trace["children"]] == ["child.local", "child.thread"]
+        assert trace["children"][0]["attributes"] == {"rows": 3}
+        assert trace["duration_ns"] >= sum(c["duration_ns"] for c in trace["children"])
+    
+    def test_chrome_trace_export(self, tmp_path):
+        """Test that the Chrome export has one complete event per span"""
+        import json
+        from src.core.tracing import span, export_trace
+        
+        with span("root") as root:
+            with span("child"):
+                pass
+        
+        path = tmp_path / "trace.json"
+        export_trace(root.to_dict(), str(path), chrome=True)
+        events = json.loads(path.read_text())["traceEvents"]
+        
+        assert [event["name"] for event in events] == ["root", "child"]
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    
+    def test_scenario_stage_times_come_from_spans(self):
+        """Test that the scenario trace contains the stages behind each *_time key"""
+        from src.core.analytics import run_scenario_with_optimization
+        from src.core.route_catalog import RouteCatalog
+        
+        orders = MagicMock()
+        orders.aggregate.return_value = []
+        catalog = Mock(spec=RouteCatalog)
+        catalog.top_by_distance.return_value = pd.DataFrame(
+            [("CGK", "DPS", 1100, 1.8)],
+            columns=["origin", "destination", "distance_km", "flight_time_hr"]
+        )
+        
+        results = run_scenario_with_optimization(
+            orders, MagicMock(), datetime(2023, 3, 10), datetime(2023, 3, 11),
+            route_catalog=catalog
+        )
+        
+        trace = results['trace'].to_dict()
+        assert trace["name"] == "scenario.with_optimization"
+        stages = trace["children"][0]
+        spans = {child["name"]: child for child in stages["children"]}
+        assert set(spans) == {"mongo.total_sales", "mongo.daily_trend",
+                              "catalog.routes", "mongo.route_sales_batch"}
+        assert results['mongo_total_time'] == spans["mongo.total_sales"]["duration_ns"] / 1e9
+        assert results['critical_path_time'] == stages["duration_ns"] / 1e9
+
+
+class TestDailyTrendStore:
+    """Test the incremental per-day daily trend store"""
+    
+    def _fetch(self, calls):
+        def fetch(orders_collection, start_date, end_date, source):
+            calls.append((start_date.date(), end_date.date()))
+            days = pd.date_range(start_date.date(), end_date.date(), freq="D")
+            # Every day has orders except the 5th of each month
+            rows = [(day, 100 * day.day, day.day) for day in days if day.day != 5]
+            return pd.DataFrame(rows, columns=["date", "daily_sales", "daily_orders"]), 0.0
+        return fetch
+    
+    def test_missing_intervals(self):
+        """Test grouping of unknown days into contiguous intervals"""
+        from src.core.daily_store import missing_intervals
+        
+        days = [date(2023, 3, d) for d in range(1, 8)]
+        known = {date(2023, 3, 3), date(2023, 3, 4)}
+        
+        assert missing_intervals(days, known) == [
+            (date(2023, 3, 1), date(2023, 3, 2)), (date(2023, 3, 5), date(2023, 3, 7))
+        ]
+    
+    def test_extended_range_fetches_only_new_days(self):
+        """Test that overlapping ranges fetch only the days not stored yet"""
+        from src.core.daily_store import DailyTrendStore
+        
+        calls = []
+        store = DailyTrendStore(freshness_days=2, today=lambda: date(2024, 1, 1))
+        fetch = self._fetch(calls)
+        orders = MagicMock()
+        
+        first = store.get_sales_by_date(fetch, orders, datetime(2023, 3, 1),
+                                        datetime(2023, 3, 10, 23, 59), "orders")
+        second = store.get_sales_by_date(fetch, orders, datetime(2023, 3, 1),
+                                         datetime(2023, 3, 17, 23, 59), "orders")
+        
+        assert calls == [(date(2023, 3, 1), date(2023, 3, 10)),
+                         (date(2023, 3, 11), date(2023, 3, 17))]
+        assert len(first) == 9
+        assert len(second) == 16
+        assert list(second["daily_sales"][:3]) == [100, 200, 300]
+        assert store.get_stats()["days_fetched"] == 17
+    
+    def test_recent_days_are_refetched(self):
+        """Test that days inside the freshness window are fetched every time"""
+        from src.core.daily_store import DailyTrendStore
+        
+        calls = []
+        store = DailyTrendStore(freshness_days=2, today=lambda: date(2023, 3, 10))
+        fetch = self._fetch(calls)
+        orders = MagicMock()
+        
+        for _ in range(2):
+            store.get_sales_by_date(fetch, orders, datetime(2023, 3, 1),
+                                    datetime(2023, 3, 10, 23, 59), "orders")
+        
+        assert calls == [(date(2023, 3, 1), date(2023, 3, 10)),
+                         (date(2023, 3, 8), date(2023, 3, 10))]
+    
+    def test_rewritten_orders_refetch_historical_days(self):
+        """Test that a new orders fingerprint drops the stored days of the source"""
+        from src.core.daily_store import DailyTrendStore
+        
+        calls = []
+        store = DailyTrendStore(freshness_days=2, today=lambda: date(2024, 1, 1))
+        fetch = self._fetch(calls)
+        orders = Mock()
+        orders.estimated_document_count.return_value = 1000
+        
+        for newest in ("newest", "newest", "regenerated"):
+            orders.find_one.return_value = {"_id": newest}
+            store.get_sales_by_date(fetch, orders, datetime(2023, 3, 1),
+                                    datetime(2023, 3, 10, 23, 59), "orders")
+        
+        assert calls == [(date(2023, 3, 1), date(2023, 3, 10))] * 2
+        assert orders.find_one.call_args.kwargs["sort"] == [("_id", -1)]
+
+
+class TestSalesRanking:
+    """Test ranking routes by revenue before reading the graph"""
+    
+    def test_top_routes_pipeline_sorts_and_limits(self):
+        """Test that the pipeline ranks routes by sales with a stable tie-break"""
+        from src.core.analytics import build_top_routes_pipeline
+        
+        pipeline = build_top_routes_pipeline(datetime(2023, 3, 1), datetime(2023, 3, 31), limit=5)
+        
+        assert pipeline[-2]["$sort"] == {"total_sales": -1, "_id.origin": 1, "_id.destination": 1}
+        assert pipeline[-1] == {"$limit": 5}
+    
+    def test_scenario_keeps_top_sellers_missing_from_graph(self):
+        """Test that the top routes drive the lookup and stay in the result"""
+        from src.core.analytics import run_scenario_with_optimization, ROUTE_RANKING_SALES
+        
+        def aggregate(pipeline):
+            group = pipeline[1]["$group"]
+            if group["_id"] is None:
+                return [{"total_sales": 600, "total_orders": 4}]
+            if "daily_sales" in group:
+                return []
+            return [
+                {"_id": {"origin": "CGK", "destination": "DPS"}, "total_sales": 400, "total_orders": 3},
+                {"_id": {"origin": "SUB", "destination": "UPG"}, "total_sales": 200, "total_orders": 1}
+            ]
+        
+        orders = Mock()
+        orders.aggregate.side_effect = aggregate
+        catalog = Mock()
+        catalog.lookup.return_value = pd.DataFrame([
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8}
+        ])
+        
+        results = run_scenario_with_optimization(
+            orders, Mock(), datetime(2023, 3, 1), datetime(2023, 3, 31),
+            route_catalog=catalog, route_ranking=ROUTE_RANKING_SALES
+        )
+        
+        catalog.lookup.assert_called_once()
+        assert catalog.lookup.call_args[0][1] == [("CGK", "DPS"), ("SUB", "UPG")]
+        df_sorted = results['df_sorted']
+        assert list(df_sorted["destination"]) == ["DPS", "UPG"]
+        assert pd.isna(df_sorted.iloc[1]["distance_km"])
+        assert results['route_ranking'] == ROUTE_RANKING_SALES
+    
+    def test_graph_lookup_unwinds_pairs(self):
+        """Test that the Neo4j lookup sends the pairs as one UNWIND parameter"""
+        from src.core.analytics import _lookup_routes
+        
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value = [
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8},
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8}
+        ]
+        session.execute_read.side_effect = lambda work: work(tx)
+        
+        df_routes, _ = _lookup_routes(driver, [("CGK", "DPS")])
+        
+        query, parameters = tx.run.call_args[0]
+        assert "UNWIND $pairs" in query
+        assert parameters == {"pairs": [{"origin": "CGK", "destination": "DPS"}]}
+        assert len(df_routes) == 1
+    
+    def test_local_engines_rank_routes(self, tmp_path):
+        """Test that the memory-mapped index ranks routes like MongoDB"""
+        from src.core.mmap_index import build_mmap_index, MmapIndex
+        
+        collection = Mock()
+        collection.find.return_value = [
+            {"depart_date": datetime(2023, 3, 2), "origin": "SUB", "destination": "UPG",
+             "total_price": 70, "status": "confirmed"},
+            {"depart_date": datetime(2023, 3, 3), "origin": "CGK", "destination": "DPS",
+             "total_price": 50, "status": "confirmed"},
+            {"depart_date": datetime(2023, 3, 4), "origin": "CGK", "destination": "DPS",
+             "total_price": 40, "status": "confirmed"},
+            {"depart_date": datetime(2023, 3, 5), "origin": "DPS", "destination": "CGK",
+             "total_price": 10, "status": "confirmed"}
+        ]
+        path = str(tmp_path / "mmap")
+        build_mmap_index(collection, path)
+        
+        df_top = MmapIndex(path).top_routes(datetime(2023, 3, 1), datetime(2023, 3, 31), 2)
+        
+        assert df_top.to_dict("records") == [
+            {"origin": "CGK", "destination": "DPS", "total_sales": 90, "total_orders": 2},
+            {"origin": "SUB", "destination": "UPG", "total_sales": 70, "total_orders": 1}
+        ]
+
+
+class TestRouteStreaming:
+    """Test streaming every graph route through chunked sales batches"""
+    
+    @staticmethod
+    def _aggregate(pipeline):
+        group = pipeline[1]["$group"]
+        if group["_id"] is None:
+            return [{"total_sales": 0, "total_orders": 0}]
+        if "daily_sales" in group:
+            return []
+        return [
+            {"_id": {"origin": branch["origin"], "destination": branch["destination"]},
+             "total_sales": 10 * (index + 1), "total_orders": 1}
+            for index, branch in enumerate(pipeline[0]["$match"]["$or"])
+            if branch["destination"] != "X0"
+        ]
+    
+    def test_stream_covers_every_route_in_bounded_batches(self):
+        """Test that all routes are merged and each batch stays within batch_size"""
+        from src.core.analytics import stream_route_sales
+        
+        orders = Mock()
+        orders.aggregate.side_effect = self._aggregate
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value = iter([
+            {"origin": "CGK", "destination": f"X{i}", "distance_km": i, "flight_time_hr": 1.0}
+            for i in range(7)
+        ])
+        session.execute_read.side_effect = lambda work: work(tx)
+        
+        df_routes, stats = stream_route_sales(
+            orders, driver, datetime(2023, 3, 1), datetime(2023, 3, 31),
+            fetch_size=3, batch_size=3, max_workers=2
+        )
+        
+        driver.session.assert_called_once_with(fetch_size=3)
+        batch_sizes = [len(call[0][0][0]["$match"]["$or"])
+                       for call in orders.aggregate.call_args_list]
+        assert sorted(batch_sizes) == [1, 3, 3]
+        assert stats["routes"] == 7 and stats["chunks"] == 3
+        assert sorted(df_routes["destination"]) == [f"X{i}" for i in range(7)]
+        assert df_routes.set_index("destination").loc["X0", "total_sales"] == 0
+        insight_stats = stats["insight_stats"]
+        assert insight_stats.route_sales.count + insight_stats.zero_sales_routes == 7
+    
+    def test_scenario_keeps_df_sorted_contract(self):
+        """Test that the streamed mode returns df_sorted like the other modes"""
+        from src.core.analytics import run_scenario_with_optimization, ROUTE_RANKING_ALL
+        
+        orders = Mock()
+        orders.aggregate.side_effect = self._aggregate
+        catalog = Mock()
+        catalog.snapshot.return_value = pd.DataFrame({
+            "origin": pd.Categorical(["CGK", "CGK", "SUB"]),
+            "destination": pd.Categorical(["X0", "X1", "X2"]),
+            "distance_km": [900.0, 1200.0, 800.0],
+            "flight_time_hr": [1.5, 2.0, 1.2],
+            "frequency_per_week": [7, 7, 7]
+        })
+        
+        results = run_scenario_with_optimization(
+            orders, Mock(), datetime(2023, 3, 1), datetime(2023, 3, 31),
+            route_catalog=catalog, route_ranking=ROUTE_RANKING_ALL
+        )
+        
+        df_sorted = results['df_sorted']
+        assert list(df_sorted.columns) == ["origin", "destination", "distance_km",
+                                           "flight_time_hr", "total_sales", "total_orders"]
+        assert list(df_sorted["total_sales"]) == sorted(df_sorted["total_sales"], reverse=True)
+        assert len(df_sorted) == 3
+        assert results['route_stream']["routes"] == 3
+
+
+class TestGraphSales:
+    """Test writing monthly route sales onto CONNECTED_TO relationships"""
+    
+    def test_month_keys_span_year_boundary(self):
+        """Test that every touched month is listed and bounds cover whole months"""
+        from src.core.graph_sales import month_keys, month_bounds
+        
+        start, end = datetime(2023, 11, 15), datetime(2024, 1, 3, 23, 59)
+        
+        assert month_keys(start, end) == ["2023_11", "2023_12", "2024_01"]
+        assert month_bounds(datetime(2023, 12, 5), datetime(2023, 12, 20)) == \
+            (datetime(2023, 12, 1), datetime(2024, 1, 1))
+    
+    def test_sync_clears_months_and_writes_in_batches(self):
+        """Test that rows are written with UNWIND in batches of batch_size"""
+        from src.core.graph_sales import sync_route_sales_to_graph, WRITE_ROUTE_SALES_QUERY
+        
+        mongo_db = MagicMock()
+        mongo_db["orders"].aggregate.return_value = [
+            {"_id": {"origin": "CGK", "destination": "DPS", "month": "2023_03"},
+             "total_sales": 300, "total_orders": 3},
+            {"_id": {"origin": "CGK", "destination": "KNO", "month": "2023_03"},
+             "total_sales": 200, "total_orders": 2},
+            {"_id": {"origin": "SUB", "destination": "XXX", "month": "2023_03"},
+             "total_sales": 100, "total_orders": 1}
+        ]
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        
+        def run(query, **parameters):
+            result = Mock()
+            matched = len([row for row in parameters.get("rows", []) if row["destination"] != "XXX"])
+            result.single.return_value = {"matched": matched, "updated": matched}
+            return result
+        
+        tx.run.side_effect = run
+        session.execute_write.side_effect = lambda work, *args: work(tx, *args)
+        
+        stats = sync_route_sales_to_graph(
+            mongo_db, driver, datetime(2023, 3, 1), datetime(2023, 3, 31), batch_size=2
+        )
+        
+        clear_call, *write_calls = tx.run.call_args_list
+        assert clear_call[1]["cleared"] == {"total_sales_2023_03": None,
+                                            "total_orders_2023_03": None}
+        assert [len(call[1]["rows"]) for call in write_calls] == [2, 1]
+        assert all(call[0][0] == WRITE_ROUTE_SALES_QUERY for call in write_calls)
+        assert write_calls[0][1]["rows"][0]["properties"] == {
+            "total_sales_2023_03": 300, "total_orders_2023_03": 3
+        }
+        assert stats["rows"] == 3 and stats["updated"] == 2 and stats["unmatched"] == 1
+    
+    def test_graph_ranking_needs_no_mongo_route_query(self):
+        """Test that the graph ranking reads sales from Neo4j in one query"""
+        from src.core.analytics import run_scenario_with_optimization, ROUTE_RANKING_GRAPH
+        
+        orders = Mock()
+        orders.aggregate.side_effect = lambda pipeline: (
+            [{"total_sales": 500, "total_orders": 5}]
+            if pipeline[1]["$group"]["_id"] is None else []
+        )
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        tx = Mock()
+        tx.run.return_value = [
+            {"origin": "CGK", "destination": "KNO", "distance_km": 1400, "flight_time_hr": 2.2,
+             "total_sales": 200, "total_orders": 2},
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8,
+             "total_sales": 300, "total_orders": 3}
+        ]
+        session.execute_read.side_effect = lambda work: work(tx)
+        
+        results = run_scenario_with_optimization(
+            orders, driver, datetime(2023, 3, 1), datetime(2023, 3, 31),
+            route_ranking=ROUTE_RANKING_GRAPH
+        )
+        
+        parameters = tx.run.call_args[0][1]
+        assert parameters["sales_keys"] == ["total_sales_2023_03"]
+        assert orders.aggregate.call_count == 2
+        assert list(results['df_sorted']["destination"]) == ["DPS", "KNO"]
+        assert results['mongo_routes_time'] == 0.0
+
+
+class TestAsyncAnalytics:
+    """Test the async analytics layer and its sync bridge"""
+    
+    class _Cursor:
+        """Minimal async cursor / Neo4j async result over a list of records"""
+        
+        def __init__(self, records):
+            self._records = list(records)
+        
+        def __aiter__(self):
+            return self._iterate()
+        
+        async def _iterate(self):
+            for record in self._records:
+                yield record
+        
+        async def to_list(self, length=None):
+            return list(self._records)
+    
+    def _clients(self):
+        from unittest.mock import AsyncMock
+        
+        def aggregate(pipeline):
+            group = pipeline[1]["$group"]
+            if group["_id"] is None:
+                records = [{"total_sales": 300, "total_orders": 3}]
+            elif "daily_sales" in group:
+                records = [{"_id": "2023-03-10", "daily_sales": 300, "daily_orders": 3}]
+            else:
+                records = [{"_id": {"origin": "CGK", "destination": "DPS"},
+                            "total_sales": 300, "total_orders": 3}]
+            return self._Cursor(records)
+        
+        orders = Mock()
+        orders.aggregate = AsyncMock(side_effect=aggregate)
+        
+        tx = Mock()
+        tx.run = AsyncMock(return_value=self._Cursor([
+            {"origin": "CGK", "destination": "DPS", "distance_km": 1100, "flight_time_hr": 1.8},
+            {"origin": "CGK", "destination": "KNO", "distance_km": 1400, "flight_time_hr": 2.2}
+        ]))
+        
+        async def execute_read(work):
+            return await work(tx)
+        
+        session = MagicMock()
+        session.execute_read = AsyncMock(side_effect=execute_read)
+        driver = Mock()
+        driver.session.return_value.__aenter__ = AsyncMock(return_value=session)
+        driver.session.return_value.__aexit__ = AsyncMock(return_value=False)
+        return orders, driver
+    
+    def test_bridge_runs_scenario_on_background_loop(self):
+        """Test that the async scenario matches the sync result contract"""
+        import threading
+        from src.core.async_analytics import AsyncBridge, run_scenario_with_optimization
+        
+        orders, driver = self._clients()
+        bridge = AsyncBridge()
+        try:
+            results = bridge.run(run_scenario_with_optimization(
+                orders, driver, datetime(2023, 3, 10), datetime(2023, 3, 10, 23, 59)
+            ), timeout=10)
+            loop_thread = bridge.run(self._thread_name(), timeout=10)
+        finally:
+            bridge.close()
+        
+        assert loop_thread != threading.current_thread().name
+        assert results['total_sales'] == 300
+        assert len(results['df_daily']) == 1
+        assert list(results['df_sorted']["destination"]) == ["DPS", "KNO"]
+        assert results['df_sorted'].iloc[1]['total_sales'] == 0
+        assert orders.aggregate.await_count == 3
+    
+    @staticmethod
+    async def _thread_name():
+        import threading
+        return threading.current_thread().name
+    
+    def test_async_loader_respects_row_cap(self):
+        """Test that aload_frame builds the same frame and stats as load_frame"""
+        import asyncio
+        from src.core.loader import aload_frame, load_stats
+        
+        cursor = self._Cursor([{"_id": {"origin": "CGK"}, "n": i} for i in range(5)])
+        df = asyncio.run(aload_frame(cursor, {"origin": "_id.origin", "n": "n"}, row_cap=3))
+        
+        assert list(df["n"]) == [0, 1, 2]
+        assert load_stats(df)["truncated"] is True
+    
+    def test_local_sources_are_rejected(self):
+        """Test that only MongoDB sources are served asynchronously"""
+        import asyncio
+        from src.core.async_analytics import get_total_sales
+        
+        with pytest.raises(ValueError):
+            asyncio.run(get_total_sales(Mock(), datetime(2023, 3, 1), datetime(2023, 3, 2), "mmap"))
+
+
+class TestDownsampling:
+    """Test chart downsampling of long series"""
+    
+    def _series(self, size=10_000):
+        import numpy as np
+        
+        dates = pd.date_range("2020-01-01", periods=size, freq="D")
+        values = np.sin(np.arange(size) / 50.0) * 100
+        values[size * 43 // 100] = 10_000
+        values[size * 76 // 100] = -10_000
+        return pd.DataFrame({"date": dates, "daily_sales": values})
+    
+    def test_lttb_keeps_extremes_and_endpoints(self):
+        """LTTB should return max_points rows including spikes and both ends"""
+        from src.core.downsample import downsample, DOWNSAMPLE_LTTB
+        
+        df = self._series()
+        df_small, stats = downsample(df, "date", "daily_sales", 500, DOWNSAMPLE_LTTB)
+        
+        assert len(df_small) == 500
+        assert stats == {"points_available": 10_000, "points_sent": 500, "method": "lttb"}
+        assert df_small.index[0] == 0 and df_small.index[-1] == 9_999
+        assert df_small["daily_sales"].max() == 10_000
+        assert df_small["daily_sales"].min() == -10_000
+        assert df_small["date"].is_monotonic_increasing
+    
+    def test_minmax_keeps_extremes(self):
+        """Min-max downsampling should keep every bucket's extremes"""
+        from src.core.downsample import downsample, DOWNSAMPLE_MINMAX
+        
+        df = self._series()
+        df_small, stats = downsample(df, "date", "daily_sales", 500, DOWNSAMPLE_MINMAX)
+        
+        assert stats["points_sent"] <= 500
+        assert df_small["daily_sales"].max() == 10_000
+        assert df_small["daily_sales"].min() == -10_000
+        assert df_small.index.is_monotonic_increasing
+    
+    def test_short_series_unchanged(self):
+        """Series within max_points should be returned whole"""
+        from src.core.downsample import downsample
+        
+        df = self._series(100)
+        df_small, stats = downsample(df, "date", "daily_sales", 500)
+        
+        assert len(df_small) == 100
+        assert stats["points_sent"] == stats["points_available"] == 100
+    
+    def test_unknown_method(self):
+        """Unknown downsampling methods should be rejected"""
+        from src.core.downsample import downsample
+        
+        with pytest.raises(ValueError):
+            downsample(self._series(100), "date", "daily_sales", 10, "median")
+
+
+class TestInsightStats:
+    """Test the single-pass insight accumulators"""
+    
+    def _routes(self, size=200):
+        import numpy as np
+        
+        rng = np.random.default_rng(7)
+        distance = rng.uniform(300, 4000, size)
+        sales = (distance * 1000 + rng.normal(0, 4e5, size)).round()
+        sales[::10] = 0
+        return pd.DataFrame({
+            "origin": [f"O{i}" for i in range(size)],
+            "destination": [f"D{i}" for i in range(size)],
+            "distance_km": distance,
+            "flight_time_hr": distance / 800,
+            "total_sales": np.abs(sales),
+            "total_orders": np.arange(size) % 7
+        })
+    
+    def test_merged_chunks_match_pandas(self):
+        """Chunked, merged accumulators should match full-DataFrame statistics"""
+        from src.core.insight_stats import InsightAccumulator
+        
+        df = self._routes()
+        partials = [InsightAccumulator().add_routes(df.iloc[i:i + 37]) for i in range(0, len(df), 37)]
+        stats = InsightAccumulator()
+        for partial in partials:
+            stats.merge(partial)
+        
+        with_sales = df[df["total_sales"] > 0]
+        assert stats.zero_sales_routes == 20
+        assert stats.route_sales.count == len(with_sales)
+        assert stats.route_sales.mean == pytest.approx(with_sales["total_sales"].mean())
+        assert stats.route_sales.std() == pytest.approx(with_sales["total_sales"].std())
+        assert stats.distance_sales.correlation() == pytest.approx(
+            with_sales["distance_km"].corr(with_sales["total_sales"])
+        )
+        top = pd.DataFrame(stats.top_routes.rows())
+        expected = with_sales.nlargest(5, "total_sales")
+        assert list(top["origin"]) == list(expected["origin"])
+    
+    def test_top_k_keeps_first_on_ties(self):
+        """Ties should keep the row offered first, like nlargest()"""
+        from src.core.insight_stats import TopK
+        
+        top = TopK(2)
+        top.update(pd.DataFrame({"name": ["a", "b"], "value": [5, 5]}), "value")
+        top.update(pd.DataFrame({"name": ["c", "d"], "value": [5, 9]}), "value")
+        
+        assert [row["name"] for row in top.rows()] == ["d", "a"]
+    
+    def test_quantile_sketch(self):
+        """The sketch should be exact while small and within its rank error when large"""
+        import numpy as np
+        from src.core.insight_stats import QuantileSketch
+        
+        small = pd.Series([5.0, 1.0, 9.0, 3.0, 7.0, 2.0])
+        sketch = QuantileSketch()
+        sketch.update(small)
+        assert sketch.quantile(0.25) == small.quantile(0.25, interpolation="lower")
+        assert sketch.rank(3.0) == 3
+        
+        values = np.random.default_rng(3).lognormal(10, 1, 100_000)
+        merged = QuantileSketch()
+        for chunk in np.array_split(values, 20):
+            partial = QuantileSketch()
+            partial.update(chunk)
+            merged.merge(partial)
+        assert merged.count == 100_000
+        for q in (0.1, 0.5, 0.9):
+            rank = (values <= merged.quantile(q)).mean()
+            assert abs(rank - q) < 0.02
+    
+    def test_generate_insights_from_stats(self):
+        """generate_insights() should report the same figures as the DataFrame version"""
+        from src.core.analytics import generate_insights
+        
+        df_routes = self._routes().sort_values("total_sales", ascending=False)
+        df_daily = pd.DataFrame({
+            "date": pd.date_range("2023-03-10", periods=8),
+            "daily_sales": [50, 20, 90, 10, 70, 30, 60, 40],
+            "daily_orders": [1] * 8
+        })
+        results2 = {
+            "total_sales": int(df_routes["total_sales"].sum()),
+            "total_orders": 1000,
+            "df_daily": df_daily,
+            "df_sorted": df_routes
+        }
+        
+        with patch("src.core.analytics.st") as mock_st:
+            mock_st.session_state = {}
+            insights = {insight["type"]: insight["content"]
+                        for insight in generate_insights({}, results2, 8)}
+        
+        assert "12 March 2023: Rp 90" in insights["trend"]
+        assert "13 March 2023: Rp 10" in insights["trend"]
+        top = df_routes.iloc[0]
+        assert f"{top['origin']} to {top['destination']}" in insights["route"]
+        with_sales = df_routes[df_routes["total_sales"] > 0]
+        correlation = with_sales["distance_km"].corr(with_sales["total_sales"])
+        assert f"{correlation:.3f}" in insights["correlation"]
+        low_days = len(df_daily[df_daily["daily_sales"] <= df_daily["daily_sales"].quantile(0.25)])
+        assert f"on {low_days} low-sales days" in insights["recommendation"]
+        assert "20 routes with zero sales" in insights["recommendation"]
+
+
+class TestIndexCoverage:
+    """Test the covered index profile and the coverage verification"""
+    
+    @staticmethod
+    def _fields(node, match=False):
+        """Collect the fields a filter matches on (match=True) or an expression references"""
+        if isinstance(node, dict):
+            fields = {key for key in node if match and not key.startswith("$")}
+            for value in node.values():
+                fields |= TestIndexCoverage._fields(value, match)
+            return fields
+        if isinstance(node, list):
+            return set().union(*(TestIndexCoverage._fields(item, match) for item in node))
+        if isinstance(node, str) and node.startswith("$") and not match:
+            return {node[1:]}
+        return set()
+    
+    @staticmethod
+    def _plan(stages):
+        plan = None
+        for stage in reversed(stages):
+            plan = {"stage": stage, **({"inputStage": plan} if plan else {})}
+            if stage == "IXSCAN":
+                plan["indexName"] = "idx_date_route_price"
+        return plan
+    
+    def _explain(self, stages, docs_examined, rejected=None):
+        return {"queryPlanner": {"winningPlan": self._plan(stages),
+                                 "rejectedPlans": [self._plan(rejected)] if rejected else []},
+                "executionStats": {"totalDocsExamined": docs_examined, "totalKeysExamined": 50,
+                                   "nReturned": 1, "executionTimeMillis": 1}}
+    
+    def test_covered_profile_holds_every_pipeline_field(self):
+        """Each analytics pipeline should read only fields of one covered index"""
+        from src.core.database import MONGO_INDEX_PROFILES, INDEX_PROFILE_COVERED
+        from src.core.profiling import analytics_pipelines
+        
+        profile = MONGO_INDEX_PROFILES[INDEX_PROFILE_COVERED]
+        for source, collection in (("orders", "orders"), ("rollup", "daily_route_sales")):
+            index_fields = [{field for field, _ in keys} for _, keys in profile[collection]]
+            pipelines = analytics_pipelines(
+                datetime(2023, 3, 10), datetime(2023, 3, 20), [("CGK", "DPS"), ("SUB", "KNO")],
+                source
+            )
+            for name, pipeline in pipelines.items():
+                # The leading $match and $group are the stages that read documents
+                fields = self._fields(pipeline[0]["$match"], match=True)
+                fields |= self._fields(pipeline[1]["$group"])
+                assert any(fields <= indexed for indexed in index_fields), (source, name, fields)
+    
+    def test_is_covered(self):
+        """Only index-only plans with no documents examined should count as covered"""
+        from src.core.profiling import is_covered, summarize_explain
+        
+        assert is_covered(summarize_explain(
+            self._explain(["GROUP", "PROJECTION_COVERED", "IXSCAN"], 0)
+        ))
+        assert not is_covered(summarize_explain(self._explain(["GROUP", "FETCH", "IXSCAN"], 40)))
+        # An empty range examines no documents but would still fetch them
+        assert not is_covered(summarize_explain(self._explain(["GROUP", "FETCH", "IXSCAN"], 0)))
+        assert not is_covered(summarize_explain(self._explain(["GROUP", "COLLSCAN"], 0)))
+        # Only a rejected candidate plan scanned the index
+        assert not is_covered(summarize_explain(self._explain(
+            ["GROUP", "EOF"], 0, rejected=["PROJECTION_COVERED", "IXSCAN"]
+        )))
+    
+    def test_verify_index_coverage_reports_each_pipeline(self):
+        """Each pipeline should be explained once and failures recorded per pipeline"""
+        from src.core.profiling import verify_index_coverage
+        
+        orders = MagicMock()
+        orders.name = "orders"
+        explains = iter([
+            self._explain(["GROUP", "PROJECTION_COVERED", "IXSCAN"], 0),
+            self._explain(["GROUP", "FETCH", "IXSCAN"], 30),
+            RuntimeError("explain failed"),
+            self._explain(["GROUP", "PROJECTION_COVERED", "IXSCAN"], 0),
+            self._explain(["GROUP", "PROJECTION_COVERED", "IXSCAN"], 0),
+            self._explain(["GROUP", "PROJECTION_COVERED", "IXSCAN"], 0)
+        ])
+        
+        def command(*args, **kwargs):
+            result = next(explains)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        
+        orders.database.command.side_effect = command
+        report = verify_index_coverage(
+            orders, datetime(2023, 3, 10), datetime(2023, 3, 20), [("CGK", "DPS")]
+        )
+        
+        assert list(report) == ["total_sales", "daily_trend", "route_batch_pairs",
+                                "route_batch_cross_product", "top_routes", "single_route"]
+        assert report["total_sales"]["covered"] is True
+        assert report["daily_trend"]["covered"] is False
+        assert report["route_batch_pairs"] == {"error": "explain failed", "covered": False}
+    
+    def test_create_indexes_for_profile(self):
+        """The covered profile should build its compound indexes on each collection"""
+        from src.core.database import create_mongodb_indexes
+        
+        mongo_db = MagicMock()
+        
+        assert create_mongodb_indexes(mongo_db, "covered") is True
+        create_index = mongo_db.__getitem__.return_value.create_index
+        names = {call.kwargs["name"] for call in create_index.call_args_list}
+        assert {"idx_date_route_price", "idx_route_date_price",
+                "idx_rollup_day_route_totals"} <= names
+
+
+class TestIndexManager:
+    """Test the background index manager and tolerant index drops"""
+    
+    def _databases(self, existing, neo4j_existing=()):
+        collections = {}
+        
+        def collection(name):
+            if name not in collections:
+                coll = MagicMock()
+                coll.index_information.return_value = existing.get(
+                    name, {"_id_": {"key": [("_id", 1)]}}
+                )
+                collections[name] = coll
+            return collections[name]
+        
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.side_effect = collection
+        
+        driver = MagicMock()
+        session = driver.session.return_value.__enter__.return_value
+        result = MagicMock()
+        result.__iter__.side_effect = lambda: iter([
+            {"name": name, "state": "ONLINE", "populationPercent": 100.0}
+            for name in neo4j_existing
+        ])
+        session.run.return_value = result
+        return mongo_db, driver, collections
+    
+    def test_plan_diffs_profile_against_existing(self):
+        """Missing indexes are created, changed ones rebuilt and other managed ones dropped"""
+        from src.core.index_manager import plan_indexes
+        
+        mongo_db, driver, _ = self._databases({
+            "orders": {
+                "_id_": {"key": [("_id", 1)]},
+                "idx_depart_date": {"key": [("depart_date", 1)]},
+                "idx_flight_id": {"key": [("flight_id", 1)]},
+                "idx_route_date_price": {"key": [("origin", 1), ("destination", 1)]},
+                "custom_index": {"key": [("status", 1)]}
+            },
+            "daily_route_sales": {
+                "_id_": {"key": [("_id", 1)]},
+                "idx_rollup_day_route": {"key": [("day", 1), ("origin", 1), ("destination", 1)]}
+            }
+        }, neo4j_existing=["idx_airport_code"])
+        
+        plan = plan_indexes(mongo_db, driver, "covered")
+        actions = {(entry["engine"], entry["name"]): entry["action"] for entry in plan}
+        
+        assert actions[("mongodb", "idx_date_route_price")] == "create"
+        assert actions[("mongodb", "idx_route_date_price")] == "rebuild"
+        assert actions[("mongodb", "idx_flight_id")] == "keep"
+        assert actions[("mongodb", "idx_depart_date")] == "drop"
+        assert actions[("neo4j", "idx_airport_code")] == "keep"
+        assert actions[("neo4j", "idx_ct_distance_time")] == "create"
+        # Unmanaged indexes are left alone
+        names = {entry["name"] for entry in plan}
+        assert not names & {"_id_", "custom_index", "idx_rollup_day_route"}
+        # Drops come after every creation
+        kinds = [entry["action"] == "drop" for entry in plan]
+        assert kinds == sorted(kinds)
+    
+    def test_failing_task_does_not_stop_the_plan(self):
+        """A failing index is recorded and the remaining tasks still run"""
+        from pymongo.errors import OperationFailure
+        from src.core.index_manager import IndexManager
+        
+        mongo_db, driver, collections = self._databases({
+            "orders": {
+                "idx_depart_date": {"key": [("depart_date", 1)]},
+                "idx_origin_dest_date": {"key": [("origin", 1), ("destination", 1),
+                                                 ("depart_date", 1)]},
+                "idx_flight_id": {"key": [("flight_id", 1)]}
+            }
+        }, neo4j_existing=["idx_airport_code"])
+        mongo_db["orders"].drop_index.side_effect = [
+            OperationFailure("not authorized", code=13), None, None
+        ]
+        on_complete = Mock()
+        
+        manager = IndexManager(poll_interval=0)
+        assert manager.start(mongo_db, driver, drop_all=True, on_complete=on_complete)
+        manager._thread.join(5)
+        
+        states = {task["name"]: task["state"] for task in manager.status()}
+        assert states == {"idx_depart_date": "failed", "idx_flight_id": "done",
+                          "idx_origin_dest_date": "done", "idx_airport_code": "done"}
+        assert "not authorized" in next(t["error"] for t in manager.status() if t["error"])
+        assert collections["orders"].drop_index.call_count == 3
+        on_complete.assert_called_once()
+    
+    def test_poll_reads_current_op_progress(self):
+        """Running MongoDB builds take their progress from currentOp"""
+        from src.core.index_manager import IndexManager
+        
+        manager = IndexManager()
+        manager._tasks = [{"engine": "mongodb", "collection": "orders",
+                           "name": "idx_date_route_price", "action": "create",
+                           "state": "running", "progress": None}]
+        mongo_db = MagicMock()
+        mongo_db.client.admin.command.return_value = {"inprog": [
+            {"command": {"createIndexes": "orders", "indexes": [{"name": "idx_other"}]},
+             "progress": {"done": 1, "total": 2}},
+            {"command": {"createIndexes": "orders", "indexes": [{"name": "idx_date_route_price"}]},
+             "progress": {"done": 250, "total": 1000}, "msg": "Index Build: scanning collection"}
+        ]}
+        
+        manager.poll(mongo_db)
+        
+        task = manager.status()[0]
+        assert task["progress"] == 25.0
+        assert task["phase"] == "Index Build: scanning collection"
+    
+    def test_drop_mongodb_indexes_continues_past_failures(self):
+        """Missing indexes are skipped and other failures do not abort the remaining drops"""
+        from pymongo.errors import OperationFailure
+        from src.core.database import drop_mongodb_indexes
+        
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.return_value.drop_index.side_effect = [
+            OperationFailure("index not found", code=27), RuntimeError("boom"),
+            None, None, None, None, None
+        ]
+        
+        with patch("src.core.database.st") as mock_st:
+            assert drop_mongodb_indexes(mongo_db) is False
+        
+        # Both profiles' indexes are dropped, each name once
+        drop_index = mongo_db.__getitem__.return_value.drop_index
+        dropped = [call.args[0] for call in drop_index.call_args_list]
+        assert sorted(dropped) == sorted({
+            "idx_depart_date", "idx_flight_id", "idx_origin_dest_date", "idx_date_route_price",
+            "idx_route_date_price", "idx_fp_id", "idx_rollup_day_route_totals"
+        })
+        message = mock_st.error.call_args[0][0]
+        assert "boom" in message and "not found" not in message
+
+
+class TestTimeSeries:
+    """Test the orders_ts time-series copy and its analytics source"""
+    
+    def _db(self, orders=()):
+        collections = {"orders": MagicMock(), "orders_ts": MagicMock()}
+        collections["orders"].find.return_value.sort.return_value = iter(orders)
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.side_effect = collections.__getitem__
+        mongo_db.list_collection_names.return_value = []
+        return mongo_db, collections
+    
+    def test_timeseries_documents(self):
+        """Orders should become measurements with the route, class and status as metadata"""
+        from src.core.timeseries import to_timeseries_documents
+        
+        orders = [
+            {"_id": 1, "origin": "CGK", "destination": "DPS", "class": "economy",
+             "status": "paid", "total_price": 1500000, "depart_date": datetime(2023, 3, 10, 8)},
+            {"_id": 2, "origin": "SUB", "destination": "KNO", "total_price": 900000}
+        ]
+        assert to_timeseries_documents(orders) == [{
+            "depart_date": datetime(2023, 3, 10, 8),
+            "total_price": 1500000,
+            "meta": {"origin": "CGK", "destination": "DPS", "class": "economy", "status": "paid"}
+        }]
+    
+    def test_timeseries_source_pipelines(self):
+        """The time-series source should read orders_ts and match the route in meta"""
+        from src.core.analytics import (
+            _source_collection, build_route_batch_pipeline, build_top_routes_pipeline,
+            build_total_pipeline, ROUTE_MATCH_CROSS_PRODUCT
+        )
+        from src.core.async_analytics import _source_collection as async_source_collection
+        
+        orders = MagicMock()
+        orders.database = {"orders_ts": "timeseries collection"}
+        assert _source_collection(orders, "timeseries") == "timeseries collection"
+        assert async_source_collection(orders, "timeseries") == "timeseries collection"
+        with pytest.raises(ValueError):
+            async_source_collection(orders, "snapshot")
+        
+        start, end = datetime(2023, 3, 10), datetime(2023, 3, 20)
+        pairs = build_route_batch_pipeline(start, end, [("CGK", "DPS")], "timeseries")
+        assert pairs[0]["$match"]["$or"][0] == {
+            "meta.origin": "CGK", "meta.destination": "DPS",
+            "depart_date": {"$gte": start, "$lte": end}
+        }
+        assert pairs[1]["$group"]["_id"] == {"origin": "$meta.origin",
+                                             "destination": "$meta.destination"}
+        cross = build_route_batch_pipeline(start, end, [("CGK", "DPS")], "timeseries",
+                                           ROUTE_MATCH_CROSS_PRODUCT)
+        assert set(cross[0]["$match"]) == {"depart_date", "meta.origin", "meta.destination"}
+        top = build_top_routes_pipeline(start, end, source="timeseries")
+        assert top[1]["$group"]["_id"] == {"origin": "$meta.origin",
+                                           "destination": "$meta.destination"}
+        # Date-only pipelines are the same on both collections
+        assert build_total_pipeline(start, end, "timeseries") == build_total_pipeline(start, end)
+    
+    def test_refresh_orders_timeseries(self):
+        """A full refresh should rebuild the collection and copy orders in batches"""
+        from src.core.timeseries import refresh_orders_timeseries
+        
+        orders = [{"depart_date": datetime(2023, 3, day), "origin": "CGK", "destination": "DPS",
+                   "total_price": 1000} for day in (10, 11, 12)]
+        mongo_db, collections = self._db(orders)
+        assert refresh_orders_timeseries(mongo_db, batch_size=2) == 3
+        
+        mongo_db.drop_collection.assert_called_once_with("orders_ts")
+        _, options = mongo_db.create_collection.call_args
+        assert options["timeseries"]["timeField"] == "depart_date"
+        assert options["timeseries"]["metaField"] == "meta"
+        assert [len(call.args[0]) for call in collections["orders_ts"].insert_many.call_args_list] \
+            == [2, 1]
+        
+        # A ranged refresh replaces only the departures within the range
+        mongo_db, collections = self._db(orders[:1])
+        start, end = datetime(2023, 3, 10), datetime(2023, 3, 10, 23, 59)
+        assert refresh_orders_timeseries(mongo_db, start, end) == 1
+        mongo_db.drop_collection.assert_not_called()
+        collections["orders_ts"].delete_many.assert_called_once_with(
+            {"depart_date": {"$gte": start, "$lte": end}}
+        )
+    
+    def test_compare_timeseries_storage(self):
+        """The benchmark should time every shared pipeline on both collections"""
+        from src.core.benchmark import compare_timeseries_storage
+        
+        mongo_db, collections = self._db()
+        for name, collection in collections.items():
+            storage = {"size": 4000, "storageSize": 2000, "totalIndexSize": 500}
+            if name == "orders_ts":
+                storage["timeseries"] = {"bucketCount": 3}
+            collection.aggregate.side_effect = lambda pipeline, storage=storage: iter(
+                [{"storageStats": storage}] if "$collStats" in pipeline[0] else []
+            )
+            collection.estimated_document_count.return_value = 10
+        
+        report = compare_timeseries_storage(
+            mongo_db, datetime(2023, 3, 10), datetime(2023, 3, 20), [("CGK", "DPS")], repeats=2
+        )
+        assert report["storage"]["timeseries"]["buckets"] == 3
+        assert report["storage"]["orders"]["storage_bytes"] == 2000
+        # The single-route pipeline exists only for the raw orders
+        assert "single_route" not in report["queries"]
+        assert "route_batch_pairs" in report["queries"]
+        for row in report["queries"].values():
+            assert row["orders"]["runs"] == row["timeseries"]["runs"] == 2
+
+
+class TestPeriodRollups:
+    """Test timezone-aware period bucketing and the sales_by_period pyramid"""
+    
+    def test_period_bounds_in_market_timezone(self):
+        """Wall-clock ranges should widen to whole local periods, returned in UTC"""
+        from datetime import timezone
+        from src.core.periods import period_bounds
+        
+        start, end = datetime(2024, 1, 31), datetime(2024, 2, 29, 23, 59, 59)
+        # Asia/Jakarta is UTC+7, so local midnight is 17:00 UTC the day before
+        assert period_bounds(start, end, "day", "Asia/Jakarta") == \
+            (datetime(2024, 1, 30, 17), datetime(2024, 2, 29, 17))
+        # 2024-01-31 is a Wednesday; ISO weeks start on Monday
+        assert period_bounds(start, end, "week", "Asia/Jakarta") == \
+            (datetime(2024, 1, 28, 17), datetime(2024, 3, 3, 17))
+        assert period_bounds(start, end, "month", "Asia/Jakarta") == \
+            (datetime(2023, 12, 31, 17), datetime(2024, 2, 29, 17))
+        assert period_bounds(datetime(2024, 1, 31, 2, 30, tzinfo=timezone.utc),
+                             datetime(2024, 1, 31, 2, 45, tzinfo=timezone.utc),
+                             "hour", "Asia/Jakarta") == \
+            (datetime(2024, 1, 31, 2), datetime(2024, 1, 31, 3))
+        with pytest.raises(ValueError):
+            period_bounds(start, end, "fortnight")
+    
+    def test_period_pipeline_truncates_natively(self):
+        """Periods should be cut by $dateTrunc in the timezone, not by date strings"""
+        from src.core.periods import build_period_pipeline
+        
+        start, end = datetime(2024, 1, 1), datetime(2024, 3, 31)
+        weekly = build_period_pipeline(start, end, "week", "Asia/Jakarta")
+        assert weekly[1]["$group"]["_id"] == {"$dateTrunc": {
+            "date": "$depart_date", "unit": "week", "timezone": "Asia/Jakarta",
+            "startOfWeek": "monday"
+        }}
+        monthly = build_period_pipeline(start, end, "month", "Asia/Jakarta")
+        assert "startOfWeek" not in monthly[1]["$group"]["_id"]["$dateTrunc"]
+        assert "$dateToString" not in str(weekly + monthly)
+    
+    def test_refresh_folds_each_level_from_its_parent(self):
+        """Hours should come from orders and higher levels from the level below"""
+        from src.core.periods import refresh_period_rollups
+        
+        collections = {"orders": MagicMock(), "sales_by_period": MagicMock()}
+        mongo_db = MagicMock()
+        mongo_db.__getitem__.side_effect = collections.__getitem__
+        collections["sales_by_period"].count_documents.return_value = 4
+        
+        counts = refresh_period_rollups(mongo_db, datetime(2024, 1, 31),
+                                        datetime(2024, 2, 29, 23, 59), "Asia/Jakarta")
+        assert counts == {"hour": 4, "day": 4, "week": 4, "month": 4}
+        
+        hour_pipeline = collections["orders"].aggregate.call_args.args[0]
+        assert hour_pipeline[-1]["$merge"]["into"] == "sales_by_period"
+        parents = [call.args[0][0]["$match"]["granularity"]
+                   for call in collections["sales_by_period"].aggregate.call_args_list]
+        assert parents == ["hour", "day", "day"]
+        # Days and hours cover every week and month touching the range
+        deleted = {call.args[0]["granularity"]: call.args[0]["bucket"]
+                   for call in collections["sales_by_period"].delete_many.call_args_list}
+        assert deleted["day"] == deleted["hour"] == {
+            "$gte": datetime(2023, 12, 31, 17), "$lt": datetime(2024, 3, 3, 17)
+        }
+        assert deleted["month"]["$lt"] == datetime(2024, 2, 29, 17)
+        
+        # Rows are merged first and only the rows this refresh did not write are deleted
+        refresh_id = hour_pipeline[-2]["$project"]["refresh_id"]["$literal"]
+        assert all(call.args[0]["refresh_id"] == {"$ne": refresh_id}
+                   for call in collections["sales_by_period"].delete_many.call_args_list)
+        calls = [name for name, _, _ in collections["sales_by_period"].method_calls
+                 if name in ("aggregate", "delete_many")]
+        assert calls == ["delete_many"] + ["aggregate", "delete_many"] * 3
+    
+    def test_sales_by_period_from_pyramid(self):
+        """The rollup source should read one level and return local period starts"""
+        from src.core.analytics import get_sales_by_period
+        
+        pyramid = MagicMock()
+        pyramid.aggregate.return_value = iter([
+            {"_id": datetime(2023, 12, 31, 17), "sales": 5000, "orders": 5},
+            {"_id": datetime(2024, 1, 31, 17), "sales": 3000, "orders": 2}
+        ])
+        orders = MagicMock()
+        orders.database = {"sales_by_period": pyramid}
+        
+        df_period, _ = get_sales_by_period(orders, datetime(2024, 1, 1), datetime(2024, 2, 29),
+                                           "month", "Asia/Jakarta", source="rollup")
+        assert pyramid.aggregate.call_args.args[0][0]["$match"]["granularity"] == "month"
+        assert [period.isoformat() for period in df_period["period"]] == \
+            ["2024-01-01T00:00:00+07:00", "2024-02-01T00:00:00+07:00"]
+        assert df_period["orders"].tolist() == [5, 2]
+        
+        with pytest.raises(ValueError):
+            get_sales_by_period(orders, datetime(2024, 1, 1), datetime(2024, 2, 29),
+                                source="snapshot")
+
+
+
+class TestDashboardLabels:
+    """Test the dashboard labels spelled out to keep module imports lazy"""
+    
+    def test_label_values_match_module_constants(self):
+        """Each label value should be the constant of the module that consumes it"""
+        from src.core import analytics, benchmark, database, downsample
+        from src.ui import dashboard
+        
+        assert set(dashboard.SOURCE_LABELS.values()) == {
+            analytics.SOURCE_ORDERS, analytics.SOURCE_ROLLUP, analytics.SOURCE_TIMESERIES,
+            analytics.SOURCE_SNAPSHOT, analytics.SOURCE_MMAP
+        }
+        assert set(dashboard.ROUTE_RANKING_LABELS.values()) == {
+            analytics.ROUTE_RANKING_DISTANCE, analytics.ROUTE_RANKING_SALES,
+            analytics.ROUTE_RANKING_ALL, analytics.ROUTE_RANKING_GRAPH
+        }
+        assert set(dashboard.INDEX_STATE_LABELS.values()) == {
+            benchmark.INDEX_STATE_AS_IS, benchmark.INDEX_STATE_CREATED,
+            benchmark.INDEX_STATE_DROPPED
+        }
+        assert set(dashboard.INDEX_PROFILE_LABELS.values()) == set(database.MONGO_INDEX_PROFILES)
+        assert set(dashboard.DOWNSAMPLE_LABELS.values()) == {
+            downsample.DOWNSAMPLE_LTTB, downsample.DOWNSAMPLE_MINMAX
+        }
+    
+    def test_import_defers_drivers_and_analytics(self):
+        """Importing the dashboard should load neither the drivers nor the analytics"""
+        import os
+        import subprocess
+        import sys
+        
+        code = ("import sys, src.ui.dashboard; "
+                "print(sorted(m for m in ('pymongo', 'neo4j', 'pandas', 'src.core.database', "
+                "'src.core.analytics', 'src.core.benchmark', 'src.core.insight_stats', "
+                "'src.core.downsample') if m in sys.modules))")
+        loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+        assert loaded.stdout.strip() == "[]"
+
+
 # Pytest configuration
 @pytest.fixture
 def sample_data():